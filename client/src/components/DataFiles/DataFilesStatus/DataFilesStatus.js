@@ -61,6 +61,12 @@ const OPERATION_MAP = {
   }
 };
 
+export function getProgressText({ response }) {
+  const { name, transferred, total } = response;
+  const percent = total ? Math.floor((100 * transferred) / total) : 0;
+  return `Copying ${truncateMiddle(name, 20)}: ${percent}%`;
+}
+
 export function getOperationText(operation) {
   if (operation in OPERATION_MAP) {
     return OPERATION_MAP[operation];
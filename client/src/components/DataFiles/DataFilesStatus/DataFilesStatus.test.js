@@ -1,4 +1,4 @@
-import { getOperationText } from './DataFilesStatus';
+import { getOperationText, getProgressText } from './DataFilesStatus';
 
 
 describe('getOperationText', () => {
@@ -12,3 +12,18 @@ describe('getOperationText', () => {
     expect(getOperationText('random_op')).toEqual('Unknown');
   });
 });
+
+describe('getProgressText', () => {
+  it('converts transfer progress to a percentage', () => {
+    expect(
+      getProgressText({
+        response: { name: 'file.txt', transferred: 25, total: 100 }
+      })
+    ).toEqual('Copying file.txt: 25%');
+    expect(
+      getProgressText({
+        response: { name: 'empty.txt', transferred: 0, total: 0 }
+      })
+    ).toEqual('Copying empty.txt: 0%');
+  });
+});
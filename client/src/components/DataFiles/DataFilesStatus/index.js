@@ -1 +1,2 @@
 export { default } from './DataFilesStatus';
+export { getProgressText } from './DataFilesStatus';
@@ -6,7 +6,7 @@ import Slide from '@material-ui/core/Slide';
 import { Icon } from '_common';
 import './Toast.scss';
 import { STATUS_TEXT_MAP } from '../Jobs/JobsStatus';
-import OPERATION_MAP from '../DataFiles/DataFilesStatus';
+import OPERATION_MAP, { getProgressText } from '../DataFiles/DataFilesStatus';
 import truncateMiddle from '../../utils/truncateMiddle';
 
 const NotificationToast = () => {
@@ -148,6 +148,8 @@ export const getToastMessage = (
         extra
       );
     }
+    case 'data_files_progress':
+      return getProgressText(extra);
     default:
       return message;
   }
@@ -86,4 +86,15 @@ describe('getToastMessage', () => {
     expect(getToastMessage(dataFilesError)).toEqual('Move failed');
   });
 
+  it('returns expected data_files_progress response', () => {
+    expect(
+      getToastMessage({
+        event_type: 'data_files_progress',
+        status: 'INFO',
+        operation: 'transfer',
+        extra: { response: { name: 'file.txt', transferred: 50, total: 100 } }
+      })
+    ).toEqual('Copying file.txt: 50%');
+  });
+
 });
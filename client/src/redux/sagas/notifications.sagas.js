@@ -50,6 +50,17 @@ export function* handleSocket(action) {
     case 'data_files':
       yield put({ type: 'ADD_TOAST', payload: action });
       break;
+    case 'data_files_progress':
+      // progress is not saved as a notification, so it has no pk of its own
+      yield put({
+        type: 'ADD_TOAST',
+        payload: { ...action, pk: `progress-${Date.now()}` }
+      });
+      break;
+    case 'notifications_update':
+      // notifications were read or deleted in bulk, possibly in another tab
+      yield put({ type: 'FETCH_NOTIFICATIONS' });
+      break;
     default:
       yield put({ type: 'NEW_NOTIFICATION', payload: action });
       yield put({ type: 'ADD_TOAST', payload: action });
@@ -6,6 +6,14 @@ import tempfile
 from portal.apps.auth.models import AgaveOAuthToken
 from portal.apps.accounts.models import PortalProfile
 from django.conf import settings
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Listings, counters and other cached state must not leak between tests.
+    cache.clear()
+    yield
 
 
 @pytest.fixture
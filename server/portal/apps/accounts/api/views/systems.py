@@ -11,6 +11,7 @@ from django.utils.decorators import method_decorator
 from portal.views.base import BaseApiView
 from portal.apps.accounts.managers import accounts as AccountsManager
 from portal.apps.search.tasks import agave_indexer
+from portal.apps.workspace.managers.user_applications import invalidate_submission_cache
 from django.conf import settings
 
 
@@ -133,6 +134,7 @@ class SystemKeysView(BaseApiView):
             request.user.username,
             system_id
         )
+        invalidate_submission_cache(request.user.username)
         return JsonResponse({
             'systemId': system_id,
             'publicKey': pub_key
@@ -157,6 +159,7 @@ class SystemKeysView(BaseApiView):
             system_id=system_id,
             hostname=body['form']['hostname']
         )
+        invalidate_submission_cache(request.user.username)
         # if success and body['form']['type'] == 'STORAGE':
         #     # Index the user's home directory once keys are successfully pushed.
         #     # Schedule indexing for 11:59:59 today.
@@ -2,7 +2,7 @@ from django.test import TestCase, Client, RequestFactory, override_settings
 from mock import patch, MagicMock
 import pytest
 from django.contrib.auth import get_user_model
-from portal.apps.accounts.api.views.systems import SystemsListView
+from portal.apps.accounts.api.views.systems import SystemsListView, SystemKeysView
 from portal.libs.agave.models.systems.storage import StorageSystem
 
 
@@ -58,4 +58,18 @@ class TestSystemsListView(TestCase):
         self.assertEqual(len(args[0]["response"]["storage"]), 2)
 
 
+@pytest.mark.django_db(transaction=True)
+class TestSystemKeysView(TestCase):
+    fixtures = ['users', 'auth']
+
+    @patch('portal.apps.accounts.api.views.systems.invalidate_submission_cache')
+    @patch('portal.apps.accounts.api.views.systems.AccountsManager')
+    def test_reset_invalidates_submission_cache(self, mock_AccountsManager, mock_invalidate):
+        mock_AccountsManager.reset_system_keys.return_value = 'public_key'
+        request = RequestFactory().put("/api/accounts/systems/frontera/keys")
+        request.user = get_user_model().objects.get(username="username")
+
+        response = SystemKeysView().reset(request, 'frontera', {'action': 'reset'})
 
+        self.assertEqual(response.status_code, 200)
+        mock_invalidate.assert_called_once_with('username')
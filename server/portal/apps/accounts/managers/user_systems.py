@@ -51,7 +51,6 @@ class UserSystemsManager():
         :param system_name: Name of system to manage, otherwise default system will be used
         """
         self.user = user
-        self.tas_user = get_user_data(username=self.user.username)
 
         if not system_name:
             # if we don't define a default system as a setting we will have to do some crazy
@@ -68,6 +67,14 @@ class UserSystemsManager():
                 logger.debug('available systems: {}'.format(list(settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS.keys())))
                 return None
 
+    @property
+    def tas_user(self):
+        """TAS user data, looked up the first time it is needed.
+        """
+        if not hasattr(self, '_tas_user'):
+            self._tas_user = get_user_data(username=self.user.username)
+        return self._tas_user
+
     def get_name(self):
         """Gets display name for given system
         :returns: formatted system name
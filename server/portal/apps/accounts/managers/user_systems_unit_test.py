@@ -55,6 +55,15 @@ def test_init(tas_mock, test_manager, regular_user):
     assert mgr.system == settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS['longhorn']
 
 
+def test_tas_user_is_fetched_once_when_needed(tas_mock, regular_user):
+    mgr = UserSystemsManager(regular_user)
+    tas_mock.assert_not_called()
+
+    mgr.get_sys_tas_user_dir()
+    mgr.get_private_directory()
+    tas_mock.assert_called_once_with(username=regular_user.username)
+
+
 def test_lookup_methods(test_manager):
     assert test_manager.get_name() == 'My Data (Frontera)'
     assert test_manager.get_host() == 'frontera.tacc.utexas.edu'
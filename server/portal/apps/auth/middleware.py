@@ -1,16 +1,28 @@
 from django.contrib.auth import logout
 from django.core.exceptions import ObjectDoesNotExist
 from requests.exceptions import RequestException, HTTPError
+from django.conf import settings
 from django.contrib import auth
+from django.core.cache import cache
 from django.db import transaction
 from django.http import HttpResponse
-from portal.apps.auth.models import AgaveOAuthToken
+from portal.apps.auth.models import AgaveOAuthToken, TOKEN_EXPIRY_THRESHOLD
+from portal.utils import metrics
 import logging
+import time
 
 # pylint: disable=invalid-name
 logger = logging.getLogger(__name__)
 # pylint: enable=invalid-name
 
+REFRESHED = 'auth.token_refresh.refreshed'
+LOCK_WAITS = 'auth.token_refresh.lock_waits'
+
+# Expiry timestamps of tokens checked by this process, by user id. A stale
+# entry can only be too early, which sends the request down the slow path.
+_token_expiry = {}
+_MAX_CACHED_EXPIRIES = 10000
+
 
 def get_user(request):
     if not hasattr(request, '_cached_user'):
@@ -18,24 +30,75 @@ def get_user(request):
     return request._cached_user
 
 
+def refresh_lock_key(user):
+    return 'auth:token_refresh:{}'.format(user.pk)
+
+
+def remember_expiry(user, agave_oauth):
+    if len(_token_expiry) >= _MAX_CACHED_EXPIRIES:
+        _token_expiry.clear()
+    _token_expiry[user.pk] = agave_oauth.created + agave_oauth.expires_in
+
+
+def is_fresh(user):
+    expiry = _token_expiry.get(user.pk)
+    return expiry is not None and expiry - time.time() - TOKEN_EXPIRY_THRESHOLD > 0
+
+
+def refresh_token(user):
+    """Refresh a user's token unless another request already did. Only one
+    request per user refreshes at a time; others wait for it, for up to
+    settings.PORTAL_TOKEN_REFRESH_WAIT seconds, rather than queueing on a
+    row lock.
+    """
+    key = refresh_lock_key(user)
+    if not cache.add(key, True, settings.PORTAL_TOKEN_REFRESH_WAIT):
+        metrics.incr(LOCK_WAITS)
+        deadline = time.time() + settings.PORTAL_TOKEN_REFRESH_WAIT
+        while cache.get(key) and time.time() < deadline:
+            time.sleep(0.1)
+        agave_oauth = AgaveOAuthToken.objects.get(user=user)
+        if agave_oauth.created + agave_oauth.expires_in <= time.time():
+            raise Exception('Agave Token refresh failed; Forcing logout for {}'.format(user.username))
+        remember_expiry(user, agave_oauth)
+        return
+
+    try:
+        with transaction.atomic():
+            agave_oauth = AgaveOAuthToken.objects.filter(user=user).select_for_update().get()
+            if agave_oauth.expired:
+                try:
+                    agave_oauth.client.token.refresh()
+                except HTTPError:
+                    raise Exception(
+                        'Agave Token refresh failed; Forcing logout for {}'.format(user.username)
+                    )
+                metrics.incr(REFRESHED)
+                agave_oauth.refresh_from_db()
+        remember_expiry(user, agave_oauth)
+    finally:
+        cache.delete(key)
+
+
 class AgaveTokenRefreshMiddleware(object):
+    """Make sure authenticated users have a token which is not about to
+    expire. Known expiry times are kept in memory, so most requests do not
+    touch the database.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         user = get_user(request)
         try:
-            if request.path != '/logout/' and user.is_authenticated:
+            if request.path != '/logout/' and user.is_authenticated and not is_fresh(user):
                 try:
-                    with transaction.atomic():
-                        agave_oauth = AgaveOAuthToken.objects.filter(user=user).select_for_update().get()
-                        if agave_oauth.expired:
-                            try:
-                                agave_oauth.client.token.refresh()
-                            except HTTPError:
-                                raise Exception(
-                                    'Agave Token refresh failed; Forcing logout for {}'.format(user.username)
-                                )
+                    agave_oauth = AgaveOAuthToken.objects.get(user=user)
+                    if agave_oauth.expired:
+                        refresh_token(user)
+                    else:
+                        remember_expiry(user, agave_oauth)
                 except ObjectDoesNotExist:
                     raise Exception('Authenticated user {} missing Agave API Token'.format(user.username))
                 except RequestException:
@@ -43,6 +106,7 @@ class AgaveTokenRefreshMiddleware(object):
 
         except Exception as e:
             logger.exception(e)
+            _token_expiry.pop(getattr(user, 'pk', None), None)
             logout(request)
             return HttpResponse("Unauthorized", status=401)
 
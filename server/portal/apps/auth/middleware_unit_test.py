@@ -3,7 +3,11 @@ from django.test import (
     RequestFactory
 )
 from mock import patch, MagicMock
-from portal.apps.auth.middleware import AgaveTokenRefreshMiddleware
+import time
+from django.core.cache import cache
+from portal.apps.auth import middleware
+from portal.apps.auth.middleware import AgaveTokenRefreshMiddleware, refresh_lock_key, LOCK_WAITS, REFRESHED
+from portal.utils import metrics
 from requests.exceptions import RequestException, HTTPError
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -27,13 +31,17 @@ class TestAgaveOAuthMiddleware(TransactionTestCase):
         self.mock_get_user = self.get_user_patcher.start()
         self.mock_get_user.return_value = MagicMock(
             is_authenticated=lambda: True,
-            username="MOCK_USER"
+            username="MOCK_USER",
+            pk=1
         )
+        middleware._token_expiry.clear()
+        cache.clear()
 
-        # Mock the atomically retrieved AgaveOAuthToken object
-        self.mock_agave_oauth = MagicMock()
+        # Mock the retrieved AgaveOAuthToken object, both with and without a row lock
+        self.mock_agave_oauth = MagicMock(created=time.time(), expires_in=14400)
         self.AgaveOAuthToken_patcher = patch('portal.apps.auth.middleware.AgaveOAuthToken.objects')
         self.mock_AgaveOAuthToken = self.AgaveOAuthToken_patcher.start()
+        self.mock_AgaveOAuthToken.get.return_value = self.mock_agave_oauth
         self.mock_AgaveOAuthToken.filter.return_value.select_for_update.return_value.get.return_value = \
             self.mock_agave_oauth
 
@@ -51,11 +59,43 @@ class TestAgaveOAuthMiddleware(TransactionTestCase):
         response = self.middleware.__call__(self.request)
         self.assertEquals(response, "MOCK_RESPONSE")
 
+    def test_fresh_token_is_not_read_again(self):
+        self.mock_agave_oauth.expired = False
+        self.middleware.__call__(self.request)
+        self.middleware.__call__(self.request)
+        self.mock_AgaveOAuthToken.get.assert_called_once()
+        self.mock_AgaveOAuthToken.filter.assert_not_called()
+
     def test_expired_user(self):
         self.mock_agave_oauth.expired = True
         response = self.middleware.__call__(self.request)
         self.assertEquals(response, "MOCK_RESPONSE")
         self.mock_agave_oauth.client.token.refresh.assert_called_with()
+        self.assertEqual(metrics.get_counters(REFRESHED)[REFRESHED], 1)
+        self.assertIsNone(cache.get(refresh_lock_key(self.mock_get_user.return_value)))
+
+    def test_expired_user_waits_for_refresh(self):
+        # Another request is refreshing the token, which is about to
+        # expire but still valid.
+        self.mock_agave_oauth.expired = True
+        self.mock_agave_oauth.created = time.time() - 14000
+        cache.set(refresh_lock_key(self.mock_get_user.return_value), True)
+
+        response = self.middleware.__call__(self.request)
+
+        self.assertEquals(response, "MOCK_RESPONSE")
+        self.mock_agave_oauth.client.token.refresh.assert_not_called()
+        self.assertEqual(metrics.get_counters(LOCK_WAITS)[LOCK_WAITS], 1)
+
+    def test_expired_user_refresh_by_other_request_failed(self):
+        self.mock_agave_oauth.expired = True
+        self.mock_agave_oauth.created = time.time() - 15000
+        cache.set(refresh_lock_key(self.mock_get_user.return_value), True)
+
+        response = self.middleware.__call__(self.request)
+
+        self.assertEquals(response.status_code, 401)
+        self.mock_logout.assert_called_with(self.request)
 
     def test_refresh_error(self):
         self.mock_agave_oauth.expired = True
@@ -64,14 +104,13 @@ class TestAgaveOAuthMiddleware(TransactionTestCase):
         self.assertEquals(response.status_code, 401)
         self.mock_logout.assert_called_with(self.request)
 
-    @patch('portal.apps.auth.middleware.transaction')
-    def test_logouts(self, mock_transaction):
-        mock_transaction.atomic.side_effect = RequestException
+    def test_logouts(self):
+        self.mock_AgaveOAuthToken.get.side_effect = RequestException
         response = self.middleware.__call__(self.request)
         self.assertEquals(response.status_code, 401)
         self.mock_logout.assert_called_with(self.request)
 
-        mock_transaction.atomic.side_effect = ObjectDoesNotExist
+        self.mock_AgaveOAuthToken.get.side_effect = ObjectDoesNotExist
         response = self.middleware.__call__(self.request)
         self.assertEquals(response.status_code, 401)
         self.mock_logout.assert_called_with(self.request)
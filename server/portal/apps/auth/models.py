@@ -6,8 +6,7 @@ import requests
 from requests import HTTPError
 from django.db import models
 from django.conf import settings
-from agavepy.agave import Agave
-from agavepy import agave
+from portal.libs.agave.clients import user_client
 
 #pylint: disable=invalid-name
 logger = logging.getLogger(__name__)
@@ -15,7 +14,6 @@ logger = logging.getLogger(__name__)
 
 
 TOKEN_EXPIRY_THRESHOLD = 600
-AGAVE_RESOURCES = agave.load_resource(getattr(settings, 'AGAVE_TENANT_BASEURL'))
 
 
 class AgaveOAuthToken(models.Model):
@@ -87,19 +85,13 @@ class AgaveOAuthToken(models.Model):
     def client(self):
         """Agave client.
 
+        Clients are cached per user for the lifetime of the current thread and
+        share pooled connections to the tenant.
+
         :return: Agave client using refresh token.
         :rtype: :class:Agave
         """
-        return Agave(
-            api_server=getattr(settings, 'AGAVE_TENANT_BASEURL'),
-            api_key=getattr(settings, 'AGAVE_CLIENT_KEY'),
-            api_secret=getattr(settings, 'AGAVE_CLIENT_SECRET'),
-            token=self.access_token,
-            resources=AGAVE_RESOURCES,
-            refresh_token=self.refresh_token,
-            token_callback=self.update,
-            token_username=self.user.username
-        )
+        return user_client(self)
 
     def update(self, **kwargs):
         """Update and save.
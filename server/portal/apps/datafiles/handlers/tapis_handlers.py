@@ -1,4 +1,5 @@
 from portal.libs.agave import operations
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 import logging
 
@@ -18,6 +19,8 @@ allowed_actions = {
 def tapis_get_handler(client, scheme, system, path, operation, **kwargs):
     if operation not in allowed_actions[scheme]:
         raise PermissionDenied
+    if operation == 'listing' and scheme in settings.PORTAL_INDEX_FIRST_LISTING_SCHEMES:
+        operation = 'indexed_listing'
     op = getattr(operations, operation)
     return op(client, system, path, **kwargs)
 
@@ -0,0 +1,25 @@
+import pytest
+from mock import MagicMock
+from portal.apps.datafiles.handlers.tapis_handlers import tapis_get_handler
+
+
+@pytest.fixture
+def mock_operations(mocker):
+    yield mocker.patch(
+        'portal.apps.datafiles.handlers.tapis_handlers.operations')
+
+
+def test_get_handler(mock_operations):
+    client = MagicMock()
+    tapis_get_handler(client, 'public', 'test.system', '/path', 'listing', offset='0')
+    mock_operations.listing.assert_called_with(client, 'test.system', '/path', offset='0')
+
+
+def test_get_handler_index_first(mock_operations, settings):
+    settings.PORTAL_INDEX_FIRST_LISTING_SCHEMES = ['public', 'community']
+    client = MagicMock()
+    tapis_get_handler(client, 'public', 'test.system', '/path', 'listing')
+    mock_operations.indexed_listing.assert_called_with(client, 'test.system', '/path')
+
+    tapis_get_handler(client, 'private', 'test.system', '/path', 'listing')
+    mock_operations.listing.assert_called_with(client, 'test.system', '/path')
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('datafiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolderTransfer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('src_api', models.CharField(max_length=32)),
+                ('dest_api', models.CharField(max_length=32)),
+                ('src_system', models.TextField()),
+                ('dest_system', models.TextField()),
+                ('src_path', models.TextField()),
+                ('dest_path', models.TextField()),
+                ('dirname', models.TextField()),
+                ('dest_path_name', models.TextField(default='')),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FolderTransferItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('src_path', models.TextField()),
+                ('name', models.TextField()),
+                ('is_dir', models.BooleanField(default=False)),
+                ('length', models.BigIntegerField(null=True)),
+                ('parent_dest_path', models.TextField()),
+                ('dest_path', models.TextField(default='')),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('error', models.TextField(default='')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='datafiles.FolderTransfer')),
+            ],
+            options={
+                'unique_together': {('job', 'src_path')},
+                'index_together': {('job', 'is_dir', 'status')},
+            },
+        ),
+    ]
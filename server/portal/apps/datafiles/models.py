@@ -2,6 +2,8 @@
 .. :module:: apps.accounts.managers.models
    :synopsis: Account's models
 """
+import os
+from django.conf import settings
 from django.db import models
 
 
@@ -19,3 +21,84 @@ class Link(models.Model):
             'postit_url': self.postit_url,
             'updated': str(self.updated),
         }
+
+
+class FolderTransfer(models.Model):
+    """A folder being copied between two APIs (e.g. Google Drive to Tapis)
+    in the background by :func:`portal.apps.datafiles.tasks.transfer_folder_job`.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    src_api = models.CharField(max_length=32)
+    dest_api = models.CharField(max_length=32)
+    src_system = models.TextField()
+    dest_system = models.TextField()
+    src_path = models.TextField()
+    dest_path = models.TextField()
+    dirname = models.TextField()
+    # Display path of the destination, used in notifications.
+    dest_path_name = models.TextField(default='')
+    status = models.CharField(max_length=16, default=PENDING)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def file_info(self):
+        """Tapis-like info about the destination folder, for toast notifications."""
+        return {
+            'nativeFormat': 'dir',
+            'name': self.dirname,
+            'path': os.path.join(self.dest_path_name, self.dirname),
+            'systemId': self.dest_system
+        }
+
+    def to_dict(self):
+        items = self.items.filter(is_dir=False)
+        done = items.filter(status=FolderTransferItem.DONE)
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'files': items.count(),
+            'transferred': done.count(),
+            'bytes': done.aggregate(total=models.Sum('length'))['total'] or 0,
+            'failed': items.filter(status=FolderTransferItem.FAILED).count(),
+            'created': str(self.created),
+            'updated': str(self.updated),
+        }
+
+
+class FolderTransferItem(models.Model):
+    """A file or folder found under the source of a FolderTransfer. Items are
+    recorded as the source tree is enumerated and marked done as they are
+    transferred, so that a failed transfer can be resumed.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    job = models.ForeignKey(
+        FolderTransfer,
+        related_name='items',
+        on_delete=models.CASCADE
+    )
+    src_path = models.TextField()
+    name = models.TextField()
+    is_dir = models.BooleanField(default=False)
+    length = models.BigIntegerField(null=True)
+    # Destination folder the item is transferred into.
+    parent_dest_path = models.TextField()
+    # Path (or ID, for Google Drive) of the folder created for a directory.
+    dest_path = models.TextField(default='')
+    status = models.CharField(max_length=16, default=PENDING)
+    error = models.TextField(default='')
+
+    class Meta:
+        unique_together = ('job', 'src_path')
+        index_together = ('job', 'is_dir', 'status')
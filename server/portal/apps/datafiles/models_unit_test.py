@@ -1,4 +1,4 @@
-from portal.apps.datafiles.models import Link
+from portal.apps.datafiles.models import Link, FolderTransfer, FolderTransferItem
 import pytest
 
 
@@ -9,3 +9,20 @@ def test_link_uuid():
         postit_url="https://tenant/postits/v2/listing/uuid"
     )
     assert link.get_uuid() == "uuid"
+
+
+@pytest.mark.django_db
+def test_folder_transfer_to_dict(regular_user):
+    job = FolderTransfer.objects.create(
+        user=regular_user, src_api='googledrive', dest_api='tapis',
+        src_system='googledrive', dest_system='mock.system', src_path='folderid',
+        dest_path='/path', dirname='dir'
+    )
+    FolderTransferItem.objects.create(job=job, src_path='folderid', name='dir', is_dir=True,
+                                      status=FolderTransferItem.DONE)
+    FolderTransferItem.objects.create(job=job, src_path='fileid1', name='file1', length=10,
+                                      status=FolderTransferItem.DONE)
+    FolderTransferItem.objects.create(job=job, src_path='fileid2', name='file2', length=20,
+                                      status=FolderTransferItem.FAILED)
+    result = job.to_dict()
+    assert (result['files'], result['transferred'], result['bytes'], result['failed']) == (2, 1, 10, 1)
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from celery import shared_task
+from django.conf import settings
+from django.db import connections
+from portal.apps.datafiles.models import FolderTransfer, FolderTransferItem
+from portal.apps.datafiles.utils import notify, notify_progress, CLIENT_MAPPINGS
+from portal.libs.transfer.operations import api_mapping, transfer
+
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+
+
+def enumerate_folder(job, src_client, dest_client):
+    """Create the destination folders of a folder transfer and record every
+    file to be transferred. Folders are marked done once their listing is
+    recorded, so enumeration picks up where it stopped when resumed.
+    """
+    _iterate_listing = api_mapping()[job.src_api]['iterate_listing']
+    _mkdir = api_mapping()[job.dest_api]['mkdir']
+
+    FolderTransferItem.objects.get_or_create(
+        job=job, src_path=job.src_path,
+        defaults={'name': job.dirname, 'is_dir': True,
+                  'parent_dest_path': job.dest_path})
+
+    pending = job.items.filter(is_dir=True, status=FolderTransferItem.PENDING)
+    folder = pending.order_by('id').first()
+    while folder is not None:
+        if not folder.dest_path:
+            newdir = _mkdir(dest_client, job.dest_system, folder.parent_dest_path, folder.name)
+            folder.dest_path = newdir['path']
+            folder.save(update_fields=['dest_path'])
+        for f in _iterate_listing(src_client, job.src_system, folder.src_path):
+            FolderTransferItem.objects.get_or_create(
+                job=job, src_path=f['path'],
+                defaults={'name': f['name'],
+                          'is_dir': f['format'] == 'folder',
+                          'length': f.get('length'),
+                          'parent_dest_path': folder.dest_path})
+        folder.status = FolderTransferItem.DONE
+        folder.save(update_fields=['status'])
+        folder = pending.order_by('id').first()
+
+
+def fail(job):
+    job.status = FolderTransfer.FAILED
+    job.save(update_fields=['status', 'updated'])
+    notify(job.user.username, 'copy', 'error', {'response': dict(job.file_info(), job=job.to_dict())})
+
+
+@shared_task(bind=True, max_retries=3, queue='files', retry_backoff=True)
+def transfer_folder_job(self, job_id):
+    """
+    Copy a folder between APIs in the background. Files are transferred by
+    a pool of settings.PORTAL_TRANSFER_CONCURRENCY threads, and the state of
+    every file is kept in FolderTransferItem so that a retried or re-queued
+    job only transfers what is left. Progress is sent to the user at most
+    once every settings.PORTAL_TRANSFER_PROGRESS_INTERVAL seconds, and only
+    the outcome is saved as a notification.
+    """
+    job = FolderTransfer.objects.select_related('user').get(pk=job_id)
+    user = job.user
+    src_token = getattr(user, CLIENT_MAPPINGS[job.src_api])
+    dest_token = getattr(user, CLIENT_MAPPINGS[job.dest_api])
+
+    job.status = FolderTransfer.RUNNING
+    job.save(update_fields=['status', 'updated'])
+
+    try:
+        enumerate_folder(job, src_token.client, dest_token.client)
+    except Exception as exc:
+        logger.error('Error enumerating folder transfer {}'.format(job_id))
+        if self.request.retries >= self.max_retries:
+            fail(job)
+        raise self.retry(exc=exc)
+
+    # Clients are not thread-safe, so each worker builds its own.
+    local = threading.local()
+
+    def transfer_item(item):
+        try:
+            if not hasattr(local, 'src_client'):
+                local.src_client = src_token.client
+                local.dest_client = dest_token.client
+            transfer(local.src_client, local.dest_client, job.src_api,
+                     job.dest_api, job.src_system, job.dest_system,
+                     item.src_path, item.parent_dest_path)
+        finally:
+            connections.close_all()
+
+    files = job.items.filter(is_dir=False).exclude(status=FolderTransferItem.DONE)
+    last_notified = time.time()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=settings.PORTAL_TRANSFER_CONCURRENCY) as executor:
+        futures = {executor.submit(transfer_item, item): item for item in files}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                future.result()
+                item.status = FolderTransferItem.DONE
+                item.error = ''
+            except Exception as exc:
+                logger.exception('Error transferring {} in folder transfer {}'.format(item.src_path, job_id))
+                item.status = FolderTransferItem.FAILED
+                item.error = str(exc)
+                failed += 1
+            item.save(update_fields=['status', 'error'])
+
+            if time.time() - last_notified >= settings.PORTAL_TRANSFER_PROGRESS_INTERVAL:
+                last_notified = time.time()
+                progress = job.to_dict()
+                notify_progress(user.username, 'transfer', {'response': dict(
+                    job.file_info(), transferred=progress['transferred'], total=progress['files'], job=progress)})
+
+    if failed:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=Exception('{} files failed to transfer'.format(failed)))
+        fail(job)
+        return job.to_dict()
+
+    job.status = FolderTransfer.FINISHED
+    job.save(update_fields=['status', 'updated'])
+    METRICS.info('user:{} op:transfer_folder job:{} src_api:{} dest_api:{} files:{}'.format(
+        user.username, job_id, job.src_api, job.dest_api, job.items.filter(is_dir=False).count()))
+    notify(user.username, 'copy', 'success', {'response': job.file_info()})
+    return job.to_dict()
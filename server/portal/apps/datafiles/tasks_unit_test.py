@@ -0,0 +1,109 @@
+import pytest
+from portal.apps.datafiles.models import FolderTransfer, FolderTransferItem
+from portal.apps.datafiles.tasks import enumerate_folder, transfer_folder_job
+from portal.apps.notifications.models import Notification
+
+pytestmark = pytest.mark.django_db
+
+TREE = {
+    '/src/dir': [{'path': '/src/dir/a.txt', 'name': 'a.txt', 'format': 'raw', 'length': 3},
+                 {'path': '/src/dir/sub', 'name': 'sub', 'format': 'folder'}],
+    '/src/dir/sub': [{'path': '/src/dir/sub/b.txt', 'name': 'b.txt', 'format': 'raw', 'length': 5}]
+}
+
+
+@pytest.fixture
+def folder_transfer(regular_user):
+    yield FolderTransfer.objects.create(
+        user=regular_user,
+        src_api='tapis',
+        dest_api='tapis',
+        src_system='src.system',
+        dest_system='dest.system',
+        src_path='/src/dir',
+        dest_path='/dest',
+        dirname='dir',
+        dest_path_name='My Data'
+    )
+
+
+@pytest.fixture
+def mock_api(mocker):
+    mock_mkdir = mocker.MagicMock(
+        side_effect=lambda client, system, path, dirname: {'path': '{}/{}'.format(path, dirname)})
+    mock_listing = mocker.MagicMock(side_effect=lambda client, system, path: iter(TREE[path]))
+    mocker.patch('portal.apps.datafiles.tasks.api_mapping', return_value={
+        'tapis': {'mkdir': mock_mkdir, 'iterate_listing': mock_listing}
+    })
+    yield mock_mkdir, mock_listing
+
+
+def test_enumerate_folder(folder_transfer, mock_api):
+    mock_mkdir, _ = mock_api
+    enumerate_folder(folder_transfer, None, None)
+
+    assert [call[0][2:] for call in mock_mkdir.call_args_list] == [('/dest', 'dir'), ('/dest/dir', 'sub')]
+    files = folder_transfer.items.filter(is_dir=False).order_by('src_path')
+    assert [(f.src_path, f.parent_dest_path) for f in files] == [
+        ('/src/dir/a.txt', '/dest/dir'), ('/src/dir/sub/b.txt', '/dest/dir/sub')]
+    assert not folder_transfer.items.filter(status=FolderTransferItem.PENDING, is_dir=True).exists()
+
+
+def test_enumerate_folder_resumes(folder_transfer, mock_api):
+    mock_mkdir, mock_listing = mock_api
+    enumerate_folder(folder_transfer, None, None)
+    mock_mkdir.reset_mock()
+    mock_listing.reset_mock()
+
+    enumerate_folder(folder_transfer, None, None)
+    mock_mkdir.assert_not_called()
+    mock_listing.assert_not_called()
+    assert folder_transfer.items.count() == 4
+
+
+def test_transfer_folder_job(folder_transfer, mock_api, mocker):
+    mock_transfer = mocker.patch('portal.apps.datafiles.tasks.transfer')
+    result = transfer_folder_job(folder_transfer.pk)
+
+    transferred = sorted((call[0][6], call[0][7]) for call in mock_transfer.call_args_list)
+    assert transferred == [('/src/dir/a.txt', '/dest/dir'), ('/src/dir/sub/b.txt', '/dest/dir/sub')]
+    assert result['status'] == FolderTransfer.FINISHED
+    assert result['transferred'] == 2
+    assert result['bytes'] == 8
+    notification = Notification.objects.get(user='username', operation='copy')
+    assert notification.status == Notification.SUCCESS
+    assert notification.extra_content['response']['path'] == 'My Data/dir'
+
+
+def test_transfer_folder_job_progress_is_not_saved(folder_transfer, mock_api, mocker, settings):
+    mocker.patch('portal.apps.datafiles.tasks.transfer')
+    mock_progress = mocker.patch('portal.apps.datafiles.tasks.notify_progress')
+    settings.PORTAL_TRANSFER_PROGRESS_INTERVAL = 0
+    transfer_folder_job(folder_transfer.pk)
+
+    assert [call[0][2]['response']['transferred'] for call in mock_progress.call_args_list] == [1, 2]
+    assert mock_progress.call_args[0][2]['response']['total'] == 2
+    assert list(Notification.objects.filter(user='username').values_list('operation', flat=True)) == ['copy']
+
+
+def test_transfer_folder_job_only_transfers_remaining_files(folder_transfer, mock_api, mocker):
+    enumerate_folder(folder_transfer, None, None)
+    folder_transfer.items.filter(src_path='/src/dir/a.txt').update(status=FolderTransferItem.DONE)
+    mock_transfer = mocker.patch('portal.apps.datafiles.tasks.transfer')
+
+    transfer_folder_job(folder_transfer.pk)
+
+    assert [call[0][6] for call in mock_transfer.call_args_list] == ['/src/dir/sub/b.txt']
+
+
+def test_transfer_folder_job_retries_failed_files(folder_transfer, mock_api, mocker):
+    mocker.patch('portal.apps.datafiles.tasks.transfer', side_effect=Exception('transfer failed'))
+    mock_retry = mocker.patch.object(transfer_folder_job, 'retry', side_effect=Exception('retry'))
+
+    with pytest.raises(Exception):
+        transfer_folder_job(folder_transfer.pk)
+
+    mock_retry.assert_called_once()
+    failed = folder_transfer.items.filter(status=FolderTransferItem.FAILED)
+    assert failed.count() == 2
+    assert failed.first().error == 'transfer failed'
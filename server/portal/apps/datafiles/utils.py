@@ -1,5 +1,12 @@
+import logging
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
 from portal.apps.notifications.models import Notification
 
+logger = logging.getLogger(__name__)
+
 NOTIFY_ACTIONS = ['move',
                   'copy',
                   'rename',
@@ -8,6 +15,14 @@ NOTIFY_ACTIONS = ['move',
                   'upload',
                   'makepublic']
 
+CLIENT_MAPPINGS = {
+    'tapis': 'agave_oauth',
+    'shared': 'agave_oauth',
+    'googledrive': 'googledrive_user_token',
+    'box': 'box_user_token',
+    'dropbox': 'dropbox_user_token'
+}
+
 
 def notify(username, operation, status, extra):
     event_data = {
@@ -19,3 +34,53 @@ def notify(username, operation, status, extra):
         Notification.READ: True
     }
     Notification.objects.create(**event_data)
+
+
+def notify_progress(username, operation, extra):
+    """Send the progress of an operation to the user's websocket clients as a
+    'data_files_progress' event. Unlike :func:`notify`, progress is not saved
+    as a notification, so it is only seen by clients connected at the time.
+
+    :param str username: User to notify.
+    :param str operation: Operation in progress, e.g. 'transfer'.
+    :param dict extra: Tapis-like info about the operation's file.
+    """
+    message = {
+        'type': 'portal_notification',
+        'body': {
+            'event_type': 'data_files_progress',
+            'status': Notification.INFO,
+            'operation': operation,
+            'extra': extra
+        }
+    }
+    try:
+        async_to_sync(get_channel_layer().group_send)(username, message)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Unable to send {} progress to {}'.format(operation, username))
+
+
+def transfer_progress(username, file_info):
+    """Build a progress callback for a streaming transfer which sends its
+    progress to the user at most once every
+    settings.PORTAL_TRANSFER_PROGRESS_INTERVAL seconds, and when the transfer
+    completes.
+
+    :param str username: User to notify.
+    :param dict file_info: Tapis-like info about the transferred file.
+    """
+    last_notified = [time.time()]
+
+    def progress(transferred, total):
+        now = time.time()
+        if transferred != total and now - last_notified[0] < settings.PORTAL_TRANSFER_PROGRESS_INTERVAL:
+            return
+        last_notified[0] = now
+        notify_progress(username, 'transfer',
+                        {'response': dict(file_info, transferred=transferred, total=total)})
+
+    return progress
+
+
+def get_client(user, api):
+    return getattr(user, CLIENT_MAPPINGS[api]).client
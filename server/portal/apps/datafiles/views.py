@@ -16,12 +16,13 @@ from portal.apps.datafiles.handlers.tapis_handlers import (tapis_get_handler,
 from portal.apps.datafiles.handlers.googledrive_handlers import \
     (googledrive_get_handler,
      googledrive_put_handler)
-from portal.libs.transfer.operations import transfer, transfer_folder
+from portal.libs.transfer.operations import transfer
 from portal.exceptions.api import ApiException
-from portal.apps.datafiles.models import Link
+from portal.apps.datafiles.models import Link, FolderTransfer
+from portal.apps.datafiles.tasks import transfer_folder_job
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from .utils import notify, NOTIFY_ACTIONS
+from .utils import notify, transfer_progress, get_client, NOTIFY_ACTIONS
 
 logger = logging.getLogger(__name__)
 METRICS = logging.getLogger('metrics.{}'.format(__name__))
@@ -196,37 +197,42 @@ class GoogleDriveFilesView(BaseApiView):
         return JsonResponse({"data": response})
 
 
-def get_client(user, api):
-    client_mappings = {
-        'tapis': 'agave_oauth',
-        'shared': 'agave_oauth',
-        'googledrive': 'googledrive_user_token',
-        'box': 'box_user_token',
-        'dropbox': 'dropbox_user_token'
-    }
-    return getattr(user, client_mappings[api]).client
-
-
 class TransferFilesView(BaseApiView):
     def put(self, request, filetype):
         body = json.loads(request.body)
 
+        if filetype == 'dir':
+            # Folders are transferred in the background, which notifies the
+            # user of progress and completion.
+            job = FolderTransfer.objects.create(
+                user=request.user,
+                src_api=body['src_api'],
+                dest_api=body['dest_api'],
+                src_system=body['src_system'],
+                dest_system=body['dest_system'],
+                src_path=body['src_path'],
+                dest_path=body['dest_path'],
+                dirname=body['dirname'],
+                dest_path_name=body.get('dest_path_name', '')
+            )
+            transfer_folder_job.apply_async(args=[job.pk])
+            return JsonResponse({'success': True, 'job': job.to_dict()})
+
         src_client = get_client(request.user, body['src_api'])
         dest_client = get_client(request.user, body['dest_api'])
 
+        # Respond with tapis-like info for a toast notification
+        file_info = {
+            'nativeFormat': filetype,
+            'name': body['dirname'],
+            'path': os.path.join(body['dest_path_name'], body['dirname']),
+            'systemId': body['dest_system']
+        }
+        progress = transfer_progress(request.user.username, file_info)
+
         try:
-            if filetype == 'dir':
-                transfer_folder(src_client, dest_client, **body)
-            else:
-                transfer(src_client, dest_client, **body)
-
-            # Respond with tapis-like info for a toast notification
-            file_info = {
-                'nativeFormat': filetype,
-                'name': body['dirname'],
-                'path': os.path.join(body['dest_path_name'], body['dirname']),
-                'systemId': body['dest_system']
-            }
+            transfer(src_client, dest_client, progress=progress, **body)
+
             notify(request.user.username, 'copy', 'success', {'response': file_info})
             return JsonResponse({'success': True})
         except Exception as exc:
@@ -3,7 +3,7 @@ import json
 import logging
 from mock import MagicMock
 from requests.exceptions import HTTPError
-from portal.apps.datafiles.models import Link
+from portal.apps.datafiles.models import Link, FolderTransfer
 from portal.apps.notifications.models import Notification
 
 pytestmark = pytest.mark.django_db
@@ -248,3 +248,34 @@ def test_tapis_file_view_preview_other_text_file(client, authenticated_user, moc
                           data={"href": "https//tapis.example/href"})
     assert response.status_code == 200
     assert response.json() == {"data": {"href": POSTIT_HREF, "fileType": "other", "content": "file content", "error": None}}
+
+
+def test_transfer_progress_notifications(regular_user, mocker, settings):
+    from portal.apps.datafiles.utils import transfer_progress
+    mock_channel_layer = mocker.patch('portal.apps.datafiles.utils.get_channel_layer')
+    mocker.patch('portal.apps.datafiles.utils.async_to_sync', side_effect=lambda f: f)
+    settings.PORTAL_TRANSFER_PROGRESS_INTERVAL = 60
+    progress = transfer_progress(regular_user.username, {'name': 'file.txt'})
+
+    progress(10, 100)
+    progress(100, 100)
+
+    mock_channel_layer.return_value.group_send.assert_called_once()
+    group, message = mock_channel_layer.return_value.group_send.call_args[0]
+    assert group == regular_user.username
+    assert message['body']['event_type'] == 'data_files_progress'
+    assert message['body']['extra']['response']['transferred'] == 100
+    assert not Notification.objects.filter(user=regular_user.username).exists()
+
+
+def test_transfer_folder_queues_job(client, authenticated_user, mocker):
+    mock_job = mocker.patch('portal.apps.datafiles.views.transfer_folder_job')
+    response = client.put('/api/datafiles/transfer/dir/', content_type='application/json', data={
+        'src_api': 'googledrive', 'dest_api': 'tapis', 'src_system': 'googledrive',
+        'dest_system': 'frontera.home.username', 'src_path': 'folderid', 'dest_path': '/',
+        'dirname': 'dir', 'dest_path_name': 'My Data'
+    })
+    assert response.status_code == 200
+    job = FolderTransfer.objects.get(user=authenticated_user)
+    assert response.json()['job']['id'] == job.pk
+    mock_job.apply_async.assert_called_once_with(args=[job.pk])
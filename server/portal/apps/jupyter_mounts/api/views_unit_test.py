@@ -5,7 +5,7 @@ import json
 
 @pytest.fixture
 def service_account(mocker):
-    mock = mocker.patch('portal.apps.jupyter_mounts.api.views.service_account')
+    mock = mocker.patch('portal.apps.jupyter_mounts.manifest.service_account')
     mock.return_value.systems.get.return_value = {
         "storage": {
             "rootDir": "/path/to/community"
@@ -16,7 +16,7 @@ def service_account(mocker):
 
 @pytest.fixture
 def mock_manager(mocker):
-    mock = mocker.patch('portal.apps.jupyter_mounts.api.views.UserSystemsManager')
+    mock = mocker.patch('portal.apps.jupyter_mounts.manifest.UserSystemsManager')
     mock.return_value.get_sys_tas_user_dir.return_value = "/12345/username"
     mock.return_value.get_name.return_value = "mock_name"
     yield mock
@@ -24,7 +24,7 @@ def mock_manager(mocker):
 
 @pytest.fixture
 def mock_projects(mocker):
-    mock = mocker.patch('portal.apps.jupyter_mounts.api.views.ProjectsManager')
+    mock = mocker.patch('portal.apps.jupyter_mounts.manifest.ProjectsManager')
     project1 = MagicMock()
     project1.description = "test"
     project1.storage = MagicMock(id="cep.project-1")
@@ -87,3 +87,11 @@ def test_get(authenticated_user, client, service_account, mock_manager, mock_pro
         }
     ]
     assert json.loads(result.content) == expected
+
+
+def test_get_cached(authenticated_user, client, service_account, mock_manager, mock_projects):
+    first = client.get('/api/jupyter_mounts/')
+    second = client.get('/api/jupyter_mounts/')
+    assert json.loads(second.content) == json.loads(first.content)
+    assert mock_projects.return_value.list.call_count == 1
+    assert service_account.return_value.systems.get.call_count == 2
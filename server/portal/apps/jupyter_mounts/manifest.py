@@ -0,0 +1,259 @@
+"""
+.. :module:: apps.jupyter_mounts.manifest
+   :synopsis: Cached per-user JupyterHub mount manifest
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from portal.libs.agave.utils import service_account
+from portal.apps.accounts.managers.user_systems import UserSystemsManager
+from portal.apps.projects.managers.base import ProjectsManager
+from portal.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+DATAFILES_MOUNTS_KEY = 'jupyter_mounts:datafiles'
+# Seconds a queued rebuild of a user's manifest keeps further rebuilds from
+# being queued, in case the task is lost.
+REBUILD_LOCK_TIMEOUT = 60
+
+HIT = 'jupyter_mounts.manifest.hit'
+STALE = 'jupyter_mounts.manifest.stale'
+MISS = 'jupyter_mounts.manifest.miss'
+
+
+def manifest_key(username):
+    return 'jupyter_mounts:manifest:{}'.format(username)
+
+
+def rebuild_lock_key(username):
+    return 'jupyter_mounts:rebuild:{}'.format(username)
+
+
+def _run(func, *args):
+    """Run a lookup in a worker thread, closing any database connections it
+    opened.
+    """
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def get_datafiles_mount(agave, system):
+    """Mount definition of a datafiles storage system.
+
+    :param agave: Agave client
+    :param dict system: Entry of settings.PORTAL_DATAFILES_STORAGE_SYSTEMS
+
+    :returns: Mount definition
+    :rtype: dict
+    """
+    sys_def = agave.systems.get(systemId=system['system'])
+    return {
+        "path": sys_def["storage"]["rootDir"],
+        "mountPath": "/{namespace}/{name}".format(
+            namespace=settings.PORTAL_NAMESPACE,
+            name=system['name']
+        ),
+        "pems": "ro"
+    }
+
+
+def get_local_mount(user, system):
+    """Mount definition of a user's local storage system.
+
+    :param user: Django user instance
+    :param str system: Key of settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS
+
+    :returns: Mount definition
+    :rtype: dict
+    """
+    sys_def = UserSystemsManager(user, system_name=system)
+    return {
+        "path": sys_def.get_sys_tas_user_dir(),
+        "mountPath": "/{namespace}/{name}".format(
+            namespace=settings.PORTAL_NAMESPACE,
+            name=sys_def.get_name()
+        ),
+        "pems": "rw"
+    }
+
+
+def get_project_mounts(user):
+    """Mount definitions of the projects a user is a member of.
+
+    :param user: Django user instance
+
+    :returns: Mount definitions
+    :rtype: list
+    """
+    mgr = ProjectsManager(user)
+    projects = mgr.list()
+    result = []
+    names = []
+    for project in projects:
+        name = project.description
+        # Resolve project name collisions
+        if any([existing == name for existing in names]):
+            name = "{name} ({id})".format(name=project.description, id=project.storage.id)
+        names.append(name)
+
+        # Find a matching role, or return None
+        role = next(
+            (role.role for role in project.roles.roles if role.username == user.username),
+            None
+        )
+        if role == "OWNER" or role == "ADMIN":
+            permissions = "rw"
+        elif role == "GUEST":
+            permissions = "ro"
+        else:
+            permissions = "ro"
+
+        result.append(
+            {
+                "path": project.absolute_path,
+                "mountPath": "/{namespace}/My Projects/{name}".format(
+                    namespace=settings.PORTAL_NAMESPACE,
+                    name=name),
+                "pems": permissions
+            }
+        )
+    return result
+
+
+def build_mounts(user):
+    """Build a user's mount definitions. The datafiles systems, local storage
+    systems and project listing are looked up concurrently, in up to
+    settings.PORTAL_JUPYTER_MOUNTS_CONCURRENCY threads. The datafiles system
+    mounts are the same for every user, and are shared between manifests for
+    settings.PORTAL_JUPYTER_MOUNTS_FRESHNESS seconds.
+
+    :param user: Django user instance
+
+    :returns: Mount definitions, and whether every lookup succeeded
+    :rtype: tuple(list, bool)
+    """
+    datafiles = cache.get(DATAFILES_MOUNTS_KEY)
+    # Systems without a system id, such as Shared Workspaces, have no
+    # single root directory to mount.
+    datafiles_systems = [] if datafiles is not None else [
+        system for system in settings.PORTAL_DATAFILES_STORAGE_SYSTEMS
+        if system['api'] == 'tapis' and 'system' in system
+    ]
+    local_systems = list(settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS.keys())
+
+    with ThreadPoolExecutor(max_workers=settings.PORTAL_JUPYTER_MOUNTS_CONCURRENCY) as executor:
+        agave = service_account() if datafiles_systems else None
+        datafiles_futures = [
+            (system, executor.submit(_run, get_datafiles_mount, agave, system))
+            for system in datafiles_systems
+        ]
+        local_futures = [
+            (system, executor.submit(_run, get_local_mount, user, system))
+            for system in local_systems
+        ]
+        projects_future = executor.submit(_run, get_project_mounts, user)
+
+        complete = True
+        if datafiles is None:
+            datafiles = []
+            for system, future in datafiles_futures:
+                try:
+                    datafiles.append(future.result())
+                except Exception:
+                    logger.exception("Could not retrieve system {}".format(system))
+                    complete = False
+            if complete:
+                cache.set(DATAFILES_MOUNTS_KEY, datafiles, settings.PORTAL_JUPYTER_MOUNTS_FRESHNESS)
+
+        local = []
+        for system, future in local_futures:
+            try:
+                local.append(future.result())
+            except Exception:
+                logger.exception("Could not retrieve system {}".format(system))
+                complete = False
+
+        try:
+            projects = projects_future.result()
+        except Exception:
+            logger.exception("Could not list projects of {}".format(user.username))
+            projects = []
+            complete = False
+
+    return datafiles + local + projects, complete
+
+
+def refresh_manifest(user):
+    """Rebuild and cache a user's mount manifest. A manifest missing any
+    mounts that could not be looked up is cached as stale, so that it is
+    rebuilt on the next request.
+
+    :param user: Django user instance
+
+    :returns: Mount definitions
+    :rtype: list
+    """
+    mounts, complete = build_mounts(user)
+    cache.set(
+        manifest_key(user.username),
+        {'built': time.time() if complete else 0, 'mounts': mounts},
+        None
+    )
+    return mounts
+
+
+def get_mounts(user):
+    """A user's mount manifest. The manifest is rebuilt in the background
+    when the user's project memberships or storage systems change, and when
+    it is requested more than settings.PORTAL_JUPYTER_MOUNTS_FRESHNESS
+    seconds after it was built, in which case the stale manifest is returned.
+    It is only built in the request if it is not cached yet.
+
+    :param user: Django user instance
+
+    :returns: Mount definitions
+    :rtype: list
+    """
+    manifest = cache.get(manifest_key(user.username))
+    if manifest is None:
+        metrics.incr(MISS)
+        return refresh_manifest(user)
+    if time.time() - manifest['built'] > settings.PORTAL_JUPYTER_MOUNTS_FRESHNESS:
+        metrics.incr(STALE)
+        schedule_manifest_rebuild(user.username)
+    else:
+        metrics.incr(HIT)
+    return manifest['mounts']
+
+
+def schedule_manifest_rebuild(username):
+    """Queue a rebuild of a user's mount manifest once the current
+    transaction commits, unless one is already queued.
+
+    :param str username: Username
+    """
+    from portal.apps.jupyter_mounts.tasks import rebuild_manifest
+
+    def schedule():
+        if cache.add(rebuild_lock_key(username), True, REBUILD_LOCK_TIMEOUT):
+            try:
+                rebuild_manifest.apply_async(args=[username])
+            except Exception:  # pylint: disable=broad-except
+                cache.delete(rebuild_lock_key(username))
+                logger.exception('Unable to schedule mount manifest rebuild for {}'.format(username))
+    transaction.on_commit(schedule)
+
+
+def get_counters():
+    """Number of manifests served fresh, served stale and built in the
+    request.
+
+    :rtype: dict
+    """
+    return metrics.get_counters(HIT, STALE, MISS)
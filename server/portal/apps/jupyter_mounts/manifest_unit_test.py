@@ -0,0 +1,114 @@
+import time
+import pytest
+from django.core.cache import cache
+from portal.apps.jupyter_mounts import manifest
+from portal.apps.jupyter_mounts.tasks import rebuild_manifest
+from portal.apps.projects.models.metadata import ProjectMetadata
+from portal.apps.signals.receivers import rebuild_mounts_on_membership_change  # noqa: F401
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def mock_build_mounts(mocker):
+    mock = mocker.patch('portal.apps.jupyter_mounts.manifest.build_mounts')
+    mock.return_value = ([{"path": "/path", "mountPath": "/test/path", "pems": "ro"}], True)
+    yield mock
+
+
+@pytest.fixture
+def mock_schedule(mocker):
+    yield mocker.patch('portal.apps.jupyter_mounts.manifest.schedule_manifest_rebuild')
+
+
+@pytest.fixture
+def mock_rebuild_task(mocker):
+    mocker.patch('portal.apps.jupyter_mounts.manifest.transaction.on_commit', side_effect=lambda func: func())
+    yield mocker.patch('portal.apps.jupyter_mounts.tasks.rebuild_manifest')
+
+
+def test_get_mounts_builds_once(regular_user, mock_build_mounts, mock_schedule):
+    mounts = manifest.get_mounts(regular_user)
+
+    assert manifest.get_mounts(regular_user) == mounts
+    mock_build_mounts.assert_called_once_with(regular_user)
+    mock_schedule.assert_not_called()
+    assert manifest.get_counters() == {manifest.HIT: 1, manifest.STALE: 0, manifest.MISS: 1}
+
+
+def test_stale_manifest_is_served_and_rebuilt(regular_user, mock_build_mounts, mock_schedule, settings):
+    cache.set(manifest.manifest_key('username'), {
+        'built': time.time() - settings.PORTAL_JUPYTER_MOUNTS_FRESHNESS - 1,
+        'mounts': ['stale']
+    })
+
+    assert manifest.get_mounts(regular_user) == ['stale']
+    mock_build_mounts.assert_not_called()
+    mock_schedule.assert_called_once_with('username')
+
+
+def test_incomplete_manifest_is_stale(regular_user, mock_build_mounts, mock_schedule):
+    mock_build_mounts.return_value = ([], False)
+    manifest.get_mounts(regular_user)
+
+    manifest.get_mounts(regular_user)
+    mock_schedule.assert_called_once_with('username')
+
+
+def test_datafiles_mounts_are_shared(mocker, regular_user, settings):
+    service_account = mocker.patch('portal.apps.jupyter_mounts.manifest.service_account')
+    service_account.return_value.systems.get.return_value = {"storage": {"rootDir": "/path/to/community"}}
+    mocker.patch('portal.apps.jupyter_mounts.manifest.get_local_mount')
+    mocker.patch('portal.apps.jupyter_mounts.manifest.get_project_mounts', return_value=[])
+    settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS = {}
+
+    manifest.build_mounts(regular_user)
+    mounts, complete = manifest.build_mounts(regular_user)
+
+    assert complete
+    assert [mount['mountPath'] for mount in mounts] == ['/test/Community Data', '/test/Public Data']
+    assert service_account.return_value.systems.get.call_count == 2
+
+
+def test_schedule_rebuild_once(mock_rebuild_task):
+    manifest.schedule_manifest_rebuild('username')
+    manifest.schedule_manifest_rebuild('username')
+
+    mock_rebuild_task.apply_async.assert_called_once_with(args=['username'])
+
+
+def test_rebuild_releases_lock(regular_user, mock_build_mounts, mock_rebuild_task):
+    manifest.schedule_manifest_rebuild('username')
+
+    rebuild_manifest('username')
+
+    assert cache.get(manifest.manifest_key('username'))['mounts'] == mock_build_mounts.return_value[0]
+    manifest.schedule_manifest_rebuild('username')
+    assert mock_rebuild_task.apply_async.call_count == 2
+
+
+def test_membership_change_rebuilds_manifests(mocker, regular_user):
+    mocker.patch('portal.apps.signals.receivers.index_project')
+    mock_schedule = mocker.patch('portal.apps.signals.receivers.schedule_manifest_rebuild')
+    meta = ProjectMetadata.objects.create(project_id='PRJ-123', title='Project Title', owner=regular_user)
+    mock_schedule.reset_mock()
+
+    meta.team_members.add(regular_user)
+    meta.team_members.remove(regular_user)
+
+    assert mock_schedule.call_count == 2
+    mock_schedule.assert_called_with('username')
+
+
+def test_removed_pi_manifest_is_rebuilt(mocker, regular_user):
+    mocker.patch('portal.apps.signals.receivers.index_project')
+    mock_schedule = mocker.patch('portal.apps.signals.receivers.schedule_manifest_rebuild')
+    meta = ProjectMetadata.objects.create(project_id='PRJ-123', title='Project Title', owner=regular_user,
+                                          pi=regular_user)
+    mock_schedule.reset_mock()
+
+    meta.pi = None
+    meta.save()
+
+    mock_schedule.assert_called_once_with('username')
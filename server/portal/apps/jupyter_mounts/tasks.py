@@ -0,0 +1,23 @@
+import logging
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from portal.apps.jupyter_mounts.manifest import rebuild_lock_key, refresh_manifest
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, queue='api')
+def rebuild_manifest(self, username):
+    """
+    Rebuild a user's JupyterHub mount manifest. The rebuild lock is released
+    first, so changes made while the manifest is being built queue another
+    rebuild.
+    """
+    cache.delete(rebuild_lock_key(username))
+    try:
+        user = get_user_model().objects.get(username=username)
+    except get_user_model().DoesNotExist:
+        return
+    mounts = refresh_manifest(user)
+    logger.info('Rebuilt mount manifest of {} with {} mounts'.format(username, len(mounts)))
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.17 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_auto_20200218_2115'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-datetime'], name='notificatio_user_692d71_idx'),
+        ),
+    ]
@@ -82,6 +82,11 @@ class Notification(BaseNotify):
     read = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-datetime']),
+        ]
+
     def mark_read(self):
         self.read = True
         self.save()
@@ -109,3 +114,23 @@ class Broadcast(BaseNotify):
             'group': self.group
         })
         return event_data
+
+
+class OutboxMessage(models.Model):
+    """Outbox Message
+
+    A websocket message written in the same transaction as the change it
+    announces, and delivered to the channel layer off the request path by
+    :func:`portal.apps.notifications.tasks.dispatch_outbox`.
+    """
+    # Channel layer group, e.g. a username
+    group = models.CharField(max_length=150)
+    # JSON encoded message body
+    body = models.TextField()
+    created = models.DateTimeField(default=timezone.now)
+    # Failed deliveries are retried from this time on
+    available = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.IntegerField(default=0)
+
+    def __str__(self):
+        return '{group} {created}'.format(group=self.group, created=self.created)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from portal.apps.notifications.models import OutboxMessage
+from portal.utils import metrics
+
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+
+SENT = 'notifications.outbox.sent'
+RETRIED = 'notifications.outbox.retried'
+DROPPED = 'notifications.outbox.dropped'
+
+
+def queue_message(group, body):
+    """Queue a websocket message to a channel layer group. The message is
+    written to the outbox in the current transaction, and dispatched once
+    the transaction commits.
+
+    :param str group: Channel layer group, e.g. a username
+    :param dict body: Message body
+    """
+    OutboxMessage.objects.create(group=group, body=json.dumps(body, cls=DjangoJSONEncoder))
+    transaction.on_commit(schedule_dispatch)
+
+
+def schedule_dispatch():
+    try:
+        dispatch_outbox.apply_async()
+    except Exception:  # pylint: disable=broad-except
+        # The message stays in the outbox until the next scheduled dispatch.
+        logger.exception('Unable to schedule outbox dispatch')
+
+
+async def _send(messages):
+    channel_layer = get_channel_layer()
+    return await asyncio.gather(*[
+        channel_layer.group_send(message.group, {
+            'type': 'portal_notification',
+            'body': json.loads(message.body)
+        })
+        for message in messages
+    ], return_exceptions=True)
+
+
+def backlog():
+    """Number of messages waiting in the outbox, and the age in seconds of
+    the oldest one.
+
+    :rtype: tuple(int, float)
+    """
+    stats = OutboxMessage.objects.aggregate(count=Count('pk'), oldest=Min('created'))
+    age = (timezone.now() - stats['oldest']).total_seconds() if stats['oldest'] else 0.0
+    return stats['count'], age
+
+
+def get_counters():
+    """Number of outbox messages sent, retried and dropped.
+
+    :rtype: dict
+    """
+    return metrics.get_counters(SENT, RETRIED, DROPPED)
+
+
+@shared_task(bind=True, queue='notifications')
+def dispatch_outbox(self):
+    """
+    Deliver outbox messages to the channel layer, oldest first, in batches
+    of settings.PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE sent concurrently.
+    Each batch is claimed with SKIP LOCKED, so concurrent dispatchers never
+    send the same message. Failed messages are retried with exponential
+    backoff, and dropped after settings.PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True)
+                .filter(available__lte=now)
+                .order_by('created')[:settings.PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE]
+            )
+            if not messages:
+                break
+
+            results = async_to_sync(_send)(messages)
+
+            done = []
+            sent = 0
+            for message, result in zip(messages, results):
+                if not isinstance(result, Exception):
+                    done.append(message.pk)
+                    sent += 1
+                    METRICS.info('outbox group:{} latency:{:.3f}'.format(
+                        message.group, (now - message.created).total_seconds()))
+                    continue
+                message.attempts += 1
+                if message.attempts >= settings.PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+                    logger.error('Dropping outbox message to {} after {} attempts: {}'.format(
+                        message.group, message.attempts, result))
+                    metrics.incr(DROPPED)
+                    done.append(message.pk)
+                    continue
+                logger.warning('Outbox message to {} failed: {}'.format(message.group, result))
+                metrics.incr(RETRIED)
+                message.available = now + timedelta(seconds=2 ** message.attempts)
+                message.save(update_fields=['attempts', 'available'])
+
+            OutboxMessage.objects.filter(pk__in=done).delete()
+        metrics.incr(SENT, sent)
+
+    count, age = backlog()
+    METRICS.info('outbox backlog:{} oldest:{:.3f}'.format(count, age))
@@ -0,0 +1,74 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from portal.apps.notifications.models import Notification, OutboxMessage
+from portal.apps.notifications import tasks
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def mock_schedule_dispatch(mocker):
+    yield mocker.patch('portal.apps.notifications.tasks.schedule_dispatch')
+
+
+@pytest.fixture
+def mock_send(mocker):
+    yield mocker.patch('portal.apps.notifications.tasks.async_to_sync')
+
+
+def test_notification_is_queued(authenticated_user):
+    Notification.objects.create(user='username', event_type='job', status=Notification.INFO, message='msg')
+
+    message = OutboxMessage.objects.get()
+    assert message.group == 'username'
+    assert '"message": "msg"' in message.body
+
+
+def test_dispatch_to_channel_layer():
+    OutboxMessage.objects.create(group='username', body='{"event_type": "job"}')
+
+    tasks.dispatch_outbox()
+
+    assert not OutboxMessage.objects.exists()
+    assert tasks.get_counters()[tasks.SENT] == 1
+
+
+def test_dispatch_sends_and_deletes(mock_send):
+    for group in ('user1', 'user2', 'user3'):
+        OutboxMessage.objects.create(group=group, body='{"event_type": "job"}')
+    mock_send.return_value.side_effect = lambda messages: [None] * len(messages)
+
+    tasks.dispatch_outbox()
+
+    # Two batches of PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE
+    assert mock_send.return_value.call_count == 2
+    assert not OutboxMessage.objects.exists()
+    assert tasks.get_counters() == {tasks.SENT: 3, tasks.RETRIED: 0, tasks.DROPPED: 0}
+
+
+def test_dispatch_retries_with_backoff(mock_send):
+    OutboxMessage.objects.create(group='username', body='{}')
+    mock_send.return_value.return_value = [ConnectionError('redis')]
+    before = timezone.now()
+
+    tasks.dispatch_outbox()
+
+    message = OutboxMessage.objects.get()
+    assert message.attempts == 1
+    assert message.available >= before + timedelta(seconds=2)
+    # Not available again until the backoff has passed
+    assert mock_send.return_value.call_count == 1
+    assert tasks.get_counters() == {tasks.SENT: 0, tasks.RETRIED: 1, tasks.DROPPED: 0}
+    assert tasks.backlog()[0] == 1
+
+
+def test_dispatch_drops_after_max_attempts(mock_send, settings):
+    OutboxMessage.objects.create(group='username', body='{}', attempts=settings.PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS - 1)
+    mock_send.return_value.return_value = [ConnectionError('redis')]
+
+    tasks.dispatch_outbox()
+
+    assert not OutboxMessage.objects.exists()
+    assert tasks.get_counters() == {tasks.SENT: 0, tasks.RETRIED: 0, tasks.DROPPED: 1}
@@ -1,6 +1,9 @@
 import logging
+from django.db.models import Count, Q
 from django.http import JsonResponse
 from portal.apps.notifications.models import Notification
+from portal.apps.notifications.tasks import queue_message
+from portal.utils.cursors import encode_cursor, after_cursor
 
 from portal.views.base import BaseApiView
 
@@ -8,50 +11,59 @@ import json
 
 logger = logging.getLogger(__name__)
 
+BULK_UPDATE = 'notifications_update'
+
+
+def send_bulk_update(username, operation, event_types=None):
+    """Tell a user's open sessions that their notifications were changed in
+    bulk, with a single websocket event rather than one per notification.
+
+    :param str username: Owner of the notifications.
+    :param str operation: ``read`` or ``delete``.
+    :param list event_types: Event types changed, or None for all.
+    """
+    queue_message(username, {
+        'event_type': BULK_UPDATE,
+        'operation': operation,
+        'eventTypes': event_types
+    })
+
 
 class ManageNotificationsView(BaseApiView):
 
     def get(self, request, *args, **kwargs):
-        """List all notifications of a certain event type.
+        """List all notifications of a certain event type, newest first.
+
+        Pages are selected either by ``page`` and ``limit``, or by passing the
+        ``nextCursor`` of the previous page as ``cursor``.
         """
-        limit = request.GET.get('limit', 0)
-        page = request.GET.get('page', 0)
+        limit = int(request.GET.get('limit', 0))
+        page = int(request.GET.get('page', 0))
+        cursor = request.GET.get('cursor')
         read = request.GET.get('read')
         event_types = request.GET.getlist('eventTypes')
 
-        query_params = {}
+        notifs = Notification.objects.filter(deleted=False, user=request.user.username)
+        if event_types:
+            notifs = notifs.filter(event_type__in=event_types)
+        counts = notifs.aggregate(total=Count('pk'), unread=Count('pk', filter=Q(read=False)))
+
         if read is not None:
-            query_params['read'] = read
+            notifs = notifs.filter(read=read)
+        notifs = notifs.order_by('-datetime', '-pk')
 
-        if event_types:
-            notifs = Notification.objects.filter(event_type__in=event_types,
-                                                 deleted=False,
-                                                 user=request.user.username,
-                                                 **query_params).order_by('-datetime')
-            total = Notification.objects.filter(event_type__in=event_types,
-                                                deleted=False,
-                                                user=request.user.username).count()
-            unread = Notification.objects.filter(event_type__in=event_types,
-                                                 deleted=False,
-                                                 read=False,
-                                                 user=request.user.username).count()
-        else:
-            notifs = Notification.objects.filter(deleted=False,
-                                                 user=request.user.username,
-                                                 **query_params).order_by('-datetime')
-            total = Notification.objects.filter(deleted=False,
-                                                user=request.user.username).count()
-            unread = Notification.objects.filter(deleted=False,
-                                                 read=False,
-                                                 user=request.user.username).count()
+        if cursor:
+            notifs = after_cursor(notifs, 'datetime', cursor)
+        next_cursor = None
         if limit:
-            limit = int(limit)
-            page = int(page)
-            offset = page * limit
-            notifs = notifs[offset:offset+limit]
+            offset = 0 if cursor else page * limit
+            notifs = list(notifs[offset:offset+limit])
+            if len(notifs) == limit:
+                next_cursor = encode_cursor(notifs[-1].datetime, notifs[-1].pk)
 
         notifs = [n.to_dict() for n in notifs]
-        return JsonResponse({'notifs': notifs, 'page': page, 'total': total, 'unread': unread})
+        return JsonResponse({'notifs': notifs, 'page': page, 'total': counts['total'],
+                             'unread': counts['unread'], 'nextCursor': next_cursor})
 
     def patch(self, request, *args, **kwargs):
         """Mark notifications as read.
@@ -62,21 +74,15 @@ class ManageNotificationsView(BaseApiView):
         event_types = body.get('eventTypes')
 
         if nid == 'all' and read is True:
+            notifs = Notification.objects.filter(deleted=False,
+                                                 read=False,
+                                                 user=request.user.username)
             if event_types is not None:
-                notifs = Notification.objects.filter(deleted=False,
-                                                     read=False,
-                                                     event_type__in=event_types,
-                                                     user=request.user.username)
-            else:
-                notifs = Notification.objects.filter(deleted=False,
-                                                     read=False,
-                                                     user=request.user.username)
-            for n in notifs:
-                n.mark_read()
+                notifs = notifs.filter(event_type__in=event_types)
+            if notifs.update(read=True):
+                send_bulk_update(request.user.username, 'read', event_types)
         else:
-            n = Notification.get(id=nid)
-            n.read = read
-            n.save()
+            Notification.objects.filter(pk=nid, user=request.user.username).update(read=read)
 
         return JsonResponse({'message': 'OK'})
 
@@ -85,8 +91,8 @@ class ManageNotificationsView(BaseApiView):
         """
         if pk == 'all':
             items = Notification.objects.filter(deleted=False, user=request.user.username)
-            for i in items:
-                i.mark_deleted()
+            if items.update(deleted=True):
+                send_bulk_update(request.user.username, 'delete')
         else:
             x = Notification.objects.get(pk=pk)
             x.mark_deleted()
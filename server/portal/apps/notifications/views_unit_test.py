@@ -0,0 +1,83 @@
+import json
+import pytest
+from datetime import timedelta
+from django.db.models import signals
+from django.utils import timezone
+from portal.apps.notifications.models import Notification
+from portal.apps.signals.receivers import send_notification_ws
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def disconnect_ws():
+    signals.post_save.disconnect(sender=Notification, dispatch_uid="notification_msg")
+    yield
+    signals.post_save.connect(send_notification_ws, sender=Notification, dispatch_uid="notification_msg")
+
+
+@pytest.fixture
+def mock_send_bulk_update(mocker):
+    yield mocker.patch('portal.apps.notifications.views.send_bulk_update')
+
+
+@pytest.fixture
+def notifications(authenticated_user):
+    now = timezone.now()
+    for i in range(5):
+        Notification.objects.create(user=authenticated_user.username, event_type='job',
+                                    status=Notification.INFO, read=i < 2,
+                                    datetime=now - timedelta(minutes=i))
+    Notification.objects.create(user=authenticated_user.username, event_type='data_files',
+                                status=Notification.INFO, datetime=now)
+    Notification.objects.create(user='other', event_type='job', status=Notification.INFO)
+
+
+def test_get_counts(client, notifications, django_assert_max_num_queries):
+    with django_assert_max_num_queries(4):
+        response = client.get('/api/notifications/', {'eventTypes': 'job', 'limit': 2})
+    result = response.json()
+    assert result['total'] == 5
+    assert result['unread'] == 3
+    assert len(result['notifs']) == 2
+
+
+def test_get_cursor(client, notifications):
+    pks = []
+    params = {'eventTypes': 'job', 'limit': 2}
+    while True:
+        result = client.get('/api/notifications/', params).json()
+        pks += [n['pk'] for n in result['notifs']]
+        if not result['nextCursor']:
+            break
+        params['cursor'] = result['nextCursor']
+    assert pks == list(Notification.objects.filter(user='username', event_type='job')
+                       .order_by('-datetime').values_list('pk', flat=True))
+
+
+def test_mark_all_read(client, notifications, mock_send_bulk_update, django_assert_max_num_queries):
+    with django_assert_max_num_queries(3):
+        response = client.patch('/api/notifications/', json.dumps({'id': 'all', 'eventTypes': ['job']}),
+                                content_type='application/json')
+    assert response.status_code == 200
+    assert not Notification.objects.filter(user='username', event_type='job', read=False).exists()
+    assert Notification.objects.filter(user='username', event_type='data_files', read=False).exists()
+    assert Notification.objects.filter(user='other', read=False).exists()
+    mock_send_bulk_update.assert_called_once_with('username', 'read', ['job'])
+
+
+def test_mark_one_read(client, notifications, mock_send_bulk_update):
+    n = Notification.objects.filter(user='username', read=False).first()
+    client.patch('/api/notifications/', json.dumps({'id': n.pk}), content_type='application/json')
+    n.refresh_from_db()
+    assert n.read
+    mock_send_bulk_update.assert_not_called()
+
+
+def test_delete_all(client, notifications, mock_send_bulk_update):
+    response = client.delete('/api/notifications/all')
+    assert response.status_code == 200
+    assert not Notification.objects.filter(user='username', deleted=False).exists()
+    assert Notification.objects.filter(user='other', deleted=False).exists()
+    mock_send_bulk_update.assert_called_once_with('username', 'delete')
@@ -2,6 +2,7 @@ from portal.apps.onboarding.steps.abstract import AbstractStep
 from portal.apps.onboarding.state import SetupState
 from portal.apps.search.tasks import index_allocations
 from portal.apps.auth.tasks import setup_user, get_user_storage_systems
+from portal.apps.jupyter_mounts.manifest import schedule_manifest_rebuild
 from django.conf import settings
 import logging
 
@@ -34,4 +35,5 @@ class SystemCreationStep(AbstractStep):
         for system in system_names:
             self.log("Setting up system {}".format(system))
             setup_user(self.user.username, system)
+        schedule_manifest_rebuild(self.user.username)
         self.complete("Finished setting up storage systems")
@@ -15,6 +15,11 @@ def mock_index_allocations(mocker):
     yield mocker.patch('portal.apps.onboarding.steps.system_creation.index_allocations')
 
 
+@pytest.fixture(autouse=True)
+def mock_schedule_manifest_rebuild(mocker):
+    yield mocker.patch('portal.apps.onboarding.steps.system_creation.schedule_manifest_rebuild')
+
+
 @pytest.fixture(autouse=True)
 def mock_log(mocker):
     yield mocker.patch.object(SystemCreationStep, 'log')
@@ -30,9 +35,10 @@ def mock_complete(mocker):
     yield mocker.patch.object(SystemCreationStep, 'complete')
 
 
-def test_process(mock_setup_user, regular_user):
+def test_process(mock_setup_user, mock_schedule_manifest_rebuild, regular_user):
     step = SystemCreationStep(regular_user)
     step.process()
     frontera_call = call("username", "frontera")
     longhorn_call = call("username", "longhorn")
     mock_setup_user.assert_has_calls([frontera_call, longhorn_call], any_order=True)
+    mock_schedule_manifest_rebuild.assert_called_once_with("username")
@@ -0,0 +1,23 @@
+"""Management command."""
+
+from django.core.management.base import BaseCommand
+from portal.libs.elasticsearch.docs.base import IndexedProject
+from portal.apps.projects.models.metadata import ProjectMetadata
+from portal.apps.search.tasks import index_project
+
+
+class Command(BaseCommand):
+    """Command class."""
+
+    help = (
+        'Index the metadata of every project, including the usernames of '
+        'its members which project searches are filtered by.'
+    )
+
+    def handle(self, *args, **options):
+        # Add any new fields to the mapping of the projects index
+        IndexedProject.init()
+        project_ids = ProjectMetadata.objects.values_list('project_id', flat=True)
+        for project_id in project_ids.iterator():
+            index_project.apply_async(args=[project_id])
+        self.stdout.write('Queued indexing of {} projects'.format(project_ids.count()))
@@ -5,6 +5,7 @@
 """
 from __future__ import unicode_literals, absolute_import
 import logging
+import os
 from future.utils import python_2_unicode_compatible
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -13,6 +14,7 @@ from portal.libs.agave.models.systems.storage import StorageSystem
 from portal.libs.elasticsearch.docs.base import IndexedProject
 from portal.apps.projects.models import Project, ProjectId, ProjectSystemSerializer
 from portal.apps.projects.serializers import MetadataJSONSerializer
+from portal.apps.projects import utils as ProjectsUtils
 
 
 # pylint: disable=invalid-name
@@ -177,20 +179,45 @@ class ProjectsManager(object):
         )]
 
     def search(self, query_string, offset=0, limit=100):
-        """Search projects by query string"""
-        search_result = IndexedProject.search()
-        search_result = search_result.query("query_string",
-                                            query=query_string,
-                                            minimum_should_match="80%")
+        """Search projects the user is a member of by query string.
 
-        search_result = search_result.execute()
-        result_ids = map(lambda hit: hit.projectId, search_result)
+        This is a single query to the projects index, filtered by the members
+        indexed with each project. Access to a project is still authorized by
+        Agave when it is opened.
 
-        project_list = self.list()
-        filtered_list = filter(lambda prj: prj.name in result_ids,
-                               project_list)
+        :param str query_string: Query string.
+        :param int offset: Offset.
+        :param int limit: Limit.
 
-        return list(filtered_list)
+        :returns: Projects in the same form as :meth:`list`, with the
+            matching fragments of each project under ``highlight``.
+        :rtype: list
+        """
+        search = IndexedProject.search()
+        search = search.query("query_string",
+                              query=query_string,
+                              minimum_should_match="80%")
+        search = search.filter('term', members=self.user.username)
+        search = search.highlight('title', 'description')
+        search = search.extra(from_=offset, size=limit)
+
+        return [self._search_hit_to_dict(hit) for hit in search.execute()]
+
+    @staticmethod
+    def _search_hit_to_dict(hit):
+        """Project search hit to the fields of a project listing."""
+        pi = getattr(hit, 'pi', None)
+        last_modified = getattr(hit, 'lastModified', None)
+        highlight = getattr(hit.meta, 'highlight', None)
+        return {
+            'id': ProjectsUtils.project_id_to_system_id(hit.projectId),
+            'name': hit.projectId,
+            'description': hit.title,
+            'absolutePath': os.path.join(settings.PORTAL_PROJECTS_ROOT_DIR, hit.projectId),
+            'lastModified': last_modified.isoformat() if last_modified else None,
+            'owner': pi.to_dict() if pi else None,
+            'highlight': highlight.to_dict() if highlight else {}
+        }
 
     def apply_permissions(self, project, username, acl):
         """Index project and update acls
@@ -4,10 +4,13 @@
    :synopsis: Projects app unit tests.
 """
 from __future__ import unicode_literals, absolute_import
+import datetime
 import logging
 import os
 from django.conf import settings
+from elasticsearch_dsl.response import Hit
 from portal.apps.projects.managers.base import ProjectsManager
+from portal.apps.projects import utils as ProjectsUtils
 import pytest
 
 LOGGER = logging.getLogger(__name__)
@@ -45,13 +48,36 @@ def mock_owner(django_user_model):
 
 def test_search(mocker, mock_owner, project_manager, mock_index):
     mock_listing = mocker.patch('portal.apps.projects.managers.base.ProjectsManager.list')
-    mock_listing.return_value = []
-    mock_index.search().query().execute().return_value = []
-    project_manager.search('testquery')
-    assert mock_listing.call_count == 1
+    search = mock_index.search().query().filter().highlight().extra()
+    search.execute.return_value = [Hit({
+        '_id': 'PRJ-123',
+        '_source': {
+            'projectId': 'PRJ-123',
+            'title': 'Test Project',
+            'lastModified': datetime.datetime(2020, 1, 1),
+            'pi': {'username': 'username', 'first_name': 'First', 'last_name': 'Last', 'email': 'user@user.com'},
+            'members': ['username']
+        },
+        'highlight': {'title': ['<em>Test</em> Project']}
+    })]
+
+    result = project_manager.search('testquery', offset=10, limit=5)
+
+    mock_listing.assert_not_called()
     mock_index.search().query.assert_called_with('query_string',
                                                  query='testquery',
                                                  minimum_should_match="80%")
+    mock_index.search().query().filter.assert_called_with('term', members='username')
+    mock_index.search().query().filter().highlight().extra.assert_called_with(from_=10, size=5)
+    assert result == [{
+        'id': ProjectsUtils.project_id_to_system_id('PRJ-123'),
+        'name': 'PRJ-123',
+        'description': 'Test Project',
+        'absolutePath': os.path.join(settings.PORTAL_PROJECTS_ROOT_DIR, 'PRJ-123'),
+        'lastModified': '2020-01-01T00:00:00',
+        'owner': {'username': 'username', 'first_name': 'First', 'last_name': 'Last', 'email': 'user@user.com'},
+        'highlight': {'title': ['<em>Test</em> Project']}
+    }]
 
 
 def test_add_member_pi(mock_owner, project_manager, service_account):
@@ -296,18 +296,21 @@ class Project(object):
         :param int offset: Offset.
         :param int limit: Limit.
         """
-        systems = StorageSystem.search(
+        systems = list(StorageSystem.search(
             client,
             query={'id.like': '{}*'.format(cls.metadata_name),
                    'type.eq': StorageSystem.TYPES.STORAGE},
             offset=offset,
             limit=limit
-        )
+        ))
+        metadata = {
+            meta.project_id: meta for meta in
+            ProjectMetadata.objects.filter(
+                project_id__in=[system.name for system in systems]
+            ).select_related('pi')
+        }
         for system in systems:
-            try:
-                meta = ProjectMetadata.objects.get(project_id=system.name)
-            except ObjectDoesNotExist:
-                meta = {}
+            meta = metadata.get(system.name, {})
             prj = cls(
                 client,
                 system.name,
@@ -315,6 +318,8 @@ class Project(object):
                 storage=system
             )
             prj.storage.absolute_path = prj.absolute_path
+            # Used by ProjectSystemSerializer instead of querying it again.
+            prj.storage.project_metadata = meta
             yield prj
 
     def _can_edit_member(self, username):
@@ -511,7 +516,10 @@ class ProjectSystemSerializer(BaseAgaveSystemSerializer):
     def default(self, obj):
         agave_result = super(ProjectSystemSerializer, self).default(obj)
         try:
-            pi = ProjectMetadata.objects.get(project_id=obj.name).pi
+            meta = getattr(obj, 'project_metadata', None)
+            if meta is None:
+                meta = ProjectMetadata.objects.select_related('pi').get(project_id=obj.name)
+            pi = meta.pi
             agave_result['owner'] = {
                 'username': pi.username,
                 'first_name': pi.first_name,
@@ -85,3 +85,15 @@ class ProjectMetadata(AbstractProjectMetadata):
         from portal.apps.projects.serializers import MetadataJSONSerializer
 
         return MetadataJSONSerializer().default(self)
+
+    def members(self):
+        """Usernames of the project's PI, co-PIs and team members, i.e. the
+        users with a role on the project's storage system.
+
+        :returns: Sorted usernames
+        :rtype: list
+        """
+        users = list(self.co_pis.all()) + list(self.team_members.all())
+        if self.pi is not None:
+            users.append(self.pi)
+        return sorted({user.username for user in users})
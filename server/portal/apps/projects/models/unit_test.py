@@ -4,8 +4,10 @@
    :synopsis: Projects app unit tests.
 """
 
+import json
 from portal.apps.projects.models.metadata import ProjectMetadata
-from portal.apps.projects.models.base import Project
+from portal.apps.projects.models.base import Project, ProjectSystemSerializer
+from portal.libs.agave.models.systems.storage import StorageSystem
 import pytest
 
 
@@ -82,3 +84,48 @@ def test_project_create_storage_failure(mock_owner, portal_project, agave_client
     with pytest.raises(Exception):
         Project.create(agave_client, "my_project", "mock_project_id", mock_owner)
     assert ProjectMetadata.objects.all().count() == 0
+
+
+def test_project_listing_queries(mock_owner, agave_client, mock_signal, mocker, django_assert_num_queries):
+    systems = []
+    for i in range(10):
+        ProjectMetadata.objects.create(project_id='PRJ-{}'.format(i), title='Project', pi=mock_owner)
+        systems.append(StorageSystem.from_dict(agave_client, {
+            'id': 'cep.project.PRJ-{}'.format(i),
+            'name': 'PRJ-{}'.format(i),
+            'type': 'STORAGE',
+            'lastModified': '2020-01-01T00:00:00Z',
+            'storage': {'rootDir': '/corral/projects/PRJ-{}'.format(i)}
+        }))
+    # A system without metadata
+    systems.append(StorageSystem.from_dict(agave_client, {
+        'id': 'cep.project.PRJ-10',
+        'name': 'PRJ-10',
+        'type': 'STORAGE',
+        'lastModified': '2020-01-01T00:00:00Z',
+        'storage': {'rootDir': '/corral/projects/PRJ-10'}
+    }))
+    mocker.patch('portal.apps.projects.models.base.StorageSystem.search', return_value=iter(systems))
+
+    with django_assert_num_queries(1):
+        listing = json.loads(json.dumps(
+            [prj.storage for prj in Project.listing(agave_client)],
+            cls=ProjectSystemSerializer
+        ))
+
+    assert len(listing) == 11
+    assert listing[0]['owner']['username'] == 'username'
+    assert listing[0]['absolutePath'] == '/corral/projects/PRJ-0'
+    assert listing[10]['owner'] is None
+
+
+def test_metadata_members(mock_owner, mock_signal, django_user_model):
+    meta = ProjectMetadata.objects.create(project_id='PRJ-123', title='Project', owner=mock_owner)
+    assert meta.members() == []
+
+    co_pi = django_user_model.objects.create_user(username='co_pi', password='password')
+    member = django_user_model.objects.create_user(username='member', password='password')
+    meta.pi = mock_owner
+    meta.co_pis.add(co_pi)
+    meta.team_members.add(member)
+    assert meta.members() == ['co_pi', 'member', 'username']
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class RetentionConfig(AppConfig):
+    name = 'portal.apps.retention'
+    label = 'retention'
+    verbose_name = 'Portal Data Retention'
@@ -0,0 +1,84 @@
+"""
+.. :module:: apps.retention.policies
+   :synopsis: Rows to remove from tables which otherwise only grow.
+
+Each policy takes its options from ``settings.PORTAL_RETENTION_POLICIES``
+and returns the querysets of rows to remove.
+"""
+from datetime import timedelta
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from portal.apps.notifications.models import Notification
+from portal.apps.onboarding.models import SetupEvent
+from portal.apps.search.models import StorageUsageSnapshot
+from portal.apps.webhooks.models import ExternalCall, JobEvent
+from portal.apps.workspace.models import JobSubmission
+
+
+def older_than(queryset, time_field, days):
+    """Rows whose ``time_field`` is more than ``days`` days old."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return queryset.filter(**{'{}__lt'.format(time_field): cutoff})
+
+
+def beyond_per_user(queryset, user_field, time_field, count):
+    """Rows of each user other than their ``count`` newest, as one queryset
+    per user who has more than ``count`` rows.
+    """
+    users = (queryset.order_by().values(user_field)
+             .annotate(rows=Count('pk')).filter(rows__gt=count)
+             .values_list(user_field, flat=True))
+    for user in users:
+        rows = queryset.filter(**{user_field: user}).order_by('-{}'.format(time_field), '-pk')
+        time, pk = rows.values_list(time_field, 'pk')[count - 1]
+        yield rows.filter(Q(**{'{}__lt'.format(time_field): time}) | Q(**{time_field: time, 'pk__lt': pk}))
+
+
+def notifications(days=None, deleted_days=None, per_user=None):
+    if deleted_days is not None:
+        yield older_than(Notification.objects.filter(deleted=True), 'datetime', deleted_days)
+    if days is not None:
+        yield older_than(Notification.objects.all(), 'datetime', days)
+    if per_user:
+        yield from beyond_per_user(Notification.objects.all(), 'user', 'datetime', per_user)
+
+
+def setup_events(days=None):
+    # The latest event of each step is the state of that step; never remove it.
+    latest = SetupEvent.objects.order_by().values('user', 'step').annotate(latest=Max('pk')).values('latest')
+    if days is not None:
+        yield older_than(SetupEvent.objects.exclude(pk__in=latest), 'time', days)
+
+
+def external_calls(days=None, closed_days=None):
+    if closed_days is not None:
+        yield older_than(ExternalCall.objects.filter(accepting=False), 'time', closed_days)
+    if days is not None:
+        yield older_than(ExternalCall.objects.all(), 'time', days)
+
+
+def job_events(days=None):
+    if days is not None:
+        yield older_than(JobEvent.objects.filter(processed__isnull=False), 'received', days)
+
+
+def job_submissions(days=None, per_user=None):
+    if days is not None:
+        yield older_than(JobSubmission.objects.all(), 'time', days)
+    if per_user:
+        yield from beyond_per_user(JobSubmission.objects.all(), 'user', 'time', per_user)
+
+
+def storage_usage_snapshots(days=None):
+    if days is not None:
+        yield older_than(StorageUsageSnapshot.objects.all(), 'created', days)
+
+
+POLICIES = {
+    'notifications': notifications,
+    'setup_events': setup_events,
+    'external_calls': external_calls,
+    'job_events': job_events,
+    'job_submissions': job_submissions,
+    'storage_usage_snapshots': storage_usage_snapshots,
+}
@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from celery import shared_task
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from portal.apps.retention.policies import POLICIES
+from portal.utils import metrics
+
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+
+
+def removed_counter(name):
+    return 'retention.{}.removed'.format(name)
+
+
+@contextmanager
+def archive(name):
+    """Daily NDJSON file in settings.PORTAL_RETENTION_ARCHIVE_DIR to which
+    rows removed by a policy are appended, or None if archiving is disabled.
+    """
+    if not settings.PORTAL_RETENTION_ARCHIVE_DIR:
+        yield None
+        return
+    path = os.path.join(settings.PORTAL_RETENTION_ARCHIVE_DIR,
+                        '{}-{}.ndjson'.format(name, timezone.now().strftime('%Y-%m-%d')))
+    with open(path, 'a') as archive_file:
+        yield archive_file
+
+
+def purge(queryset, archive_file=None):
+    """Delete the rows of a queryset, settings.PORTAL_RETENTION_BATCH_SIZE at
+    a time, so that no single statement locks much of the table.
+
+    :param queryset: Rows to delete.
+    :param archive_file: File to which deleted rows are written as NDJSON.
+
+    :returns: Number of rows deleted.
+    :rtype: int
+    """
+    model = queryset.model
+    removed = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:settings.PORTAL_RETENTION_BATCH_SIZE])
+        if not pks:
+            return removed
+        rows = model.objects.filter(pk__in=pks)
+        if archive_file is not None:
+            for row in serializers.serialize('python', rows):
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        _, deleted = rows.delete()
+        removed += deleted.get(model._meta.label, 0)
+
+
+@shared_task(bind=True, queue='default')
+def apply_retention_policies(self, names=None):
+    """
+    Remove rows selected by the retention policies configured in
+    settings.PORTAL_RETENTION_POLICIES.
+
+    :param list names: Policies to apply, or None for all.
+
+    :returns: Number of rows removed, by policy.
+    :rtype: dict
+    """
+    report = {}
+    for name, options in settings.PORTAL_RETENTION_POLICIES.items():
+        if names is not None and name not in names:
+            continue
+        removed = 0
+        with archive(name) as archive_file:
+            for queryset in POLICIES[name](**options):
+                removed += purge(queryset, archive_file)
+        report[name] = removed
+        metrics.incr(removed_counter(name), removed)
+        METRICS.info('retention policy:{} removed:{}'.format(name, removed))
+    return report
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import signals
+from django.utils import timezone
+from portal.apps.notifications.models import Notification
+from portal.apps.onboarding.models import SetupEvent
+from portal.apps.retention.tasks import apply_retention_policies, removed_counter
+from portal.apps.signals.receivers import send_notification_ws, send_setup_event
+from portal.apps.webhooks.models import ExternalCall, JobEvent
+from portal.apps.workspace.models import JobSubmission
+from portal.utils import metrics
+
+
+def days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+class TestRetentionPolicies(TestCase):
+    fixtures = ['users']
+
+    def setUp(self):
+        cache.clear()
+        signals.post_save.disconnect(sender=Notification, dispatch_uid="notification_msg")
+        signals.post_save.disconnect(sender=SetupEvent, dispatch_uid="setup_event")
+        self.user = get_user_model().objects.get(username='username')
+
+    def tearDown(self):
+        signals.post_save.connect(send_notification_ws, sender=Notification, dispatch_uid="notification_msg")
+        signals.post_save.connect(send_setup_event, sender=SetupEvent, dispatch_uid="setup_event")
+
+    def notification(self, days, **kwargs):
+        return Notification.objects.create(user='username', event_type='job', status=Notification.INFO,
+                                           datetime=days_ago(days), **kwargs)
+
+    @override_settings(PORTAL_RETENTION_POLICIES={'notifications': {'days': 365, 'deleted_days': 30,
+                                                                    'per_user': 3}})
+    def test_notifications(self):
+        kept = [self.notification(1), self.notification(10, deleted=True), self.notification(40)]
+        self.notification(40, deleted=True)
+        self.notification(400)
+        # Beyond the 3 newest notifications of the user
+        self.notification(50)
+        self.notification(60)
+
+        report = apply_retention_policies()
+
+        self.assertEqual(report, {'notifications': 4})
+        self.assertEqual(set(Notification.objects.all()), set(kept))
+        self.assertEqual(metrics.get_counters(removed_counter('notifications')),
+                         {removed_counter('notifications'): 4})
+
+    @override_settings(PORTAL_RETENTION_POLICIES={'setup_events': {'days': 365}})
+    def test_setup_events_keep_latest_state(self):
+        for days, step, state in ((500, 'step1', 'pending'), (450, 'step1', 'completed'),
+                                  (400, 'step2', 'pending'), (1, 'step2', 'completed')):
+            event = SetupEvent.objects.create(user=self.user, step=step, state=state, message='')
+            SetupEvent.objects.filter(pk=event.pk).update(time=days_ago(days))
+
+        self.assertEqual(apply_retention_policies(), {'setup_events': 2})
+        self.assertEqual(sorted(SetupEvent.objects.values_list('step', 'state')),
+                         [('step1', 'completed'), ('step2', 'completed')])
+
+    @override_settings(PORTAL_RETENTION_POLICIES={'external_calls': {'days': 90, 'closed_days': 7},
+                                                  'job_events': {'days': 30}})
+    def test_webhooks(self):
+        ExternalCall.objects.create(webhook_id='open', time=days_ago(10))
+        ExternalCall.objects.create(webhook_id='closed', time=days_ago(10), accepting=False)
+        ExternalCall.objects.create(webhook_id='old', time=days_ago(100))
+        JobEvent.objects.create(job_id='1', status='RUNNING', owner='username', data={},
+                                received=days_ago(40), processed=days_ago(40))
+        JobEvent.objects.create(job_id='1', status='FINISHED', owner='username', data={},
+                                received=days_ago(40))
+
+        self.assertEqual(apply_retention_policies(), {'external_calls': 2, 'job_events': 1})
+        self.assertEqual(list(ExternalCall.objects.values_list('webhook_id', flat=True)), ['open'])
+        # Unprocessed events are kept
+        self.assertEqual(list(JobEvent.objects.values_list('status', flat=True)), ['FINISHED'])
+
+    @override_settings(PORTAL_RETENTION_POLICIES={'job_submissions': {'days': None, 'per_user': 2}})
+    def test_job_submissions_per_user(self):
+        for job_id in ('1', '2', '3', '4'):
+            JobSubmission.objects.create(user=self.user, jobId=job_id, time=days_ago(int(job_id)))
+
+        self.assertEqual(apply_retention_policies(), {'job_submissions': 2})
+        self.assertEqual(sorted(JobSubmission.objects.values_list('jobId', flat=True)), ['1', '2'])
+
+    @override_settings(PORTAL_RETENTION_POLICIES={'notifications': {'days': 365}})
+    def test_archive(self):
+        old = self.notification(400, message='archived')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.settings(PORTAL_RETENTION_ARCHIVE_DIR=tmpdir):
+                apply_retention_policies(names=['notifications'])
+            path = os.path.join(tmpdir, os.listdir(tmpdir)[0])
+            with open(path) as f:
+                rows = [json.loads(line) for line in f]
+
+        self.assertEqual([(row['pk'], row['fields']['message']) for row in rows], [(old.pk, 'archived')])
+        self.assertFalse(Notification.objects.exists())
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.17 on 2026-10-18 14:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsageSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=1024)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('total_files', models.IntegerField(default=0)),
+                ('created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'index_together': {('system', 'path', 'created')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system', models.CharField(max_length=255)),
+                ('path', models.CharField(db_index=True, max_length=1024)),
+                ('parent', models.CharField(blank=True, max_length=1024, null=True)),
+                ('depth', models.IntegerField(default=0)),
+                ('direct_bytes', models.BigIntegerField(default=0)),
+                ('direct_files', models.IntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('total_files', models.IntegerField(default=0)),
+                ('complete', models.BooleanField(default=False)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('system', 'path')},
+                'index_together': {('system', 'parent')},
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+"""
+.. :module:: apps.search.models
+   :synopsis: Storage usage rollups maintained by the indexer
+"""
+from django.db import models
+from django.utils import timezone
+
+
+class StorageUsage(models.Model):
+    """Storage Usage
+
+    Bytes and number of files of an indexed folder, maintained by
+    :mod:`portal.apps.search.usage` as levels of a system are indexed.
+    The direct counts are those of the files in the folder itself, and the
+    totals include every folder under it. The totals are only complete once
+    every folder under it has been indexed, which a full crawl of the folder
+    records by setting ``complete``.
+    """
+    system = models.CharField(max_length=255)
+    # Path relative to the system root, with a leading and no trailing slash
+    path = models.CharField(max_length=1024, db_index=True)
+    parent = models.CharField(max_length=1024, null=True, blank=True)
+    depth = models.IntegerField(default=0)
+    direct_bytes = models.BigIntegerField(default=0)
+    direct_files = models.IntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    total_files = models.IntegerField(default=0)
+    complete = models.BooleanField(default=False)
+    updated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [['system', 'path']]
+        index_together = [['system', 'parent']]
+
+    def __str__(self):
+        return '{system}{path}'.format(system=self.system, path=self.path)
+
+    def to_dict(self):
+        return {
+            'system': self.system,
+            'path': self.path,
+            'total_storage_bytes': self.total_bytes,
+            'total_files': self.total_files,
+            'updated': self.updated,
+        }
+
+
+class StorageUsageSnapshot(models.Model):
+    """Storage Usage Snapshot
+
+    The totals of a folder at a point in time, recorded by
+    :func:`portal.apps.search.tasks.snapshot_storage_usage` for trends.
+    """
+    system = models.CharField(max_length=255)
+    path = models.CharField(max_length=1024)
+    total_bytes = models.BigIntegerField(default=0)
+    total_files = models.IntegerField(default=0)
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        index_together = [['system', 'path', 'created']]
+
+    def __str__(self):
+        return '{system}{path} {created}'.format(system=self.system, path=self.path, created=self.created)
+
+    def to_dict(self):
+        return {
+            'date': self.created,
+            'total_storage_bytes': self.total_bytes,
+            'total_files': self.total_files,
+        }
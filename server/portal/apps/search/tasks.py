@@ -1,12 +1,16 @@
 
+import datetime
+import itertools
 import logging
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 # from django.core.management import call_command
 from celery import shared_task
 from portal.libs.agave.utils import service_account
 from portal.libs.elasticsearch.utils import index_listing
-from portal.apps.users.utils import get_tas_allocations
+from portal.libs.elasticsearch.debounce import pop_listing
+from portal.apps.users.utils import refresh_allocations, schedule_allocations_refresh
 from portal.apps.projects.models.metadata import ProjectMetadata
 from portal.libs.elasticsearch.docs.base import (IndexedAllocation,
                                                  IndexedProject)
@@ -16,9 +20,17 @@ logger = logging.getLogger(__name__)
 
 # Crawl and index agave files
 @shared_task(bind=True, max_retries=3, queue='indexing', retry_backoff=True, rate_limit="12/m")
-def agave_indexer(self, systemId, filePath='/', recurse=True, update_pems=False, ignore_hidden=True, reindex=False):
-
+def agave_indexer(self, systemId, filePath='/', recurse=True, update_pems=False, ignore_hidden=True, reindex=False,
+                  concurrency=None, resume=False, incremental=False):
+    """
+    Index a path in a Tapis system. When recurse=True the whole tree under the
+    path is crawled within this task using a bounded pool of concurrent
+    listings; on retry the crawl resumes from its last checkpoint. With
+    incremental=True only new, modified or deleted files are written and
+    folders with an unchanged lastModified are not descended into.
+    """
     from portal.libs.elasticsearch.utils import index_level
+    from portal.libs.elasticsearch.crawler import SystemCrawler
     from portal.libs.agave.utils import walk_levels
 
     client = service_account()
@@ -26,32 +38,61 @@ def agave_indexer(self, systemId, filePath='/', recurse=True, update_pems=False,
     if not filePath.startswith('/'):
         filePath = '/' + filePath
 
+    if recurse:
+        def report_progress(stats):
+            if self.request.id:
+                self.update_state(state='PROGRESS', meta=stats)
+
+        crawler = SystemCrawler(client, systemId, filePath,
+                                concurrency=concurrency,
+                                ignore_hidden=ignore_hidden,
+                                reindex=reindex,
+                                incremental=incremental,
+                                progress=report_progress)
+        if resume or self.request.retries:
+            crawler.resume()
+        try:
+            return crawler.run()
+        except Exception as exc:
+            logger.error("Error crawling files under system {} and path {}".format(systemId, filePath))
+            raise self.retry(exc=exc)
+
     try:
         filePath, folders, files = walk_levels(client, systemId, filePath, ignore_hidden=ignore_hidden).__next__()
     except Exception as exc:
         logger.error("Error walking files under system {} and path {}".format(systemId, filePath))
         raise self.retry(exc=exc)
 
-    index_level(filePath, folders, files, systemId, reindex=reindex)
-    if recurse:
-        for child in folders:
-            self.delay(systemId, filePath=child.path, reindex=reindex)
+    index_level(filePath, folders, files, systemId, reindex=reindex, incremental=incremental)
 
 
 @shared_task(bind=True, max_retries=3, queue='default')
-def agave_listing_indexer(self, listing):
-    index_listing(listing)
+def agave_listing_indexer(self, listing=None, system=None, path=None, window=None):
+    """
+    Index a Tapis listing. If no listing is passed, index the listings of
+    system/path buffered in a debounce window by
+    portal.libs.elasticsearch.debounce.
+    """
+    if listing is None:
+        listing = pop_listing(system, path, window)
+    index_listing(listing, incremental=True)
 
 
 @shared_task(bind=True, queue='indexing')
-def index_community_data(self, reindex=False):
+def index_community_data(self, reindex=False, incremental=True):
+    """
+    Index the Tapis community data systems. Incremental crawls miss changes
+    below folders whose lastModified is unchanged, so they are complemented
+    by full crawls on settings.COMMUNITY_FULL_INDEX_SCHEDULE.
+    """
     # s = IndexedFile.search()
     # s = s.query("match", **{"system._exact": settings.AGAVE_COMMUNITY_DATA_SYSTEM})
     # resp = s.delete()
     for sys in settings.PORTAL_DATAFILES_STORAGE_SYSTEMS:
         if sys.api == 'tapis':
             logger.info('INDEXING {} SYSTEM'.format(sys.name))
-            agave_indexer.apply_async(args=[sys.system], kwargs={'reindex': reindex})
+            agave_indexer.apply_async(args=[sys.system], kwargs={'reindex': reindex,
+                                                                 'incremental': incremental and not reindex})
 
 
 @shared_task(bind=True, max_retries=3, queue='default')
@@ -118,24 +159,45 @@ def index_my_data(self, reindex=False):
 
 @shared_task(bind=True, max_retries=3, queue='api')
 def index_allocations(self, username):
-    allocations = get_tas_allocations(username)
-    doc = IndexedAllocation(username=username, value=allocations)
-    doc.meta.id = get_sha256_hash(username)
-    doc.save()
+    refresh_allocations(username)
+
+
+@shared_task(bind=True, queue='api')
+def refresh_active_allocations(self):
     """
-    try:
-            doc = IndexedAllocation.from_username(username)
-            doc.update(value=allocations)
-    except NotFoundError:
-            doc = IndexedAllocation(username=username, value=allocations)
-            doc.save()
+    Queue a refresh of the cached allocations of every user who logged in
+    within the last settings.PORTAL_ALLOCATIONS_ACTIVE_DAYS days and whose
+    allocations are older than settings.PORTAL_ALLOCATIONS_FRESHNESS.
     """
+    since = timezone.now() - datetime.timedelta(days=settings.PORTAL_ALLOCATIONS_ACTIVE_DAYS)
+    usernames = User.objects.filter(last_login__gte=since).values_list('username', flat=True).iterator()
+    queued = 0
+    for batch in iter(lambda: list(itertools.islice(usernames, 500)), []):
+        docs = IndexedAllocation.mget([get_sha256_hash(username) for username in batch], missing='none')
+        for username, doc in zip(batch, docs):
+            if doc is None or doc.is_stale(settings.PORTAL_ALLOCATIONS_FRESHNESS):
+                queued += schedule_allocations_refresh(username)
+    logger.info('Queued allocation refresh for {} active users'.format(queued))
 
 
 @shared_task(bind=True, max_retries=3, queue='indexing')
 def index_project(self, project_id):
-    project = ProjectMetadata.objects.get(project_id=project_id)
+    project = ProjectMetadata.objects.select_related('owner', 'pi').prefetch_related(
+        'co_pis', 'team_members').get(project_id=project_id)
     project_dict = project.to_dict()
+    project_dict['members'] = project.members()
     project_doc = IndexedProject(**project_dict)
     project_doc.meta.id = project_id
     project_doc.save()
+
+
+@shared_task(bind=True, queue='indexing')
+def snapshot_storage_usage(self):
+    """
+    Snapshot the storage usage of every indexed folder up to
+    settings.PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH levels below the root of
+    its system, for usage trends.
+    """
+    from portal.apps.search.usage import take_snapshots
+    count = take_snapshots(settings.PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH)
+    logger.info('Took {} storage usage snapshots'.format(count))
@@ -0,0 +1,238 @@
+"""
+.. :module:: apps.search.usage
+   :synopsis: Storage usage rollups maintained as levels are indexed
+
+Each indexed folder has a :class:`~portal.apps.search.models.StorageUsage`
+row with the bytes and number of files directly in it, and totals for the
+whole subtree under it. When a level is indexed its direct counts are
+replaced, and the difference is added to the totals of the folder and of
+every folder above it, so the usage of any folder is a single row lookup.
+
+Levels can be indexed in any order, so the totals of a folder only cover
+the whole subtree once a full crawl of it, or of a folder above it, has
+finished; :func:`is_complete` tells whether they can be relied on.
+"""
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from portal.apps.search.models import StorageUsage, StorageUsageSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(path):
+    """Path relative to the system root, with a leading and no trailing slash.
+
+    :param str path: Path
+
+    :rtype: str
+    """
+    return '/' + path.strip('/')
+
+
+def parent_path(path):
+    """Parent of a normalized path, or None for the system root.
+
+    :param str path: Normalized path
+
+    :rtype: str
+    """
+    if path == '/':
+        return None
+    return normalize_path(path.rsplit('/', 1)[0])
+
+
+def ancestor_paths(path):
+    """Paths of the folders above a normalized path, nearest first.
+
+    :param str path: Normalized path
+
+    :rtype: list
+    """
+    ancestors = []
+    parent = parent_path(path)
+    while parent is not None:
+        ancestors.append(parent)
+        parent = parent_path(parent)
+    return ancestors
+
+
+def _new_usage(system, path, now):
+    return StorageUsage(
+        system=system,
+        path=path,
+        parent=parent_path(path),
+        depth=0 if path == '/' else path.count('/'),
+        updated=now
+    )
+
+
+def record_level(system, path, folders, files):
+    """Replace the direct usage of an indexed folder with that of its listing,
+    updating the totals of the folder and the folders above it. Folders which
+    are no longer in the listing are removed along with their subtrees.
+
+    Rows are locked from the system root down, so concurrent updates of
+    overlapping paths cannot deadlock.
+
+    :param str system: Tapis system ID
+    :param str path: Path of the folder, relative to the system root
+    :param list folders: Tapis folders in the folder
+    :param list files: Tapis files in the folder
+    """
+    path = normalize_path(path)
+    ancestors = ancestor_paths(path)
+    files = [_file for _file in files if _file['name'][0] != '.']
+    direct_bytes = sum(_file.get('length') or 0 for _file in files)
+    direct_files = len(files)
+    folder_paths = set(normalize_path(folder['path']) for folder in folders)
+    now = timezone.now()
+
+    with transaction.atomic():
+        StorageUsage.objects.bulk_create(
+            [_new_usage(system, _path, now) for _path in [path] + ancestors],
+            ignore_conflicts=True
+        )
+        rows = {
+            usage.path: usage for usage in
+            StorageUsage.objects.select_for_update()
+            .filter(system=system, path__in=[path] + ancestors).order_by('path')
+        }
+        usage = rows[path]
+        delta_bytes = direct_bytes - usage.direct_bytes
+        delta_files = direct_files - usage.direct_files
+
+        children = StorageUsage.objects.filter(system=system, parent=path).values_list(
+            'path', 'total_bytes', 'total_files')
+        for child, total_bytes, total_files in children:
+            if child in folder_paths:
+                continue
+            delta_bytes -= total_bytes
+            delta_files -= total_files
+            StorageUsage.objects.filter(system=system, path=child).delete()
+            StorageUsage.objects.filter(system=system, path__startswith=child + '/').delete()
+
+        StorageUsage.objects.filter(pk=usage.pk).update(
+            direct_bytes=direct_bytes,
+            direct_files=direct_files,
+            total_bytes=F('total_bytes') + delta_bytes,
+            total_files=F('total_files') + delta_files,
+            updated=now
+        )
+        if ancestors and (delta_bytes or delta_files):
+            StorageUsage.objects.filter(system=system, path__in=ancestors).update(
+                total_bytes=F('total_bytes') + delta_bytes,
+                total_files=F('total_files') + delta_files,
+                updated=now
+            )
+
+
+def record_levels(system, levels):
+    """Record the usage of several indexed levels. A level which fails to be
+    recorded is logged and skipped; its usage is corrected the next time it
+    is indexed.
+
+    :param str system: Tapis system ID
+    :param list levels: (path, folders, files) tuples, as yielded by
+        :func:`portal.libs.agave.utils.walk_levels`
+
+    :returns: True if every level was recorded
+    :rtype: bool
+    """
+    recorded = True
+    for path, folders, files in levels:
+        try:
+            record_level(system, path, folders, files)
+        except Exception:
+            logger.exception('Could not record storage usage of {}{}'.format(system, path))
+            path = normalize_path(path)
+            StorageUsage.objects.filter(system=system, path__in=[path] + ancestor_paths(path)).update(
+                complete=False)
+            recorded = False
+    return recorded
+
+
+def mark_complete(system, path='/'):
+    """Record that every folder under a folder has been indexed, e.g. after a
+    full crawl of it, so that its totals cover its whole subtree.
+
+    :param str system: Tapis system ID
+    :param str path: Path relative to the system root
+    """
+    StorageUsage.objects.filter(system=system, path=normalize_path(path)).update(complete=True)
+
+
+def is_complete(system, path='/'):
+    """Whether the totals of a folder cover its whole subtree, i.e. whether it
+    or a folder above it has been fully crawled.
+
+    :param str system: Tapis system ID
+    :param str path: Path relative to the system root
+
+    :rtype: bool
+    """
+    path = normalize_path(path)
+    return StorageUsage.objects.filter(
+        system=system, path__in=[path] + ancestor_paths(path), complete=True).exists()
+
+
+def get_usage(system, path='/'):
+    """Usage of a folder, or None if it has not been indexed.
+
+    :param str system: Tapis system ID
+    :param str path: Path relative to the system root
+
+    :rtype: :class:`~portal.apps.search.models.StorageUsage`
+    """
+    return StorageUsage.objects.filter(system=system, path=normalize_path(path)).first()
+
+
+def list_children(system, path='/', limit=100):
+    """Usage of the folders directly in a folder, largest first.
+
+    :param str system: Tapis system ID
+    :param str path: Path relative to the system root
+    :param int limit: Maximum number of folders
+
+    :rtype: list
+    """
+    return list(StorageUsage.objects.filter(system=system, parent=normalize_path(path))
+                .order_by('-total_bytes', 'path')[:limit])
+
+
+def get_history(system, path='/', days=30):
+    """Snapshots of the usage of a folder over the past days, oldest first.
+
+    :param str system: Tapis system ID
+    :param str path: Path relative to the system root
+    :param int days: Number of days
+
+    :rtype: list
+    """
+    since = timezone.now() - timedelta(days=days)
+    return list(StorageUsageSnapshot.objects.filter(
+        system=system, path=normalize_path(path), created__gte=since).order_by('created'))
+
+
+def take_snapshots(depth, batch_size=1000):
+    """Snapshot the totals of every folder at most ``depth`` levels below
+    the root of its system.
+
+    :param int depth: Maximum depth, 0 for system roots only
+    :param int batch_size: Rows inserted per query
+
+    :returns: Number of snapshots taken
+    :rtype: int
+    """
+    now = timezone.now()
+    rows = StorageUsage.objects.filter(depth__lte=depth).values_list(
+        'system', 'path', 'total_bytes', 'total_files')
+    snapshots = [
+        StorageUsageSnapshot(system=system, path=path, total_bytes=total_bytes,
+                             total_files=total_files, created=now)
+        for system, path, total_bytes, total_files in rows.iterator()
+    ]
+    StorageUsageSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+    return len(snapshots)
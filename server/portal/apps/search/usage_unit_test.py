@@ -0,0 +1,126 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from portal.apps.search import usage
+from portal.apps.search.models import StorageUsage, StorageUsageSnapshot
+from portal.apps.search.tasks import snapshot_storage_usage
+
+
+pytestmark = pytest.mark.django_db
+
+
+def folder(path):
+    return {'name': path.rsplit('/', 1)[-1], 'path': path, 'format': 'folder', 'length': 4096}
+
+
+def tapis_file(path, length):
+    return {'name': path.rsplit('/', 1)[-1], 'path': path, 'format': 'raw', 'length': length}
+
+
+def totals(path):
+    row = usage.get_usage('test.system', path)
+    return row.total_bytes, row.total_files
+
+
+def test_paths():
+    assert usage.normalize_path('a/b/') == '/a/b'
+    assert usage.normalize_path('/') == '/'
+    assert usage.parent_path('/a') == '/'
+    assert usage.parent_path('/') is None
+    assert usage.ancestor_paths('/a/b/c') == ['/a/b', '/a', '/']
+
+
+def test_record_levels():
+    usage.record_levels('test.system', [
+        ('/', [folder('/a')], [tapis_file('/root.txt', 1)]),
+        ('/a', [folder('/a/b')], [tapis_file('/a/1.txt', 10), tapis_file('/a/.hidden', 1000)]),
+        ('/a/b', [], [tapis_file('/a/b/1.txt', 100), tapis_file('/a/b/2.txt', 100)]),
+    ])
+
+    assert totals('/') == (211, 4)
+    assert totals('/a') == (210, 3)
+    assert totals('/a/b') == (200, 2)
+    assert [child.path for child in usage.list_children('test.system', '/')] == ['/a']
+
+
+def test_level_indexed_before_its_parent():
+    usage.record_level('test.system', '/a/b', [], [tapis_file('/a/b/1.txt', 100)])
+    usage.record_level('test.system', '/', [folder('/a')], [tapis_file('/root.txt', 1)])
+
+    assert totals('/') == (101, 2)
+    assert totals('/a') == (100, 1)
+    assert usage.get_usage('test.system', '/a').depth == 1
+
+
+def test_reindexed_level_updates_totals():
+    usage.record_level('test.system', '/', [folder('/a')], [])
+    usage.record_level('test.system', '/a', [], [tapis_file('/a/1.txt', 10)])
+
+    usage.record_level('test.system', '/a', [], [tapis_file('/a/1.txt', 30), tapis_file('/a/2.txt', 5)])
+    # Recording the same listing again changes nothing
+    usage.record_level('test.system', '/a', [], [tapis_file('/a/1.txt', 30), tapis_file('/a/2.txt', 5)])
+
+    assert totals('/') == (35, 2)
+    assert totals('/a') == (35, 2)
+
+
+def test_removed_folder_is_subtracted():
+    usage.record_levels('test.system', [
+        ('/', [folder('/a'), folder('/b')], []),
+        ('/a', [folder('/a/b')], [tapis_file('/a/1.txt', 10)]),
+        ('/a/b', [], [tapis_file('/a/b/1.txt', 100)]),
+        ('/b', [], [tapis_file('/b/1.txt', 1)]),
+    ])
+
+    usage.record_level('test.system', '/', [folder('/b')], [])
+
+    assert totals('/') == (1, 1)
+    assert usage.get_usage('test.system', '/a') is None
+    assert not StorageUsage.objects.filter(path__startswith='/a').exists()
+
+
+def test_record_levels_continues_after_failure(mocker):
+    mocker.patch('portal.apps.search.usage.record_level', side_effect=[Exception('db'), None])
+
+    assert not usage.record_levels('test.system', [('/a', [], []), ('/b', [], [])])
+
+    assert usage.record_level.call_count == 2
+
+
+def test_complete():
+    usage.record_level('test.system', '/a/b', [], [tapis_file('/a/b/1.txt', 100)])
+    assert not usage.is_complete('test.system', '/')
+    assert not usage.is_complete('test.system', '/a/b')
+
+    usage.mark_complete('test.system', '/a')
+    assert usage.is_complete('test.system', '/a/b')
+    assert not usage.is_complete('test.system', '/')
+
+
+def test_failure_marks_incomplete(mocker):
+    usage.record_level('test.system', '/a', [], [])
+    usage.mark_complete('test.system', '/')
+    mocker.patch('portal.apps.search.usage.record_level', side_effect=Exception('db'))
+
+    usage.record_levels('test.system', [('/a', [], [])])
+
+    assert not usage.is_complete('test.system', '/')
+
+
+def test_snapshots():
+    usage.record_levels('test.system', [
+        ('/', [folder('/a')], []),
+        ('/a', [folder('/a/b')], [tapis_file('/a/1.txt', 10)]),
+        ('/a/b', [], [tapis_file('/a/b/1.txt', 100)]),
+    ])
+    StorageUsageSnapshot.objects.create(system='test.system', path='/', total_bytes=50,
+                                        created=timezone.now() - timedelta(days=2))
+    StorageUsageSnapshot.objects.create(system='test.system', path='/', total_bytes=10,
+                                        created=timezone.now() - timedelta(days=60))
+
+    snapshot_storage_usage()
+
+    # PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH is 1
+    assert StorageUsageSnapshot.objects.filter(path='/a/b').count() == 0
+    history = usage.get_history('test.system', '/', days=30)
+    assert [snapshot.total_bytes for snapshot in history] == [50, 110]
@@ -1,11 +1,17 @@
 from django.dispatch import receiver
 from portal.apps.signals.signals import portal_event
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from portal.apps.notifications.models import Notification
+from portal.apps.notifications.tasks import queue_message
 from portal.apps.onboarding.models import SetupEvent
 from portal.apps.projects.models.metadata import ProjectMetadata
+from portal.apps.workspace.models import AppTrayCategory, AppTrayEntry
+from portal.apps.workspace.app_tray import schedule_public_apps_refresh
 from portal.apps.search.tasks import index_project
-from django.contrib.auth import get_user_model
+from portal.apps.jupyter_mounts.manifest import schedule_manifest_rebuild
+from portal.apps.signals.tasks import send_setup_event_message, coalesce_setup_event, flush_setup_event
+from django.conf import settings
 import logging
 import copy
 from asgiref.sync import async_to_sync
@@ -49,21 +55,11 @@ def send_notification_ws(sender, instance, created, **kwargs):
     logger.debug("Received a Notification event")
     if not created:
         return
-    try:
-        instance_dict = instance.to_dict()
-        logger.info(instance_dict)
-        async_to_sync(channel_layer.group_send)(
-            instance.user,
-            {
-                'type': 'portal_notification',
-                'body': instance_dict
-            }
-        )
-    except Exception:
-        logger.exception(
-            'Exception sending message to channel: portal_notification',
-            extra=instance.to_dict())
-    return
+    # The message is queued in the outbox within the same transaction as the
+    # notification, and delivered to the channel layer by a worker.
+    instance_dict = instance.to_dict()
+    logger.info(instance_dict)
+    queue_message(instance.user, instance_dict)
 
 
 @receiver(post_save, sender=ProjectMetadata, dispatch_uid='index_project')
@@ -71,6 +67,46 @@ def index_project_on_save(sender, instance, created, **kwargs):
     index_project.apply_async(args=[instance.project_id])
 
 
+@receiver(pre_save, sender=ProjectMetadata, dispatch_uid='project_pi_changed')
+def rebuild_mounts_on_pi_change(sender, instance, raw, **kwargs):
+    # A removed or replaced PI is no longer listed by the metadata once it is
+    # saved, so their manifest is rebuilt here.
+    if raw or instance.pk is None:
+        return
+    previous = ProjectMetadata.objects.filter(pk=instance.pk).values_list('pi__username', flat=True).first()
+    if previous and previous != getattr(instance.pi, 'username', None):
+        schedule_manifest_rebuild(previous)
+
+
+@receiver(post_save, sender=ProjectMetadata, dispatch_uid='project_mounts_saved')
+def rebuild_mounts_on_project_save(sender, instance, created, **kwargs):
+    for username in instance.members():
+        schedule_manifest_rebuild(username)
+
+
+@receiver(m2m_changed, sender=ProjectMetadata.co_pis.through, dispatch_uid='project_co_pis_changed')
+@receiver(m2m_changed, sender=ProjectMetadata.team_members.through, dispatch_uid='project_team_members_changed')
+def rebuild_mounts_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Members being removed are no longer listed by the metadata once it is
+    # saved, so their manifests are rebuilt here.
+    if action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        usernames = [instance.username]
+    else:
+        usernames = get_user_model().objects.filter(pk__in=pk_set).values_list('username', flat=True)
+    for username in usernames:
+        schedule_manifest_rebuild(username)
+
+
+@receiver(post_save, sender=AppTrayEntry, dispatch_uid='app_tray_entry_saved')
+@receiver(post_delete, sender=AppTrayEntry, dispatch_uid='app_tray_entry_deleted')
+@receiver(post_save, sender=AppTrayCategory, dispatch_uid='app_tray_category_saved')
+@receiver(post_delete, sender=AppTrayCategory, dispatch_uid='app_tray_category_deleted')
+def refresh_app_tray_on_change(sender, instance, **kwargs):
+    schedule_public_apps_refresh()
+
+
 @receiver(post_save, sender=SetupEvent, dispatch_uid='setup_event')
 def send_setup_event(sender, instance, created, **kwargs):
     # Only send the event if it is being saved. (Creation also triggers post_save)
@@ -80,35 +116,25 @@ def send_setup_event(sender, instance, created, **kwargs):
     logger.debug("Sending setup event through websocket")
     setup_event = instance
 
-    # All staff will receive websocket notifications so they can see
-    # setup event updates for users they are administering
-    receiving_users = get_user_model().objects.all().filter(is_staff=True)
-    receiving_users = [user for user in receiving_users]
-    # Add the setup_event's user to the notification list
-    receiving_users.append(setup_event.user)
+    # Users viewing onboarding status changes should receive "live" messages,
+    # but only the latest state of a step matters; rapid successive events of
+    # the same step are coalesced into one message.
+    window = settings.PORTAL_SETUP_EVENT_COALESCE_WINDOW
     try:
-        data = {
-            "event_type": "setup_event",
-            "setup_event": setup_event.to_dict()
-        }
-        for user in receiving_users:
-            async_to_sync(channel_layer.group_send)(
-                user.username,
+        if not window:
+            send_setup_event_message(
+                setup_event.user.username,
+                setup_event.user.is_staff,
                 {
-                    'type': 'portal_notification',
-                    'body': data
+                    "event_type": "setup_event",
+                    "setup_event": setup_event.to_dict()
                 }
             )
-
-        # Short expiry. Users viewing onboarding status changes should receive
-        # "live" messages. Users viewing the page after an event happens
-        # should be able to retrieve setup state without needing live
-        # notifications. This also prevents staff from accumulating messages
-        # for all users.
-
-        # TODO: translate this to channels?
-        #  rp.publish_message(msg, expire=10)
-
+        elif coalesce_setup_event(setup_event):
+            flush_setup_event.apply_async(
+                args=[setup_event.user.username, setup_event.step],
+                countdown=window
+            )
     except Exception:
         logger.exception(
             'Exception sending message to channel: portal_notification',
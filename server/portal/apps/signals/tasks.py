@@ -0,0 +1,98 @@
+import logging
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from portal.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+STAFF_GROUP = 'portal_staff'
+
+SCHEDULED = 'signals.setup_event.scheduled'
+COALESCED = 'signals.setup_event.coalesced'
+SENT = 'signals.setup_event.sent'
+
+
+def setup_event_key(username, step):
+    return 'signals:setup_event:{}:{}'.format(username, step)
+
+
+def setup_event_window_key(username, step):
+    return '{}:window'.format(setup_event_key(username, step))
+
+
+def send_setup_event_message(username, is_staff, data):
+    """Send a setup event to staff, so they can see setup event updates for
+    users they are administering, and to the user it belongs to. Each
+    takes a single group send, however many staff are connected.
+    """
+    message = {
+        'type': 'portal_notification',
+        'body': data
+    }
+    groups = [STAFF_GROUP] if is_staff else [STAFF_GROUP, username]
+    for group in groups:
+        async_to_sync(get_channel_layer().group_send)(group, message)
+    metrics.incr(SENT, len(groups))
+
+
+def coalesce_setup_event(setup_event):
+    """Buffer a setup event to be sent. The first event of a user's step
+    within settings.PORTAL_SETUP_EVENT_COALESCE_WINDOW seconds opens a window
+    and should be followed by scheduling :func:`flush_setup_event` after it;
+    every event replaces the buffered state of the step, so only the latest
+    state is sent.
+
+    :param setup_event: SetupEvent instance
+
+    :returns: True if the caller should schedule :func:`flush_setup_event`
+    :rtype: bool
+    """
+    username = setup_event.user.username
+    pending = {
+        'is_staff': setup_event.user.is_staff,
+        'data': {
+            'event_type': 'setup_event',
+            'setup_event': setup_event.to_dict()
+        }
+    }
+    timeout = settings.PORTAL_SETUP_EVENT_COALESCE_WINDOW * 10
+
+    # The state is buffered before the window is opened, so the flush of
+    # the window always finds it.
+    cache.set(setup_event_key(username, setup_event.step), pending, timeout)
+    if cache.add(setup_event_window_key(username, setup_event.step), True, timeout):
+        metrics.incr(SCHEDULED)
+        return True
+
+    metrics.incr(COALESCED)
+    return False
+
+
+@shared_task(bind=True, queue='default')
+def flush_setup_event(self, username, step):
+    """Send the buffered setup event of a user's step, re-opening the
+    coalescing window for subsequent events. The window is closed before the
+    state is read, so an event buffered meanwhile is sent by the flush of
+    the next window.
+    """
+    cache.delete(setup_event_window_key(username, step))
+    pending = cache.get(setup_event_key(username, step))
+    if pending is None:
+        return
+    try:
+        send_setup_event_message(username, pending['is_staff'], pending['data'])
+    except Exception:
+        logger.exception('Exception sending message to channel: portal_notification',
+                         extra=pending['data'])
+
+
+def get_counters():
+    """Number of setup events scheduled, coalesced into a later event, and
+    group messages sent.
+
+    :rtype: dict
+    """
+    return metrics.get_counters(SCHEDULED, COALESCED, SENT)
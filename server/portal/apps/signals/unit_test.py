@@ -0,0 +1,85 @@
+from mock import patch, MagicMock
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from portal.apps.onboarding.models import SetupEvent
+from portal.apps.signals import tasks
+
+
+class TestSendSetupEvent(TestCase):
+    fixtures = ['users']
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.get(username='username')
+        self.mock_channel_layer = MagicMock()
+        self.channel_layer_patcher = patch('portal.apps.signals.tasks.get_channel_layer',
+                                           return_value=self.mock_channel_layer)
+        self.channel_layer_patcher.start()
+        self.async_to_sync_patcher = patch('portal.apps.signals.tasks.async_to_sync', side_effect=lambda f: f)
+        self.async_to_sync_patcher.start()
+
+    def tearDown(self):
+        self.channel_layer_patcher.stop()
+        self.async_to_sync_patcher.stop()
+
+    def update_event(self, event, state):
+        event.state = state
+        event.save()
+
+    def sent_groups(self):
+        return [call[0][0] for call in self.mock_channel_layer.group_send.call_args_list]
+
+    def test_single_send_per_group(self):
+        event = SetupEvent.objects.create(user=self.user, step='step', state='pending', message='')
+        self.update_event(event, 'completed')
+
+        self.assertEqual(self.sent_groups(), ['portal_staff', 'username'])
+        body = self.mock_channel_layer.group_send.call_args[0][1]['body']
+        self.assertEqual(body['setup_event']['state'], 'completed')
+
+    def test_staff_user_is_sent_event_once(self):
+        self.user.is_staff = True
+        self.user.save()
+        event = SetupEvent.objects.create(user=self.user, step='step', state='pending', message='')
+        self.update_event(event, 'completed')
+
+        self.assertEqual(self.sent_groups(), ['portal_staff'])
+
+    @override_settings(PORTAL_SETUP_EVENT_COALESCE_WINDOW=1)
+    @patch('portal.apps.signals.receivers.flush_setup_event')
+    def test_events_are_coalesced(self, mock_flush):
+        event = SetupEvent.objects.create(user=self.user, step='step', state='pending', message='')
+        for state in ('processing', 'failed', 'completed'):
+            self.update_event(event, state)
+
+        mock_flush.apply_async.assert_called_once_with(args=['username', 'step'], countdown=1)
+        self.mock_channel_layer.group_send.assert_not_called()
+
+        tasks.flush_setup_event('username', 'step')
+
+        self.assertEqual(self.sent_groups(), ['portal_staff', 'username'])
+        body = self.mock_channel_layer.group_send.call_args[0][1]['body']
+        self.assertEqual(body['setup_event']['state'], 'completed')
+        self.assertEqual(tasks.get_counters(), {tasks.SCHEDULED: 1, tasks.COALESCED: 2, tasks.SENT: 2})
+
+        # The window is open again
+        self.update_event(event, 'pending')
+        self.assertEqual(mock_flush.apply_async.call_count, 2)
+
+    @override_settings(PORTAL_SETUP_EVENT_COALESCE_WINDOW=1)
+    @patch('portal.apps.signals.receivers.flush_setup_event')
+    def test_event_during_flush_is_sent(self, mock_flush):
+        event = SetupEvent.objects.create(user=self.user, step='step', state='pending', message='')
+        self.update_event(event, 'processing')
+
+        def update_during_send(group, message):
+            if message['body']['setup_event']['state'] == 'processing':
+                self.update_event(event, 'completed')
+        self.mock_channel_layer.group_send.side_effect = update_during_send
+        tasks.flush_setup_event('username', 'step')
+
+        self.assertEqual(mock_flush.apply_async.call_count, 2)
+        tasks.flush_setup_event('username', 'step')
+        body = self.mock_channel_layer.group_send.call_args[0][1]['body']
+        self.assertEqual(body['setup_event']['state'], 'completed')
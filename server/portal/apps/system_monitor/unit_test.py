@@ -5,6 +5,7 @@ import pytz
 from datetime import datetime
 from django.conf import settings
 from django.http import Http404
+from portal.utils import metrics
 
 
 @pytest.fixture
@@ -84,3 +85,18 @@ def test_system_monitor_when_status_endpoint_fails(client, settings, requests_mo
     requests_mock.get(settings.SYSTEM_MONITOR_URL, exc=Http404)
     response = client.get('/api/system-monitor/')
     assert response.status_code == 404
+
+
+@pytest.mark.django_db()
+def test_metrics(client, authenticated_staff):
+    metrics.incr('signals.setup_event.sent')
+    response = client.get('/api/system-monitor/metrics/')
+    assert response.status_code == 200
+    assert response.json()['signals.setup_event.sent'] == 1
+    assert response.json()['signals.setup_event.coalesced'] == 0
+
+
+@pytest.mark.django_db()
+def test_metrics_staff_only(client, authenticated_user):
+    response = client.get('/api/system-monitor/metrics/')
+    assert response.status_code == 302
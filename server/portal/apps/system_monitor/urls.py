@@ -5,4 +5,5 @@ from portal.apps.system_monitor import views
 app_name = 'system_monitor'
 urlpatterns = [
     path('', views.SysmonDataView.as_view(), name='system_monitor'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
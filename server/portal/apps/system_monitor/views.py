@@ -1,7 +1,11 @@
 from django.conf import settings
 from datetime import datetime, timedelta
 from portal.views.base import BaseApiView
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.utils.module_loading import import_string
 import dateutil.parser
 import requests
 import json
@@ -106,3 +110,17 @@ class System:
     def to_dict(self):
         r = json.dumps(self.__dict__)
         return json.loads(r)
+
+
+@method_decorator(login_required, name='dispatch')
+@method_decorator(staff_member_required, name='dispatch')
+class MetricsView(BaseApiView):
+
+    def get(self, request):
+        '''
+            Returns the counters of settings.PORTAL_METRICS_COUNTERS, by counter name
+        '''
+        counters = {}
+        for get_counters in settings.PORTAL_METRICS_COUNTERS:
+            counters.update(import_string(get_counters)())
+        return JsonResponse(counters)
@@ -3,7 +3,9 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from portal.apps.auth.models import AgaveOAuthToken
 from pytas.http import TASClient
-from portal.apps.users.utils import get_tas_allocations, get_allocations
+from django.core.cache import cache
+from portal.apps.search.usage import mark_complete, record_level, record_levels
+from portal.apps.users.utils import get_tas_allocations, get_allocations, get_tas_to_tacc_resources
 from elasticsearch.exceptions import NotFoundError
 
 
@@ -66,10 +68,54 @@ class TestUserApiViews(TestCase):
             }
         }
         self.client.login(username='test', password='test')
-        resp = self.client.get("/api/users/usage/systemId", follow=True)
+        resp = self.client.get("/api/users/usage/frontera.home.test", follow=True)
         data = resp.json()
         self.assertTrue(data["total_storage_bytes"] == 10)
 
+    def test_usage_view_rollups(self):
+        record_levels('frontera.home.test', [
+            ('/', [{'name': 'a', 'path': '/a'}], [{'name': '1.txt', 'path': '/1.txt', 'length': 1}]),
+            ('/a', [], [{'name': '2.txt', 'path': '/a/2.txt', 'length': 10}]),
+        ])
+        mark_complete('frontera.home.test', '/')
+        self.client.login(username='test', password='test')
+        resp = self.client.get("/api/users/usage/frontera.home.test", {'history': 30})
+        data = resp.json()
+        self.assertEqual(data["total_storage_bytes"], 11)
+        self.assertEqual(data["total_files"], 2)
+        self.assertEqual([(child["path"], child["total_storage_bytes"]) for child in data["children"]],
+                         [("/a", 10)])
+        self.assertEqual(data["history"], [])
+
+        resp = self.client.get("/api/users/usage/frontera.home.test", {'path': 'a/'})
+        self.assertEqual(resp.json()["total_storage_bytes"], 10)
+
+    @patch('portal.apps.users.views.IndexedFile')
+    def test_usage_view_partial_rollups(self, mocked_file):
+        mocked_file.search.return_value.filter.return_value.extra.return_value.execute.return_value.to_dict.return_value = {
+            "aggregations": {
+                "total_storage_bytes": {"value": 110}
+            }
+        }
+        record_level('frontera.home.test', '/a/b', [], [{'name': '1.txt', 'path': '/a/b/1.txt', 'length': 10}])
+        self.client.login(username='test', password='test')
+        resp = self.client.get("/api/users/usage/frontera.home.test")
+        data = resp.json()
+        self.assertEqual(data["total_storage_bytes"], 110)
+        self.assertIsNone(data["total_files"])
+
+    def test_usage_view_other_users_system(self):
+        self.client.login(username='test', password='test')
+        resp = self.client.get("/api/users/usage/frontera.home.other")
+        self.assertEqual(resp.status_code, 403)
+
+    def test_usage_view_invalid_limit(self):
+        self.client.login(username='test', password='test')
+        resp = self.client.get("/api/users/usage/frontera.home.test", {'limit': 'all'})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get("/api/users/usage/frontera.home.test", {'history': '30days'})
+        self.assertEqual(resp.status_code, 400)
+
     def test_usage_view_noauth(self):
         # TODO: API routes should return a 401 not a 302 that redirects to login
         resp = self.client.get("/api/users/usage/systemId")
@@ -210,8 +256,12 @@ class TestGetAllocations(TestCase):
 
 class TestGetIndexedAllocations(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     @patch('portal.apps.users.utils.IndexedAllocation')
     def test_checks_allocations(self, mock_idx):
+        mock_idx.from_username.return_value.is_stale.return_value = False
         get_allocations('testuser')
         mock_idx.from_username.assert_called_with('testuser')
 
@@ -222,3 +272,32 @@ class TestGetIndexedAllocations(TestCase):
         get_allocations('testuser')
         mock_get_alloc.assert_called_with('testuser')
         mock_idx().save.assert_called_with()
+
+    @patch('portal.apps.search.tasks.index_allocations')
+    @patch('portal.apps.users.utils.get_tas_allocations')
+    @patch('portal.apps.users.utils.IndexedAllocation')
+    def test_stale_allocations_refreshed_in_background(self, mock_idx, mock_get_alloc, mock_task):
+        mock_idx.from_username.return_value.is_stale.return_value = True
+        mock_idx.from_username.return_value.value.to_dict.return_value = {'active': ['stale']}
+
+        self.assertEqual(get_allocations('testuser')['active'], ['stale'])
+        get_allocations('testuser')
+
+        mock_get_alloc.assert_not_called()
+        mock_task.apply_async.assert_called_once_with(args=['testuser'])
+
+    @patch('portal.apps.search.tasks.index_allocations')
+    @patch('portal.apps.users.utils.IndexedAllocation')
+    def test_fresh_allocations_not_refreshed(self, mock_idx, mock_task):
+        mock_idx.from_username.return_value.is_stale.return_value = False
+        get_allocations('testuser')
+        mock_task.apply_async.assert_not_called()
+
+    @patch('portal.apps.users.utils.open', create=True)
+    def test_resource_mapping_read_once(self, mock_open):
+        get_tas_to_tacc_resources.cache_clear()
+        mock_open.return_value.__enter__.return_value.read.return_value = '{}'
+        get_tas_to_tacc_resources()
+        get_tas_to_tacc_resources()
+        get_tas_to_tacc_resources.cache_clear()
+        mock_open.assert_called_once()
@@ -6,7 +6,7 @@ app_name = 'users'
 urlpatterns = [
     url(r'^$', SearchView.as_view(), name='user_search'),
     url(r'^auth/$', AuthenticatedView.as_view(), name='user_authenticated'),
-    path('usage/<slug:system_id>', UsageView.as_view(), name='user_usage'),
+    path('usage/<str:system_id>', UsageView.as_view(), name='user_usage'),
     url(r'^allocations/$', AllocationsView.as_view(), name='user_allocations'),
     path('team/<slug:project_name>', TeamView.as_view(), name='user_team'),
     path('team/user/<slug:username>', UserDataView.as_view(), name='user_data'),
@@ -1,17 +1,24 @@
+from functools import lru_cache
 from django.db.models import Q
 from django.conf import settings
+from django.core.cache import cache
 from pytas.http import TASClient
 from portal.libs.elasticsearch.docs.base import IndexedAllocation
 from elasticsearch.exceptions import NotFoundError
 from portal.libs.elasticsearch.utils import get_sha256_hash
+from portal.libs.tas import gateway as tas_gateway
+from portal.utils import metrics
 import json
 import logging
-import requests
-
-from portal.exceptions.api import ApiException
+import os
 
 logger = logging.getLogger(__name__)
 
+STALE = 'users.allocations.stale'
+# Seconds during which further refreshes of the same user's allocations are
+# not queued.
+ALLOCATION_REFRESH_LOCK = 5 * 60
+
 
 def list_to_model_queries(q_comps):
     query = None
@@ -43,6 +50,18 @@ def q_to_model_queries(q):
     return query
 
 
+@lru_cache(maxsize=None)
+def get_tas_to_tacc_resources():
+    """Returns the mapping of TAS resource names to TACC systems, read once
+    per process.
+
+    : returns: tas_to_tacc_resources
+    : rtype: dict
+    """
+    with open(os.path.join(os.path.dirname(__file__), 'tas_to_tacc_resources.json')) as f:
+        return json.load(f)
+
+
 def get_tas_allocations(username):
     """Returns user allocations on TACC resources
 
@@ -58,9 +77,7 @@ def get_tas_allocations(username):
         }
     )
     tas_projects = tas_client.projects_for_user(username)
-
-    with open('portal/apps/users/tas_to_tacc_resources.json') as f:
-        tas_to_tacc_resources = json.load(f)
+    tas_to_tacc_resources = get_tas_to_tacc_resources()
 
     hosts = {}
     active_allocations = {}
@@ -111,14 +128,56 @@ def get_tas_allocations(username):
     }
 
 
+def refresh_allocations(username):
+    """
+    Fetches allocations from TAS and caches them in Elasticsearch.
+    Parameters
+        ----------
+        username: str
+            TACC username to fetch allocations for.
+        Returns
+        -------
+        dict
+    """
+    allocations = get_tas_allocations(username)
+    doc = IndexedAllocation(username=username, value=allocations)
+    doc.meta.id = get_sha256_hash(username)
+    doc.save()
+    return allocations
+
+
+def refresh_lock_key(username):
+    return 'users:allocations:refresh:{}'.format(get_sha256_hash(username))
+
+
+def schedule_allocations_refresh(username):
+    """
+    Queues a background refresh of a user's allocations, unless one was
+    queued within the last ALLOCATION_REFRESH_LOCK seconds.
+    Returns
+        -------
+        bool
+            True if a refresh was queued.
+    """
+    from portal.apps.search.tasks import index_allocations
+    if not cache.add(refresh_lock_key(username), True, ALLOCATION_REFRESH_LOCK):
+        return False
+    index_allocations.apply_async(args=[username])
+    return True
+
+
 def get_allocations(username, force=False):
     """
     Returns indexed allocation data cached in Elasticsearch, or fetches
-    allocations from TAS and indexes them if not cached yet.
+    allocations from TAS and indexes them if not cached yet. Cached
+    allocations older than settings.PORTAL_ALLOCATIONS_FRESHNESS seconds
+    are still returned, while they are refreshed in the background.
     Parameters
         ----------
         username: str
             TACC username to fetch allocations for.
+        force: bool
+            Fetch allocations from TAS even if they are cached.
         Returns
         -------
         dict
@@ -127,21 +186,21 @@ def get_allocations(username, force=False):
         if force:
             logger.debug("Forcing TAS allocation retrieval")
             raise NotFoundError
+        doc = IndexedAllocation.from_username(username)
+        if doc.is_stale(settings.PORTAL_ALLOCATIONS_FRESHNESS):
+            metrics.incr(STALE)
+            schedule_allocations_refresh(username)
         result = {
             'hosts': {},
             'portal_alloc': None,
             'active': [],
             'inactive': []
         }
-        result.update(IndexedAllocation.from_username(username).value.to_dict())
+        result.update(doc.value.to_dict())
         return result
     except NotFoundError:
         # Fall back to getting allocations from TAS
-        allocations = get_tas_allocations(username)
-        doc = IndexedAllocation(username=username, value=allocations)
-        doc.meta.id = get_sha256_hash(username)
-        doc.save()
-        return allocations
+        return refresh_allocations(username)
 
 
 def get_usernames(project_name):
@@ -150,14 +209,7 @@ def get_usernames(project_name):
     : returns: usernames
     : rtype: list
     """
-    auth = requests.auth.HTTPBasicAuth(settings.TAS_CLIENT_KEY, settings.TAS_CLIENT_SECRET)
-    r = requests.get('{0}/v1/projects/name/{1}/users'.format(settings.TAS_URL, project_name), auth=auth)
-    resp = r.json()
-    logger.debug(resp)
-    if resp['status'] == 'success':
-        return resp['result']
-    else:
-        raise ApiException('Failed to get project users', resp['message'])
+    return tas_gateway.get_project_users(project_name)
 
 
 def get_user_data(username):
@@ -166,23 +218,8 @@ def get_user_data(username):
     : returns: user_data
     : rtype: dict
     """
-    tas_client = TASClient(
-        baseURL=settings.TAS_URL,
-        credentials={
-            'username': settings.TAS_CLIENT_KEY,
-            'password': settings.TAS_CLIENT_SECRET
-        }
-    )
-    user_data = tas_client.get_user(username=username)
-    return user_data
+    return tas_gateway.get_user(username)
 
 
 def get_per_user_allocation_usage(allocation_id):
-    auth = requests.auth.HTTPBasicAuth(settings.TAS_CLIENT_KEY, settings.TAS_CLIENT_SECRET)
-    r = requests.get('{0}/v1/allocations/{1}/usage'.format(settings.TAS_URL, allocation_id), auth=auth)
-    resp = r.json()
-    logger.debug(resp)
-    if resp['status'] == 'success':
-        return resp['result']
-    else:
-        raise ApiException('Failed to get project users', resp['message'])
+    return tas_gateway.get_allocation_usage(allocation_id)
@@ -10,6 +10,9 @@ from django.utils.decorators import method_decorator
 from django.conf import settings
 from elasticsearch_dsl import Q
 from portal.libs.elasticsearch.docs.base import IndexedFile
+from portal.libs.elasticsearch.utils import subtree_query
+from portal.apps.search import usage as storage_usage
+from portal.apps.accounts.managers.user_systems import UserSystemsManager
 from pytas.http import TASClient
 from portal.apps.users.utils import get_allocations, get_usernames, get_user_data, get_per_user_allocation_usage
 
@@ -40,27 +43,68 @@ class AuthenticatedView(BaseApiView):
 
 @method_decorator(login_required, name='dispatch')
 class UsageView(BaseApiView):
+    """Storage usage of a folder (the system root by default) of one of the
+    user's own storage systems, with the usage of the folders directly in it,
+    largest first, like ``du -d 1``.
+
+    Usage is read from the rollups maintained by the indexer. For a folder
+    whose subtree has not been fully crawled since they were introduced, the
+    total bytes are summed from the index instead. Snapshots of the usage
+    over the past ``history`` days are included if requested.
+    """
+    MAX_LIMIT = 1000
+    MAX_HISTORY = 365
 
     def get(self, request, system_id):
-        username = request.user.username
-
+        user_systems = [
+            UserSystemsManager(request.user, system_name=system_name).get_system_id()
+            for system_name in settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS
+        ]
         if not system_id:
-            # get default system prefix
-            default_sys = settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEM_DEFAULT
-            default_system_prefix = settings.PORTAL_DATA_DEPOT_LOCAL_STORAGE_SYSTEMS[default_sys]['prefix']
-            system_id = default_system_prefix.format(username)
+            system_id = UserSystemsManager(request.user).get_system_id()
+        if system_id not in user_systems:
+            return JsonResponse({'message': 'Forbidden'}, status=403)
+
+        path = request.GET.get('path', '/')
+        try:
+            limit = min(max(int(request.GET.get('limit', 100)), 1), self.MAX_LIMIT)
+            history = request.GET.get('history')
+            if history:
+                history = min(max(int(history), 1), self.MAX_HISTORY)
+        except ValueError:
+            return JsonResponse({'message': 'limit and history must be integers'}, status=400)
+
+        usage = storage_usage.get_usage(system_id, path)
+        if usage is not None and storage_usage.is_complete(system_id, path):
+            out = usage.to_dict()
+            out['children'] = [child.to_dict() for child in
+                               storage_usage.list_children(system_id, path, limit=limit)]
+        else:
+            out = {
+                'system': system_id,
+                'path': storage_usage.normalize_path(path),
+                'total_storage_bytes': self._indexed_bytes(system_id, path),
+                'total_files': None,
+                'updated': None,
+                'children': []
+            }
+        if history:
+            out['history'] = [snapshot.to_dict() for snapshot in
+                              storage_usage.get_history(system_id, path, days=history)]
+        return JsonResponse(out, safe=False)
 
+    def _indexed_bytes(self, system_id, path):
         search = IndexedFile.search()
         # search = search.filter(Q({'nested': {'path': 'pems', 'query': {'term': {'pems.username': username} }} }))
         search = search.filter(Q('term', **{"system._exact": system_id}))
+        if storage_usage.normalize_path(path) != '/':
+            search = search.filter(subtree_query(storage_usage.normalize_path(path)))
         search = search.extra(size=0)
         search.aggs.metric('total_storage_bytes', 'sum', field="length")
         resp = search.execute()
         resp = resp.to_dict()
         aggs = resp["aggregations"]["total_storage_bytes"]
-        out = {}
-        out["total_storage_bytes"] = aggs.get("value", 0.0)
-        return JsonResponse(out, safe=False)
+        return aggs.get("value", 0.0)
 
 
 @method_decorator(login_required, name='dispatch')
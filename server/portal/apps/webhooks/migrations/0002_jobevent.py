@@ -0,0 +1,30 @@
+# Generated by Django 2.2.17 on 2026-10-18 13:22
+
+from django.db import migrations, models
+import django.utils.timezone
+import portal.apps.webhooks.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=300)),
+                ('status', models.CharField(max_length=32)),
+                ('owner', models.CharField(max_length=150)),
+                ('data', portal.apps.webhooks.fields.JSONField()),
+                ('received', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'unique_together': {('job_id', 'status')},
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 from django.db import models
 from django.conf import settings
 from datetime import datetime
+from django.utils import timezone
 from portal.apps.webhooks.fields import JSONField
 
 # Create your models here.
@@ -53,3 +54,32 @@ class ExternalCall(models.Model):
             "time": str(self.time),
             "webhookId": self.webhookId,
         }
+
+
+class JobEvent(models.Model):
+    """JobEvent
+
+    A job status event received from the Tapis jobs webhook, queued until
+    it is processed by :func:`portal.apps.webhooks.tasks.process_job_events`
+    """
+
+    job_id = models.CharField(max_length=300)
+
+    status = models.CharField(max_length=32)
+
+    # Username of the job owner, as reported by the webhook
+    owner = models.CharField(max_length=150)
+
+    # Job data posted by the webhook
+    data = JSONField()
+
+    received = models.DateTimeField(default=timezone.now)
+
+    processed = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        # Tapis may deliver an event more than once; only the first is kept.
+        unique_together = ('job_id', 'status')
+
+    def __str__(self):
+        return '{job_id} {status}'.format(job_id=self.job_id, status=self.status)
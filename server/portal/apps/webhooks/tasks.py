@@ -0,0 +1,178 @@
+import logging
+import os
+from collections import defaultdict
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
+from requests import HTTPError
+from agavepy.agave import AgaveException
+from portal.apps.notifications.models import Notification
+from portal.apps.search.tasks import agave_indexer
+from portal.apps.webhooks.models import JobEvent
+from portal.apps.workspace.models import JobSubmission
+from portal.utils import metrics
+
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+
+PROCESSED = 'webhooks.job_events.processed'
+INVALID = 'webhooks.job_events.invalid'
+
+
+def get_counters():
+    """Number of job events processed and ignored as invalid.
+
+    :rtype: dict
+    """
+    return metrics.get_counters(PROCESSED, INVALID)
+
+
+def validate_job_events(events):
+    """Look up the Tapis jobs of a batch of events. Ownership is checked with
+    one listing per job owner rather than one request per event; listings
+    only have job summaries, so the full record of each owned job is then
+    fetched.
+
+    :param list events: JobEvent instances
+    :returns: Jobs belonging to the owner named in their events, by job ID,
+        and the owners whose jobs could not be looked up
+    :rtype: tuple(dict, set)
+    """
+    job_ids = defaultdict(set)
+    for event in events:
+        job_ids[event.owner].add(event.job_id)
+
+    jobs = {}
+    failed = set()
+    for owner, ids in job_ids.items():
+        try:
+            agave = get_user_model().objects.get(username=owner).agave_oauth.client
+            listing = agave.jobs.list(query={'id.in': ','.join(sorted(ids))})
+            owned = [job['id'] for job in listing if job['owner'] == owner]
+            jobs.update({job_id: agave.jobs.get(jobId=job_id) for job_id in owned})
+        except ObjectDoesNotExist:
+            logger.error('Job events received for unknown user {}'.format(owner))
+            continue
+        except (HTTPError, AgaveException) as exc:
+            logger.exception('Unable to validate jobs of {}: {}'.format(owner, exc))
+            failed.add(owner)
+    return jobs, failed
+
+
+def notify_job_event(job):
+    """Notify the job owner of a job status change. If the job is finished,
+    its output is indexed and the user is pointed to it in the data depot.
+
+    :param dict job: Tapis job
+    """
+    job_status = job['status']
+    job_name = job['name']
+    archive_id = 'agave/{}/{}'.format(job['archiveSystem'], job['archivePath'].strip('/'))
+    target_path = os.path.join('/workbench/data/', archive_id.strip('/'))
+
+    event_data = {
+        Notification.EVENT_TYPE: 'job',
+        Notification.JOB_ID: job['id'],
+        Notification.STATUS: Notification.INFO,
+        Notification.USER: job['owner'],
+        Notification.MESSAGE: "Job '{}' updated to {}.".format(job_name, job_status),
+        Notification.OPERATION: 'job_status_update',
+        Notification.EXTRA: job
+    }
+
+    if job_status == 'FAILED':
+        event_data[Notification.STATUS] = Notification.ERROR
+        event_data[Notification.MESSAGE] = "Job '{}' Failed. Please try again...".format(job_name)
+        event_data[Notification.OPERATION] = 'job_failed'
+        event_data[Notification.EXTRA]['target_path'] = target_path
+        event_data[Notification.ACTION_LINK] = target_path
+    elif job_status == 'FINISHED':
+        event_data[Notification.STATUS] = Notification.SUCCESS
+        event_data[Notification.EXTRA]['job_status'] = 'FINISHED'
+        event_data[Notification.EXTRA]['target_path'] = target_path
+        event_data[Notification.MESSAGE] = "Job '{}' finished".format(job_name)
+        event_data[Notification.OPERATION] = 'job_finished'
+        event_data[Notification.ACTION_LINK] = target_path
+
+    Notification.objects.create(**event_data)
+
+    if job_status == 'FINISHED':
+        logger.debug('Preparing to Index Job Output job={}'.format(job_name))
+        agave_indexer.apply_async(args=[job['archiveSystem']], kwargs={'filePath': job['archivePath']})
+
+
+def process_job_event(event, jobs):
+    """Process a single job event.
+
+    :param event: JobEvent instance
+    :param dict jobs: Validated Tapis jobs, by job ID
+    """
+    if event.job_id not in jobs:
+        metrics.incr(INVALID)
+        logger.error('Job {} (status {}) does not belong to {}; event ignored'.format(
+            event.job_id, event.status, event.owner))
+        return
+
+    # The event payload is not authenticated, so the job is indexed and
+    # notified from its Tapis record, which the event's status must agree with.
+    job = jobs[event.job_id]
+    JobSubmission.objects.index(job)
+
+    if event.status != job['status']:
+        logger.info('Job {} event status {} does not match its status {}; no notification sent'.format(
+            event.job_id, event.status, job['status']))
+    elif event.status in settings.PORTAL_JOB_NOTIFICATION_STATES:
+        notify_job_event(job)
+    else:
+        logger.debug('Job ID {} for owner {} entered {} state (no notification sent)'.format(
+            event.job_id, event.owner, event.status))
+
+
+@shared_task(bind=True, max_retries=3, queue='default', retry_backoff=True)
+def process_job_events(self):
+    """
+    Process queued job webhook events, oldest first, in batches of
+    settings.PORTAL_JOB_EVENTS_BATCH_SIZE. Each batch is claimed with
+    SKIP LOCKED, so concurrent workers never process the same event.
+    Events of owners whose jobs could not be looked up in Tapis are left
+    queued and retried, or picked up on settings.PORTAL_JOB_EVENTS_SCHEDULE.
+    """
+    skipped = []
+    while True:
+        with transaction.atomic():
+            events = list(
+                JobEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed__isnull=True)
+                .exclude(pk__in=skipped)
+                .order_by('received')[:settings.PORTAL_JOB_EVENTS_BATCH_SIZE]
+            )
+            if not events:
+                break
+
+            jobs, failed = validate_job_events(events)
+            processed = []
+            for event in events:
+                if event.owner in failed:
+                    skipped.append(event.pk)
+                    continue
+                try:
+                    with transaction.atomic():
+                        process_job_event(event, jobs)
+                except Exception:  # pylint: disable=broad-except
+                    # A malformed event must not block the queue.
+                    logger.exception('Unable to process job event {}'.format(event))
+                processed.append(event)
+
+            now = timezone.now()
+            JobEvent.objects.filter(pk__in=[event.pk for event in processed]).update(processed=now)
+
+        for event in processed:
+            METRICS.info('job event job:{} status:{} latency:{:.3f}'.format(
+                event.job_id, event.status, (now - event.received).total_seconds()))
+        metrics.incr(PROCESSED, len(processed))
+
+    if skipped:
+        raise self.retry(countdown=60)
@@ -0,0 +1,144 @@
+import json
+import os
+from mock import patch
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db.models import signals
+from requests import HTTPError
+from celery.exceptions import Retry
+from portal.apps.notifications.models import Notification
+from portal.apps.signals.receivers import send_notification_ws
+from portal.apps.webhooks.models import JobEvent
+from portal.apps.webhooks.tasks import process_job_events
+from portal.apps.workspace.models import JobSubmission
+
+
+def tapis_job(status, job_id='3432975745362629096-242ac11b-0001-007'):
+    with open(os.path.join(os.path.dirname(__file__), 'fixtures/job_running.json')) as f:
+        job = json.load(f)
+    job.update({'id': job_id, 'status': status})
+    return job
+
+
+def tapis_job_summary(status, job_id='3432975745362629096-242ac11b-0001-007'):
+    """A job as listed by Tapis, which has no archive location."""
+    job = tapis_job(status, job_id)
+    return {field: job[field] for field in
+            ('id', 'name', 'owner', 'executionSystem', 'appId', 'created', 'status', 'endTime', '_links')}
+
+
+def job_event(status, job_id='3432975745362629096-242ac11b-0001-007'):
+    job = tapis_job(status, job_id)
+    return JobEvent.objects.create(job_id=job_id, status=status, owner=job['owner'], data=job)
+
+
+class TestProcessJobEvents(TransactionTestCase):
+    fixtures = ['users', 'auth']
+
+    def setUp(self):
+        self.mock_agave_patcher = patch('portal.apps.auth.models.AgaveOAuthToken.client', autospec=True)
+        self.mock_agave_client = self.mock_agave_patcher.start()
+        self.mock_agave_client.jobs.get.side_effect = self.get_job
+        self.mock_indexer_patcher = patch('portal.apps.webhooks.tasks.agave_indexer')
+        self.mock_indexer = self.mock_indexer_patcher.start()
+        self.user = get_user_model().objects.get(username='username')
+        signals.post_save.disconnect(sender=Notification, dispatch_uid="notification_msg")
+
+    def tearDown(self):
+        self.mock_agave_patcher.stop()
+        self.mock_indexer_patcher.stop()
+        signals.post_save.connect(send_notification_ws, sender=Notification, dispatch_uid="notification_msg")
+
+    def tapis_status(self, job_id):
+        return JobEvent.objects.filter(job_id=job_id).latest('received').status
+
+    def list_jobs(self, query):
+        return [tapis_job_summary(self.tapis_status(job_id), job_id) for job_id in query['id.in'].split(',')]
+
+    def get_job(self, jobId):
+        return tapis_job(self.tapis_status(jobId), jobId)
+
+    def test_process_job_event(self):
+        JobSubmission.objects.create(user=self.user, jobId='3432975745362629096-242ac11b-0001-007')
+        self.mock_agave_client.jobs.list.side_effect = self.list_jobs
+        event = job_event('RUNNING')
+
+        process_job_events.apply()
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed)
+        n = Notification.objects.get()
+        self.assertEqual(n.operation, 'job_status_update')
+        self.assertEqual(n.to_dict()['extra']['status'], 'RUNNING')
+        self.assertEqual(JobSubmission.objects.get().status, 'RUNNING')
+
+    def test_finished_job_output_is_indexed(self):
+        self.mock_agave_client.jobs.list.side_effect = self.list_jobs
+        job_event('FINISHED')
+
+        process_job_events.apply()
+
+        self.assertEqual(Notification.objects.get().operation, 'job_finished')
+        self.mock_indexer.apply_async.assert_called_once_with(args=['cep.home.sal'],
+                                                              kwargs={'filePath': 'archive'})
+
+    @override_settings(PORTAL_JOB_NOTIFICATION_STATES=['FINISHED'])
+    def test_state_without_notification(self):
+        self.mock_agave_client.jobs.list.side_effect = self.list_jobs
+        event = job_event('RUNNING')
+
+        process_job_events.apply()
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_job_is_indexed_from_tapis(self):
+        JobSubmission.objects.create(user=self.user, jobId='3432975745362629096-242ac11b-0001-007')
+        self.mock_agave_client.jobs.list.return_value = [tapis_job_summary('RUNNING')]
+        self.mock_agave_client.jobs.get.side_effect = None
+        self.mock_agave_client.jobs.get.return_value = tapis_job('RUNNING')
+        event = job_event('FINISHED')
+        event.data.update({'archivePath': 'elsewhere', 'lastUpdated': '2099-01-01T00:00:00Z'})
+        event.save()
+
+        process_job_events.apply()
+
+        job = JobSubmission.objects.get()
+        self.assertEqual(job.status, 'RUNNING')
+        self.assertEqual(job.archivePath, 'archive')
+        self.assertEqual(Notification.objects.count(), 0)
+        self.mock_indexer.apply_async.assert_not_called()
+
+    def test_job_of_other_user_is_ignored(self):
+        self.mock_agave_client.jobs.list.return_value = []
+        event = job_event('RUNNING')
+
+        process_job_events.apply()
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_jobs_are_validated_in_batches(self):
+        self.mock_agave_client.jobs.list.side_effect = self.list_jobs
+        for job_id in ('1', '2', '3'):
+            job_event('RUNNING', job_id=job_id)
+
+        process_job_events.apply()
+
+        # One Tapis listing per batch of PORTAL_JOB_EVENTS_BATCH_SIZE events
+        self.assertEqual(self.mock_agave_client.jobs.list.call_count, 2)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(JobEvent.objects.filter(processed__isnull=True).exists())
+
+    def test_tapis_error_leaves_event_queued(self):
+        self.mock_agave_client.jobs.list.side_effect = HTTPError
+        event = job_event('RUNNING')
+
+        with self.assertRaises(Retry):
+            process_job_events.apply(throw=True)
+
+        event.refresh_from_db()
+        self.assertIsNone(event.processed)
+        self.assertEqual(Notification.objects.count(), 0)
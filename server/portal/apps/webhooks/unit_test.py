@@ -2,11 +2,12 @@ import json
 import os
 from urllib.parse import urlencode
 from mock import patch, MagicMock
-from django.test import TestCase, TransactionTestCase, override_settings
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from django.db.models import signals
 from django.urls import reverse
 from portal.apps.notifications.models import Notification
+from portal.apps.webhooks.models import JobEvent
 from portal.apps.signals.receivers import send_notification_ws
 from portal.libs.exceptions import PortalLibException
 from portal.apps.webhooks.views import validate_agave_job
@@ -46,33 +47,42 @@ class TestValidateAgaveJob(TestCase):
 class TestJobsWebhookView(TransactionTestCase):
 
     def setUp(self):
-        signals.post_save.disconnect(sender=Notification, dispatch_uid="notification_msg")
+        self.job_event = json.load(open(os.path.join(os.path.dirname(__file__), 'fixtures/job_staging.json')))
+        self.on_commit_patcher = patch('portal.apps.webhooks.views.transaction.on_commit', side_effect=lambda f: f())
+        self.on_commit_patcher.start()
 
     def tearDown(self):
-        signals.post_save.connect(send_notification_ws, sender=Notification, dispatch_uid="notification_msg")
+        self.on_commit_patcher.stop()
 
-    @override_settings(PORTAL_JOB_NOTIFICATION_STATES=["STAGING"])
-    @patch('portal.apps.webhooks.views.validate_agave_job')
-    def test_webhook_job_post(self, mock_validate_agave_job):
-        job_event = json.load(open(os.path.join(os.path.dirname(__file__), 'fixtures/job_staging.json')))
-        mock_validate_agave_job.return_value = job_event
+    @patch('portal.apps.webhooks.views.process_job_events')
+    def test_webhook_job_post(self, mock_process_job_events):
         response = self.client.post(reverse('webhooks:jobs_wh_handler'),
-                                    json.dumps(job_event), content_type='application/json')
+                                    json.dumps(self.job_event), content_type='application/json')
         self.assertEqual(response.status_code, 200)
 
-        n = Notification.objects.last()
-        n_status = n.to_dict()['extra']['status']
-        self.assertEqual(n_status, job_event['status'])
+        event = JobEvent.objects.get()
+        self.assertEqual((event.job_id, event.status, event.owner),
+                         (self.job_event['id'], 'STAGING', 'sal'))
+        self.assertIsNone(event.processed)
+        mock_process_job_events.apply_async.assert_called_once_with()
 
-    @override_settings(PORTAL_JOB_NOTIFICATION_STATES=["RUNNING"])
-    @patch('portal.apps.webhooks.views.validate_agave_job')
-    def test_webhook_job_post_invalid_state(self, mock_validate_agave_job):
-        job_event = json.load(open(os.path.join(os.path.dirname(__file__), 'fixtures/job_staging.json')))
-        mock_validate_agave_job.return_value = job_event
+    @patch('portal.apps.webhooks.views.process_job_events')
+    def test_webhook_job_post_duplicate(self, mock_process_job_events):
+        for _ in range(2):
+            response = self.client.post(reverse('webhooks:jobs_wh_handler'),
+                                        json.dumps(self.job_event), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(JobEvent.objects.count(), 1)
+        mock_process_job_events.apply_async.assert_called_once_with()
+
+    @patch('portal.apps.webhooks.views.process_job_events')
+    def test_webhook_job_post_invalid(self, mock_process_job_events):
         response = self.client.post(reverse('webhooks:jobs_wh_handler'),
-                                    json.dumps(job_event), content_type='application/json')
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(Notification.objects.all()), 0)
+                                    json.dumps({'id': self.job_event['id']}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(JobEvent.objects.count(), 0)
+        mock_process_job_events.apply_async.assert_not_called()
 
 
 class TestInteractiveWebhookView(TestCase):
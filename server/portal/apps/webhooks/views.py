@@ -1,19 +1,18 @@
 import json
 import logging
-import os
 
 from django.contrib.auth import get_user_model
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.db import transaction
 from django.http import HttpResponse
-from django.core.exceptions import ObjectDoesNotExist
 
 from requests import HTTPError
 from agavepy.agave import AgaveException
 
 from portal.apps.notifications.models import Notification
-from portal.apps.search.tasks import agave_indexer
+from portal.apps.webhooks.models import JobEvent
+from portal.apps.webhooks.tasks import process_job_events
 from portal.views.base import BaseApiView
 from portal.libs.exceptions import PortalLibException
 from portal.exceptions.api import ApiException
@@ -22,8 +21,6 @@ from portal.apps.webhooks.utils import (
     execute_callback
 )
 
-from django.conf import settings
-
 logger = logging.getLogger(__name__)
 
 
@@ -59,165 +56,37 @@ def validate_agave_job(job_uuid, job_owner, disallowed_states=[]):
 @method_decorator(csrf_exempt, name='dispatch')
 class JobsWebhookView(BaseApiView):
     """
-    Dispatches notifications when receiving a POST request from the Agave
-    webhook service.
+    Queues job status events received from the Agave webhook service.
 
     """
 
     def post(self, request, *args, **kwargs):
-        """Notifies the user of the job status by instantiating and saving
-        a Notification instance.
-
-        If the job is finished, we also index the job and alert the user to the
-        URL of the job's location in the data depot.
+        """Records the job status event and acknowledges it immediately.
+        Events are validated against Tapis, indexed and turned into
+        notifications by :func:`portal.apps.webhooks.tasks.process_job_events`.
+        An event already received for the same job and status is ignored.
 
         Args:
             job (dict): Dictionary containing the webhook data.
 
         """
-        job = json.loads(request.body)
-
         try:
-            username = job['owner']
-            job_id = job['id']
-            archiveSystem = job['archiveSystem']
-            archivePath = job['archivePath']
-            job_status = job['status']
-            job_name = job['name']
-
-            try:
-                job['remoteSubmitted'] = str(job['remoteSubmitted'])
-                job['ended'] = str(job['ended'])
-            except KeyError:
-                pass
-
-            logger.debug(job_status)
-
-            event_data = {
-                Notification.EVENT_TYPE: 'job',
-                Notification.JOB_ID: job_id,
-                Notification.STATUS: '',
-                Notification.USER: username,
-                Notification.MESSAGE: '',
-                Notification.EXTRA: job
-            }
-
-            archive_id = 'agave/{}/{}'.format(archiveSystem, (archivePath.strip('/')))
-            target_path = os.path.join('/workbench/data/', archive_id.strip('/'))
-
-            # Verify the job UUID against the username
-            valid_state = validate_agave_job(job_id, username)
-
-            # Verify that the job status should generate a notification
-            valid_state = valid_state is not None and job_status in settings.PORTAL_JOB_NOTIFICATION_STATES
-
-            # If the job state is not valid for generating a notification,
-            # return an OK response
-            if not valid_state:
-                logger.debug(
-                    "Job ID {} for owner {} entered {} state (no notification sent)".format(
-                        job_id, username, job_status
-                    )
-                )
-                return HttpResponse("OK")
-
-            if job_status == 'FAILED':
-                logger.debug('JOB FAILED: id={} status={}'.format(job_id, job_status))
-                logger.debug('archivePath: {}'.format(archivePath))
-                event_data[Notification.STATUS] = Notification.ERROR
-                event_data[Notification.MESSAGE] = "Job '{}' Failed. Please try again...".format(job_name)
-                event_data[Notification.OPERATION] = 'job_failed'
-                event_data[Notification.EXTRA]['target_path'] = target_path
-                event_data[Notification.ACTION_LINK] = target_path
-
-                with transaction.atomic():
-                    last_notification = Notification.objects.filter(jobId=job_id).last()
-                    should_notify = True
-
-                    if last_notification:
-                        last_status = last_notification.to_dict()['extra']['status']
-                        logger.debug('last status: ' + last_status)
-
-                        if job_status == last_status:
-                            logger.debug('duplicate notification received.')
-                            should_notify = False
-
-                    if should_notify:
-                        n = Notification.objects.create(**event_data)
-                        n.save()
-
-            elif job_status == 'FINISHED':
-                logger.debug('JOB STATUS CHANGE: id={} status={}'.format(job_id, job_status))
-
-                logger.debug('archivePath: {}'.format(archivePath))
-
-                event_data[Notification.STATUS] = Notification.SUCCESS
-                event_data[Notification.EXTRA]['job_status'] = 'FINISHED'
-                event_data[Notification.EXTRA]['target_path'] = target_path
-                event_data[Notification.MESSAGE] = "Job '{}' finished".format(job_name)
-                event_data[Notification.OPERATION] = 'job_finished'
-                event_data[Notification.ACTION_LINK] = target_path
-
-                with transaction.atomic():
-                    last_notification = Notification.objects.filter(jobId=job_id).last()
-                    should_notify = True
-
-                    if last_notification:
-                        last_status = last_notification.to_dict()['extra']['status']
-                        logger.debug('last status: ' + last_status)
-
-                        if job_status == last_status:
-                            logger.debug('duplicate notification received.')
-                            should_notify = False
-
-                    if should_notify:
-                        n = Notification.objects.create(**event_data)
-                        n.save()
-                        logger.debug('Event data with action link {}'.format(event_data))
-
-                        try:
-                            logger.debug('Preparing to Index Job Output job={}'.format(job_name))
-
-                            agave_indexer.apply_async(args=[archiveSystem],
-                                                      kwargs={'filePath': archivePath})
-                            logger.debug(
-                                'Finished Indexing Job Output job={}'.format(job_name))
-                        except Exception as e:
-                            logger.exception('Error indexing job output: {}'.format(e))
-                            return HttpResponse(json.dumps(e), content_type='application/json', status=400)
-
-            else:
-                # notify
-                logger.debug('JOB STATUS CHANGE: id={} status={}'.format(job_id, job_status))
-                event_data[Notification.STATUS] = Notification.INFO
-                event_data[Notification.MESSAGE] = "Job '{}' updated to {}.".format(job_name, job_status)
-                event_data[Notification.OPERATION] = 'job_status_update'
-
-                with transaction.atomic():
-                    last_notification = Notification.objects.filter(jobId=job_id).last()
-
-                    should_notify = True
-
-                    if last_notification:
-                        last_status = last_notification.to_dict()['extra']['status']
-                        logger.debug('last status: ' + last_status)
-
-                        if job_status == last_status:
-                            logger.debug('duplicate notification received.')
-                            should_notify = False
-
-                    if should_notify:
-                        n = Notification.objects.create(**event_data)
-                        n.save()
-
-                        logger.debug(n.pk)
-
-            return HttpResponse('OK')
-
-        except (ObjectDoesNotExist, AgaveException, PortalLibException) as e:
+            job = json.loads(request.body)
+            _, created = JobEvent.objects.get_or_create(
+                job_id=job['id'],
+                status=job['status'],
+                defaults={'owner': job['owner'], 'data': job}
+            )
+        except (ValueError, KeyError) as e:
             logger.exception(e)
             return HttpResponse("ERROR", status=400)
 
+        if created:
+            transaction.on_commit(lambda: process_job_events.apply_async())
+        else:
+            logger.debug('duplicate job event received: id={} status={}'.format(job['id'], job['status']))
+        return HttpResponse('OK')
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class InteractiveWebhookView(BaseApiView):
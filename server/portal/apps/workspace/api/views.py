@@ -5,6 +5,7 @@
 import logging
 import json
 from urllib.parse import urlparse
+from requests.exceptions import HTTPError
 from datetime import timedelta
 from django.utils import timezone
 from django.http import JsonResponse
@@ -13,6 +14,7 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.urls import reverse
 from portal.utils.translations import get_jupyter_url
+from portal.utils.cursors import encode_cursor, after_cursor
 from portal.apps.workspace.api import lookups as LookupManager
 from portal.views.base import BaseApiView
 from portal.exceptions.api import ApiException
@@ -20,11 +22,15 @@ from portal.apps.licenses.models import LICENSE_TYPES, get_license_info
 from portal.libs.agave.utils import service_account
 from agavepy.agave import Agave
 from portal.libs.agave.models.systems.execution import ExecutionSystem
-from portal.apps.workspace.managers.user_applications import UserApplicationsManager
+from portal.apps.workspace.managers.user_applications import (
+    UserApplicationsManager,
+    invalidate_submission_cache
+)
 from portal.utils.translations import url_parse_inputs
-from portal.apps.workspace.models import JobSubmission
+from portal.apps.workspace.models import JobSubmission, job_index_fields
 from portal.apps.accounts.managers.user_systems import UserSystemsManager
-from portal.apps.workspace.models import AppTrayCategory, AppTrayEntry
+from portal.apps.workspace.models import AppTrayEntry
+from portal.apps.workspace import app_tray
 
 logger = logging.getLogger(__name__)
 METRICS = logging.getLogger('metrics.{}'.format(__name__))
@@ -181,11 +187,11 @@ class MetadataView(BaseApiView):
 @method_decorator(login_required, name='dispatch')
 class JobsView(BaseApiView):
     def get(self, request, *args, **kwargs):
-        agave = request.user.agave_oauth.client
         job_id = request.GET.get('job_id')
 
         # get specific job info
         if job_id:
+            agave = request.user.agave_oauth.client
             data = agave.jobs.get(jobId=job_id)
             q = {"associationIds": job_id}
             job_meta = agave.meta.listMetadata(q=json.dumps(q))
@@ -206,36 +212,41 @@ class JobsView(BaseApiView):
                 )
                 if jupyter_url:
                     data['jupyterUrl'] = jupyter_url
+            return JsonResponse({"response": data})
 
-        # list jobs
-        else:
-            limit = int(request.GET.get('limit', 10))
-            offset = int(request.GET.get('offset', 0))
-            period = request.GET.get('period', 'all')
-
-            jobs = JobSubmission.objects.all().filter(user=request.user).order_by('-time')
-
-            if period != "all":
-                enddate = timezone.now()
-                if period == "day":
-                    days = 1
-                elif period == "week":
-                    days = 7
-                elif period == "month":
-                    days = 30
-                startdate = enddate - timedelta(days=days)
-                jobs = jobs.filter(time__range=[startdate, enddate])
-
-            all_user_job_ids = [job.jobId for job in jobs]
-            user_job_ids = all_user_job_ids[offset:offset + limit]
-            if user_job_ids:
-                data = agave.jobs.list(query={'id.in': ','.join(user_job_ids)})
-                # re-order agave job info to match our time-ordered jobs
-                data = [next(job for job in data if job["id"] == id) for id in user_job_ids]
-            else:
-                data = []
-
-        return JsonResponse({"response": data})
+        # list jobs from the local job index
+        limit = int(request.GET.get('limit', 10))
+        offset = int(request.GET.get('offset', 0))
+        period = request.GET.get('period', 'all')
+        status = request.GET.get('status')
+        cursor = request.GET.get('cursor')
+
+        jobs = JobSubmission.objects.filter(user=request.user).order_by('-time', '-pk')
+
+        if period != "all":
+            enddate = timezone.now()
+            if period == "day":
+                days = 1
+            elif period == "week":
+                days = 7
+            elif period == "month":
+                days = 30
+            startdate = enddate - timedelta(days=days)
+            jobs = jobs.filter(time__range=[startdate, enddate])
+
+        if status:
+            jobs = jobs.filter(status__in=status.split(','))
+
+        if cursor:
+            jobs = after_cursor(jobs, 'time', cursor)
+            offset = 0
+
+        page = list(jobs[offset:offset + limit])
+        next_cursor = encode_cursor(page[-1].time, page[-1].pk) if len(page) == limit else None
+        return JsonResponse({
+            "response": [job.to_dict() for job in page],
+            "nextCursor": next_cursor
+        })
 
     def delete(self, request, *args, **kwargs):
         agave = request.user.agave_oauth.client
@@ -329,12 +340,18 @@ class JobsView(BaseApiView):
                                       for param in job_post['parameters']
                                       if param in [p['id'] for p in app.parameters]}
 
-            response = agave.jobs.submit(body=job_post)
+            try:
+                response = agave.jobs.submit(body=job_post)
+            except HTTPError:
+                # The cached clone or system test may be stale
+                invalidate_submission_cache(request.user.username)
+                raise
 
             if "id" in response:
                 job = JobSubmission.objects.create(
                     user=request.user,
-                    jobId=response["id"]
+                    jobId=response["id"],
+                    **job_index_fields(response)
                 )
                 job.save()
 
@@ -383,115 +400,6 @@ class JobHistoryView(BaseApiView):
 
 @method_decorator(login_required, name='dispatch')
 class AppsTrayView(BaseApiView):
-    def getAppIdBySpec(self, app, user):
-        # Retrieve the app specified in the portal
-        # Any fields that are left blank assume that we
-        # are retrieving the "latest" version
-        agave = user.agave_oauth.client
-        query = {
-            "name": app.name,
-            "isPublic": True
-        }
-        if app.version and len(app.version):
-            query['version'] = app.version
-        if app.revision and len(app.revision):
-            query['revision'] = app.revision
-        appList = agave.apps.list(query=query)
-        appList.sort(
-            key=lambda appDef: [int(u) for u in appDef['version'].split('.')] + [int(appDef['revision'])]
-        )
-        return appList[-1]['id']
-
-    def getApp(self, app, user):
-        return _get_app(self.getAppId(app, user), user)
-
-    def getAppId(self, app, user):
-        if app.appId and len(app.appId) > 0:
-            appId = app.appId
-        else:
-            appId = self.getAppIdBySpec(app, user)
-        if appId != app.lastRetrieved:
-            app.lastRetrieved = appId
-            app.save()
-        return appId
-
-    def getPrivateApps(self, user):
-        agave = user.agave_oauth.client
-        apps_listing = agave.apps.list(privateOnly=True)
-        my_apps = []
-        # Get private apps that are not prtl.clone
-        for app in filter(lambda app: not app['id'].startswith("prtl.clone"), apps_listing):
-            # Create an app "metadata" record
-            try:
-                my_apps.append(
-                    {
-                        "label": app['label'] or app['id'],
-                        "version": app['version'],
-                        "revision": app['revision'],
-                        "shortDescription": app['shortDescription'],
-                        "type": "agave",
-                        "appId": app['id'],
-                    }
-                )
-            except Exception as e:
-                logger.error(
-                    "User {} was unable to retrieve their private app {}".format(
-                        user.username, app['id']
-                    )
-                )
-                logger.exception(e)
-        return my_apps
-
-    def getPublicApps(self, user):
-        categories = []
-        definitions = {}
-        # Traverse category records in descending priority
-        for category in AppTrayCategory.objects.all().order_by('-priority'):
-            categoryResult = {
-                "title": category.category,
-                "apps": []
-            }
-
-            # Retrieve all apps known to the portal in that directory
-            apps = AppTrayEntry.objects.all().filter(available=True, category=category)
-            for app in apps:
-                # Create something similar to the old metadata record
-                appRecord = {
-                    "label": app.label or app.name,
-                    "icon": app.icon,
-                    "version": app.version,
-                    "revision": app.revision,
-                    "type": app.appType
-                }
-
-                try:
-                    if str(app.appType).lower() == 'html':
-                        # If this is an HTML app, create a definition for it
-                        # that has the 'html' field
-                        appRecord["appId"] = app.htmlId
-                        definitions[app.htmlId] = {
-                            "html": app.html,
-                            "id": app.htmlId,
-                            "label": app.label,
-                            "shortDescription": app.shortDescription,
-                            "appType": "html"
-                        }
-                    elif str(app.appType).lower() == 'agave':
-                        # If this is an agave app, retrieve the definition
-                        # from the tenant, with any license or queue
-                        # post processing
-                        appId = self.getAppId(app, user)
-                        appRecord["appId"] = appId
-
-                    categoryResult["apps"].append(appRecord)
-                except Exception:
-                    logger.info("Could not retrieve app {}".format(app))
-
-            categoryResult["apps"].sort(key=lambda app: app['label'])
-            categories.append(categoryResult)
-
-        return categories, definitions
-
     def get(self, request):
         """
         Returns a structure containing app tray categories with metadata, and app definitions
@@ -512,8 +420,9 @@ class AppsTrayView(BaseApiView):
             }
         }
         """
-        tabs, definitions = self.getPublicApps(request.user)
-        my_apps = self.getPrivateApps(request.user)
+        agave = request.user.agave_oauth.client
+        tabs, definitions = app_tray.get_public_apps(agave)
+        my_apps = app_tray.get_private_apps(agave, request.user.username)
         tabs.insert(
             0,
             {
@@ -1,15 +1,13 @@
 from portal.apps.workspace.models import JobSubmission
 from mock import MagicMock
 from django.conf import settings
-from portal.apps.workspace.api.views import JobsView, AppsTrayView
-from portal.apps.workspace.models import AppTrayCategory
+from portal.apps.workspace.api.views import JobsView
+from portal.exceptions.api import ApiException
 import json
 import os
 import pytest
-import copy
 from datetime import timedelta
 from django.utils import timezone
-from django.core.management import call_command
 
 
 pytest.mark.django_db(transaction=True)
@@ -50,7 +48,7 @@ def logging_metric_mock(mocker):
 
 def test_job_post(client, authenticated_user, get_user_data, mock_agave_client,
                   apps_manager, job_submmission_definition):
-    mock_agave_client.jobs.submit.return_value = {"id": "1234"}
+    mock_agave_client.jobs.submit.return_value = {"id": "1234", "status": "ACCEPTED"}
 
     response = client.post(
         "/api/workspace/jobs",
@@ -58,11 +56,12 @@ def test_job_post(client, authenticated_user, get_user_data, mock_agave_client,
         content_type="application/json"
     )
     assert response.status_code == 200
-    assert response.json() == {"response": {"id": "1234"}}
+    assert response.json() == {"response": {"id": "1234", "status": "ACCEPTED"}}
 
     # The job submission request
     job = JobSubmission.objects.all()[0]
     assert job.jobId == "1234"
+    assert job.status == "ACCEPTED"
 
 
 def test_job_post_is_logged_for_metrics(client, authenticated_user, get_user_data, mock_agave_client,
@@ -89,13 +88,11 @@ def request_jobs_util(rf, authenticated_user, query_params={}):
 
 
 def test_get_no_jobs(rf, authenticated_user, mock_agave_client):
-    mock_agave_client.jobs.list.return_value = []
     jobs = request_jobs_util(rf, authenticated_user)
     assert len(jobs) == 0
 
 
 def test_get_jobs_bad_offset(rf, authenticated_user, mock_agave_client):
-    mock_agave_client.jobs.list.return_value = []
     jobs = request_jobs_util(rf, authenticated_user, query_params={"offset": 100})
     assert len(jobs) == 0
 
@@ -131,13 +128,6 @@ def test_date_filter(rf, authenticated_user, mock_agave_client):
     )
     JobSubmission.objects.filter(jobId="3456").update(time=test_time - timedelta(days=120))
 
-    mock_agave_client.jobs.list.return_value = [
-        {"id": "9876"},
-        {"id": "1234"},
-        {"id": "2345"},
-        {"id": "3456"}
-    ]
-
     # Test request for jobs with no period query param
     jobs = request_jobs_util(rf, authenticated_user)
     assert len(jobs) == 4
@@ -158,90 +148,65 @@ def test_date_filter(rf, authenticated_user, mock_agave_client):
     jobs = request_jobs_util(rf, authenticated_user, query_params={"period": "day"})
     assert len(jobs) == 1
 
+    # Listings are served from the local job index
+    mock_agave_client.jobs.list.assert_not_called()
+
 
-def test_get_appid_by_spec(authenticated_user, mock_agave_client):
-    compress_01u1 = {
-        'id': 'compress-0.1u1',
-        'name': 'compress',
-        'version': '0.1',
-        'revision': '1'
-    }
-    compress_01u2 = {
-        'id': 'compress-0.1u2',
-        'name': 'compress',
-        'version': '0.1',
-        'revision': '2'
-    }
-    compress_02u1 = {
-        'id': 'compress-0.2u1',
-        'name': 'compress',
-        'version': '0.2',
-        'revision': 1
-    }
-    view = AppsTrayView()
-    mock_agave_client.apps.list.return_value = [compress_01u1, compress_01u2]
-    assert view.getAppIdBySpec(
-        MagicMock(name='compress', version='0.1'), authenticated_user) == 'compress-0.1u2'
-    mock_agave_client.apps.list.return_value = [compress_01u2, compress_02u1]
-    assert view.getAppIdBySpec(
-        MagicMock(name='compress', version='0.1'), authenticated_user) == 'compress-0.2u1'
-
-
-def test_get_app(mocker, authenticated_user):
-    mock_get_by_spec = mocker.patch.object(AppsTrayView, 'getAppIdBySpec')
-    mock_get_app = mocker.patch('portal.apps.workspace.api.views._get_app')
-    view = AppsTrayView()
-
-    # Try retrieving an app spec without a specific appId
-    mock_spec = MagicMock(
-        name='compress', version='0.1', appId=None, lastRetrieved='compress-0.1u1'
+def test_get_jobs_from_index(rf, authenticated_user, mock_agave_client):
+    JobSubmission.objects.create(
+        user=authenticated_user,
+        jobId="1234",
+        status="FINISHED",
+        appId="compress-0.1u1",
+        name="compress",
+        archiveSystem="frontera.home.username",
+        archivePath="archive/jobs/compress-1234"
     )
-    mock_get_by_spec.return_value = 'compress-0.1u1'
-    view.getApp(mock_spec, authenticated_user)
-    mock_get_app.assert_called_with('compress-0.1u1', authenticated_user)
-
-    # Try retrieving a specific app ID and see that the lastRetrieved field is updated
-    mock_spec.appId = 'compress-0.2u1'
-    view.getApp(mock_spec, authenticated_user)
-    assert mock_spec.lastRetrieved == 'compress-0.2u1'
-    mock_get_app.assert_called_with('compress-0.2u1', authenticated_user)
-
-
-def test_get_private_apps(authenticated_user, mock_agave_client, mocker):
-    view = AppsTrayView()
-    mock_get_app = mocker.patch('portal.apps.workspace.api.views._get_app')
-    app = {
-        'id': 'myapp-0.1',
-        'label': 'My App',
-        'version': '0.1',
-        'revision': '1',
-        'shortDescription': 'My App',
-    }
-    mock_agave_client.apps.list.return_value = [
-        {
-            'id': 'prtl.clone.hidden'
-        },
-        app
-    ]
-    mock_get_app.return_value = app
-    expected_list = [copy.deepcopy(app)]
-    expected_list[0]['type'] = 'agave'
-    expected_list[0]['appId'] = 'myapp-0.1'
-    expected_list[0].pop('id', None)
-    assert view.getPrivateApps(authenticated_user) == expected_list
-
-
-@pytest.mark.django_db(transaction=True)
-def test_get_public_apps(django_db_setup, django_db_blocker, mocker,
-                         mock_agave_client, authenticated_user):
-    # Load fixtures
-    with django_db_blocker.unblock():
-        call_command('loaddata', 'app-tray.json')
-    # Assert that fixtures were loaded
-    assert len(AppTrayCategory.objects.all()) == 3
-    mocker.patch.object(AppsTrayView, 'getApp')
-    view = AppsTrayView()
-    categories, definitions = view.getPublicApps(authenticated_user)
-    assert len(categories) == 3
-    assert categories[0]['title'] == 'Simulation'
-    assert len(categories[0]['apps']) == 1
+    jobs = request_jobs_util(rf, authenticated_user)
+    assert jobs[0]["id"] == "1234"
+    assert jobs[0]["status"] == "FINISHED"
+    assert jobs[0]["appId"] == "compress-0.1u1"
+    assert jobs[0]["outputLocation"] == "frontera.home.username/archive/jobs/compress-1234"
+
+
+def test_get_jobs_cursor(rf, authenticated_user, mock_agave_client):
+    test_time = timezone.now()
+    for i in range(5):
+        JobSubmission.objects.create(user=authenticated_user, jobId=str(i), time=test_time - timedelta(hours=i))
+    # Jobs submitted at the same time are ordered by their row id
+    JobSubmission.objects.create(user=authenticated_user, jobId="5", time=test_time - timedelta(hours=4))
+
+    view = JobsView()
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        request = rf.get("/api/workspace/jobs/", params)
+        request.user = authenticated_user
+        result = json.loads(view.get(request).content)
+        ids += [job["id"] for job in result["response"]]
+        cursor = result["nextCursor"]
+        if not cursor:
+            break
+    assert ids == ["0", "1", "2", "3", "5", "4"]
+
+
+def test_get_jobs_bad_cursor(rf, authenticated_user, mock_agave_client):
+    request = rf.get("/api/workspace/jobs/", {"cursor": "invalid"})
+    request.user = authenticated_user
+    with pytest.raises(ApiException):
+        JobsView().get(request)
+
+
+def test_get_jobs_status_filter(rf, authenticated_user, mock_agave_client):
+    JobSubmission.objects.create(user=authenticated_user, jobId="1", status="RUNNING")
+    JobSubmission.objects.create(user=authenticated_user, jobId="2", status="FINISHED")
+    JobSubmission.objects.create(user=authenticated_user, jobId="3", status="FAILED")
+
+    jobs = request_jobs_util(rf, authenticated_user, query_params={"status": "RUNNING"})
+    assert [job["id"] for job in jobs] == ["1"]
+
+    jobs = request_jobs_util(rf, authenticated_user, query_params={"status": "FINISHED,FAILED"})
+    assert [job["id"] for job in jobs] == ["3", "2"]
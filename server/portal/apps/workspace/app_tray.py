@@ -0,0 +1,229 @@
+"""
+.. :module:: apps.workspace.app_tray
+   :synopsis: Cached app tray catalog
+"""
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from portal.apps.workspace.models import AppTrayCategory, AppTrayEntry
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_APPS_KEY = 'workspace:app_tray:public'
+REFRESH_LOCK_KEY = 'workspace:app_tray:refresh'
+# Seconds to wait before rebuilding the catalog after a change, so that a
+# burst of admin changes results in a single rebuild.
+REFRESH_DELAY = 5
+
+
+def private_apps_key(username):
+    return 'workspace:app_tray:private:{}'.format(username)
+
+
+def get_app_id_by_spec(client, app):
+    """Retrieve the id of the latest public app matching an app tray entry.
+    Any fields that are left blank assume that we are retrieving the "latest"
+    version.
+
+    :param client: Agave client
+    :param app: AppTrayEntry instance
+
+    :returns: App id
+    :rtype: str
+    """
+    query = {
+        "name": app.name,
+        "isPublic": True
+    }
+    if app.version and len(app.version):
+        query['version'] = app.version
+    if app.revision and len(app.revision):
+        query['revision'] = app.revision
+    appList = client.apps.list(query=query)
+    appList.sort(
+        key=lambda appDef: [int(u) for u in appDef['version'].split('.')] + [int(appDef['revision'])]
+    )
+    return appList[-1]['id']
+
+
+def get_app_id(client, app):
+    """Resolve the app id of an app tray entry, recording it as the entry's
+    last retrieved id.
+
+    :param client: Agave client
+    :param app: AppTrayEntry instance
+
+    :returns: App id
+    :rtype: str
+    """
+    if app.appId and len(app.appId) > 0:
+        appId = app.appId
+    else:
+        appId = get_app_id_by_spec(client, app)
+    if appId != app.lastRetrieved:
+        app.lastRetrieved = appId
+        # Update without saving the instance, which would trigger a rebuild
+        # of the catalog.
+        AppTrayEntry.objects.filter(pk=app.pk).update(lastRetrieved=appId)
+    return appId
+
+
+def build_public_apps(client):
+    """Build the public app tray categories, in descending priority, and the
+    definitions of HTML apps. Agave apps which cannot be resolved fall back
+    to their last retrieved id.
+
+    :param client: Agave client
+
+    :returns: categories, definitions
+    :rtype: tuple(list, dict)
+    """
+    entries = defaultdict(list)
+    for app in AppTrayEntry.objects.filter(available=True):
+        entries[app.category_id].append(app)
+
+    categories = []
+    definitions = {}
+    # Traverse category records in descending priority
+    for category in AppTrayCategory.objects.all().order_by('-priority'):
+        categoryResult = {
+            "title": category.category,
+            "apps": []
+        }
+
+        for app in entries[category.pk]:
+            # Create something similar to the old metadata record
+            appRecord = {
+                "label": app.label or app.name,
+                "icon": app.icon,
+                "version": app.version,
+                "revision": app.revision,
+                "type": app.appType
+            }
+
+            try:
+                if str(app.appType).lower() == 'html':
+                    # If this is an HTML app, create a definition for it
+                    # that has the 'html' field
+                    appRecord["appId"] = app.htmlId
+                    definitions[app.htmlId] = {
+                        "html": app.html,
+                        "id": app.htmlId,
+                        "label": app.label,
+                        "shortDescription": app.shortDescription,
+                        "appType": "html"
+                    }
+                elif str(app.appType).lower() == 'agave':
+                    try:
+                        appRecord["appId"] = get_app_id(client, app)
+                    except Exception:
+                        if not app.lastRetrieved:
+                            raise
+                        logger.warning("Using last retrieved id of app {}".format(app))
+                        appRecord["appId"] = app.lastRetrieved
+
+                categoryResult["apps"].append(appRecord)
+            except Exception:
+                logger.info("Could not retrieve app {}".format(app))
+
+        categoryResult["apps"].sort(key=lambda app: app['label'])
+        categories.append(categoryResult)
+
+    return categories, definitions
+
+
+def refresh_public_apps(client):
+    """Rebuild the cached public app tray catalog.
+
+    :param client: Agave client
+
+    :returns: categories, definitions
+    :rtype: tuple(list, dict)
+    """
+    categories, definitions = build_public_apps(client)
+    cache.set(PUBLIC_APPS_KEY, {'categories': categories, 'definitions': definitions}, None)
+    return categories, definitions
+
+
+def get_public_apps(client):
+    """Public app tray catalog, built by a background task when app tray
+    entries or categories change and on
+    settings.PORTAL_APP_TRAY_REFRESH_SCHEDULE. It is only built in the
+    request if it is not cached yet.
+
+    :param client: Agave client
+
+    :returns: categories, definitions
+    :rtype: tuple(list, dict)
+    """
+    catalog = cache.get(PUBLIC_APPS_KEY)
+    if catalog is None:
+        return refresh_public_apps(client)
+    return catalog['categories'], catalog['definitions']
+
+
+def schedule_public_apps_refresh():
+    """Queue a rebuild of the public app tray catalog once the current
+    transaction commits, unless one is already queued.
+    """
+    from portal.apps.workspace.tasks import refresh_app_tray
+
+    def schedule():
+        if cache.add(REFRESH_LOCK_KEY, True, REFRESH_DELAY):
+            refresh_app_tray.apply_async(countdown=REFRESH_DELAY)
+    transaction.on_commit(schedule)
+
+
+def list_private_apps(client, username):
+    """List a user's private apps, other than portal clones.
+
+    :param client: Agave client
+    :param str username: Username
+
+    :returns: App records
+    :rtype: list
+    """
+    apps_listing = client.apps.list(privateOnly=True)
+    my_apps = []
+    # Get private apps that are not prtl.clone
+    for app in filter(lambda app: not app['id'].startswith("prtl.clone"), apps_listing):
+        # Create an app "metadata" record
+        try:
+            my_apps.append(
+                {
+                    "label": app['label'] or app['id'],
+                    "version": app['version'],
+                    "revision": app['revision'],
+                    "shortDescription": app['shortDescription'],
+                    "type": "agave",
+                    "appId": app['id'],
+                }
+            )
+        except Exception as e:
+            logger.error(
+                "User {} was unable to retrieve their private app {}".format(
+                    username, app['id']
+                )
+            )
+            logger.exception(e)
+    return my_apps
+
+
+def get_private_apps(client, username):
+    """A user's private apps, cached for settings.PORTAL_APP_TRAY_PRIVATE_TTL
+    seconds.
+
+    :param client: Agave client
+    :param str username: Username
+
+    :returns: App records
+    :rtype: list
+    """
+    key = private_apps_key(username)
+    my_apps = cache.get(key)
+    if my_apps is None:
+        my_apps = list_private_apps(client, username)
+        cache.set(key, my_apps, settings.PORTAL_APP_TRAY_PRIVATE_TTL)
+    return my_apps
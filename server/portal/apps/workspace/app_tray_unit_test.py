@@ -0,0 +1,144 @@
+import copy
+import json
+import pytest
+from django.core.management import call_command
+from portal.apps.signals.receivers import refresh_app_tray_on_change  # noqa: F401
+from portal.apps.workspace import app_tray
+from portal.apps.workspace.models import AppTrayCategory, AppTrayEntry
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def app_tray_fixtures(django_db_blocker, mock_refresh_app_tray):
+    with django_db_blocker.unblock():
+        call_command('loaddata', 'app-tray.json')
+    yield
+
+
+@pytest.fixture
+def mock_refresh_app_tray(mocker):
+    yield mocker.patch('portal.apps.workspace.tasks.refresh_app_tray')
+
+
+@pytest.fixture
+def on_commit(mocker):
+    yield mocker.patch('portal.apps.workspace.app_tray.transaction.on_commit', side_effect=lambda f: f())
+
+
+def test_get_appid_by_spec(authenticated_user, mock_agave_client):
+    compress_01u1 = {
+        'id': 'compress-0.1u1',
+        'name': 'compress',
+        'version': '0.1',
+        'revision': '1'
+    }
+    compress_01u2 = {
+        'id': 'compress-0.1u2',
+        'name': 'compress',
+        'version': '0.1',
+        'revision': '2'
+    }
+    compress_02u1 = {
+        'id': 'compress-0.2u1',
+        'name': 'compress',
+        'version': '0.2',
+        'revision': 1
+    }
+    client = authenticated_user.agave_oauth.client
+    mock_agave_client.apps.list.return_value = [compress_01u1, compress_01u2]
+    assert app_tray.get_app_id_by_spec(
+        client, AppTrayEntry(name='compress', version='0.1')) == 'compress-0.1u2'
+    mock_agave_client.apps.list.return_value = [compress_01u2, compress_02u1]
+    assert app_tray.get_app_id_by_spec(
+        client, AppTrayEntry(name='compress', version='0.1')) == 'compress-0.2u1'
+
+
+def test_get_app_id(mocker, app_tray_fixtures):
+    mock_get_by_spec = mocker.patch('portal.apps.workspace.app_tray.get_app_id_by_spec')
+    mock_get_by_spec.return_value = 'namd-frontera-2.1.3u3'
+    app = AppTrayEntry.objects.get(name='namd-frontera')
+
+    # Try retrieving a specific app ID
+    assert app_tray.get_app_id(None, app) == 'namd-frontera-2.1.3u2'
+    mock_get_by_spec.assert_not_called()
+
+    # Try retrieving an app spec without a specific appId and see that the lastRetrieved field is updated
+    app.appId = ''
+    assert app_tray.get_app_id(None, app) == 'namd-frontera-2.1.3u3'
+    assert AppTrayEntry.objects.get(pk=app.pk).lastRetrieved == 'namd-frontera-2.1.3u3'
+
+
+def test_list_private_apps(authenticated_user, mock_agave_client):
+    app = {
+        'id': 'myapp-0.1',
+        'label': 'My App',
+        'version': '0.1',
+        'revision': '1',
+        'shortDescription': 'My App',
+    }
+    mock_agave_client.apps.list.return_value = [
+        {
+            'id': 'prtl.clone.hidden'
+        },
+        app
+    ]
+    expected_list = [copy.deepcopy(app)]
+    expected_list[0]['type'] = 'agave'
+    expected_list[0]['appId'] = 'myapp-0.1'
+    expected_list[0].pop('id', None)
+    assert app_tray.list_private_apps(authenticated_user.agave_oauth.client, 'username') == expected_list
+
+
+def test_build_public_apps(app_tray_fixtures, django_assert_max_num_queries):
+    # Assert that fixtures were loaded
+    assert len(AppTrayCategory.objects.all()) == 3
+    with django_assert_max_num_queries(2):
+        categories, definitions = app_tray.build_public_apps(None)
+    assert len(categories) == 3
+    assert categories[0]['title'] == 'Simulation'
+    assert len(categories[0]['apps']) == 1
+    assert [app['appId'] for app in categories[1]['apps']] == [
+        'frontera-hpc-jupyter-1.0u11', 'matlab-9.5u7', 'RStudio-S2-1.1.423u1']
+    assert list(definitions) == ['vis-portal']
+
+
+def test_build_public_apps_falls_back_to_last_retrieved(mocker, app_tray_fixtures):
+    mocker.patch('portal.apps.workspace.app_tray.get_app_id_by_spec', side_effect=Exception)
+    AppTrayEntry.objects.filter(name='namd-frontera').update(appId='')
+
+    categories, _ = app_tray.build_public_apps(None)
+
+    assert categories[0]['apps'][0]['appId'] == 'namd-frontera-2.1.3u2'
+
+
+def test_app_tray_is_cached(client, authenticated_user, mock_agave_client, app_tray_fixtures):
+    mock_agave_client.apps.list.return_value = []
+
+    for _ in range(2):
+        response = client.get('/api/workspace/tray')
+        tabs = json.loads(response.content)['tabs']
+        assert [tab['title'] for tab in tabs] == ['My Apps', 'Simulation', 'Data Processing', 'Visualization']
+
+    # Private apps listed once
+    mock_agave_client.apps.list.assert_called_once_with(privateOnly=True)
+
+
+def test_change_refreshes_app_tray(mock_refresh_app_tray, on_commit):
+    category = AppTrayCategory.objects.create(category='Simulation')
+    AppTrayEntry.objects.create(category=category, label='NAMD', appId='namd-frontera-2.1.3u2')
+    category.delete()
+
+    # Changes within the refresh delay are coalesced into one rebuild
+    mock_refresh_app_tray.apply_async.assert_called_once_with(countdown=app_tray.REFRESH_DELAY)
+
+
+def test_refresh_app_tray(mocker, app_tray_fixtures):
+    from portal.apps.workspace.tasks import refresh_app_tray
+    mocker.patch('portal.libs.agave.utils.service_account')
+    refresh_app_tray()
+
+    categories, definitions = app_tray.get_public_apps(None)
+    assert len(categories) == 3
+    assert list(definitions) == ['vis-portal']
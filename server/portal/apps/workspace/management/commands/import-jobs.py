@@ -3,7 +3,7 @@ from django.core.management import BaseCommand, CommandError
 from django.conf import settings
 from portal.libs.agave.utils import service_account
 from django.contrib.auth import get_user_model
-from portal.apps.workspace.models import JobSubmission
+from portal.apps.workspace.models import JobSubmission, job_index_fields
 import dateutil.parser
 
 class Command(BaseCommand):
@@ -11,7 +11,8 @@ class Command(BaseCommand):
     This command imports the job histories for all existing users from the Agave
     tenant to the JobSubmission model. This populates the job history from the tenant
     as if this portal submitted them. (The originating portal cannot be determined
-    from the tenant respnose.)
+    from the tenant respnose.) Jobs already in the history have their status, app,
+    name and archive location refreshed.
     """
 
     help = "Import all jobs from the tenant into JobSubmission history."
@@ -32,9 +33,12 @@ class Command(BaseCommand):
                         job = JobSubmission(
                             user=user,
                             jobId=job["id"],
-                            time=dateutil.parser.parse(job["created"])
+                            time=dateutil.parser.parse(job["created"]),
+                            **job_index_fields(job)
                         )
                         job.save()
+                    else:
+                        JobSubmission.objects.index(job)
                 offset += 100
                 done = len(jobs) < 100
                 total += len(jobs)
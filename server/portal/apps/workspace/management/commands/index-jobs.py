@@ -0,0 +1,37 @@
+import logging
+from django.core.management import BaseCommand
+from portal.libs.agave.utils import service_account
+from portal.apps.workspace.models import JobSubmission
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    This command refreshes the local job index from the Agave tenant for jobs
+    in the JobSubmission history that have not been indexed, such as jobs
+    submitted before the index existed. Job listings are served from the index,
+    so this must be run once after migrating to workspace 0004.
+    """
+
+    help = "Index JobSubmission history entries with no status from the tenant."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Refresh every job, not only unindexed ones")
+
+    def handle(self, *args, **options):
+        agave = service_account()
+        jobs = JobSubmission.objects.all()
+        if not options['all']:
+            jobs = jobs.filter(status='')
+        job_ids = list(jobs.values_list('jobId', flat=True).distinct())
+        print("Indexing {} jobs...".format(len(job_ids)))
+        indexed = 0
+        for job_id in job_ids:
+            try:
+                job = agave.jobs.get(jobId=job_id)
+            except Exception:
+                logger.exception('Could not retrieve job {}'.format(job_id))
+                continue
+            indexed += JobSubmission.objects.index(job)
+        print("Indexed {} jobs".format(indexed))
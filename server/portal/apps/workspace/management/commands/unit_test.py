@@ -29,11 +29,14 @@ class TestImportJobs(TransactionTestCase):
         self.mock_client.return_value.jobs.list.return_value = [
             {
                 "id": "1234",
-                "created": "2019-10-29T18:30:13Z"
+                "created": "2019-10-29T18:30:13Z",
+                "status": "FINISHED"
             },
             {
                 "id": "5678",
-                "created": "2019-10-29T19:30:13Z"
+                "created": "2019-10-29T19:30:13Z",
+                "status": "RUNNING",
+                "appId": "compress-0.1u1"
             }
         ]
 
@@ -41,3 +44,35 @@ class TestImportJobs(TransactionTestCase):
 
         result = JobSubmission.objects.all().filter(user=self.user)
         self.assertEqual(len(result), 2)
+        self.assertEqual(result.get(jobId="1234").status, "FINISHED")
+        self.assertEqual(result.get(jobId="5678").appId, "compress-0.1u1")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestIndexJobs(TransactionTestCase):
+    fixtures = ['users']
+
+    def setUp(self):
+        self.mock_client_patcher = patch('portal.apps.workspace.management.commands.index-jobs.service_account')
+        self.mock_client = self.mock_client_patcher.start()
+        self.user = get_user_model().objects.get(username="username")
+
+    def tearDown(self):
+        self.mock_client_patcher.stop()
+
+    def test_index_unindexed_jobs(self):
+        JobSubmission.objects.create(jobId="1234", user=self.user)
+        JobSubmission.objects.create(jobId="5678", user=self.user, status="FINISHED")
+        self.mock_client.return_value.jobs.get.return_value = {
+            "id": "1234",
+            "status": "RUNNING",
+            "appId": "compress-0.1u1",
+            "lastUpdated": "2019-10-29T18:30:13Z"
+        }
+
+        call_command('index-jobs')
+
+        self.mock_client.return_value.jobs.get.assert_called_once_with(jobId="1234")
+        job = JobSubmission.objects.get(jobId="1234")
+        self.assertEqual(job.status, "RUNNING")
+        self.assertEqual(job.appId, "compress-0.1u1")
@@ -1,12 +1,15 @@
 import os
 import json
 from django.conf import settings
-from mock import patch
+from mock import patch, MagicMock
 from django.test import TransactionTestCase
 from django.contrib.auth import get_user_model
 import pytest
 
-from portal.apps.workspace.managers.user_applications import UserApplicationsManager
+from portal.apps.workspace.managers.user_applications import (
+    UserApplicationsManager,
+    invalidate_submission_cache
+)
 from portal.libs.agave.models.applications import Application
 from portal.libs.agave.models.systems.execution import ExecutionSystem
 
@@ -105,3 +108,54 @@ class TestUserApplicationsManager(TransactionTestCase):
         cloned_app = Application(mock_client)
 
         self.assertTrue(self.user_application_manager.check_app_for_updates(cloned_app=cloned_app, host_app=host_app))
+
+    def application(self, app_id, **kwargs):
+        app = Application(self.magave, load=False, **kwargs)
+        app.id = app_id
+        return app
+
+    def test_get_or_create_app_caches_clone_and_system_test(self):
+        host_app = self.application('compress-0.1u1', revision=1, owner='wma_prtl', executionSystem='frontera')
+        cloned_app = self.application('prtl.clone.username.alloc.compress-0.1u1-1.0',
+                                      parameters=[{'id': 'param'}])
+        exec_sys = MagicMock(id='username.alloc.exec.frontera.HPC')
+        exec_sys.test.return_value = (True, 'SUCCESS')
+
+        with patch.object(UserApplicationsManager, 'get_application', return_value=host_app), \
+                patch.object(UserApplicationsManager, 'get_or_create_cloned_app',
+                             return_value=cloned_app) as mock_clone, \
+                patch.object(UserApplicationsManager, 'get_or_create_cloned_app_exec_system',
+                             return_value=exec_sys) as mock_exec_sys:
+            for _ in range(2):
+                app = self.user_application_manager.get_or_create_app('compress-0.1u1', 'alloc')
+                self.assertEqual(app.id, 'prtl.clone.username.alloc.compress-0.1u1-1.0')
+                self.assertEqual(app.parameters, [{'id': 'param'}])
+                self.assertIsNone(app.exec_sys)
+
+            self.assertEqual(mock_clone.call_count, 1)
+            self.assertEqual(mock_exec_sys.call_count, 1)
+            self.assertEqual(exec_sys.test.call_count, 1)
+
+            # Another allocation is cloned separately, the system test is reused
+            self.user_application_manager.get_or_create_app('compress-0.1u1', 'other')
+            self.assertEqual(mock_clone.call_count, 2)
+            self.assertEqual(exec_sys.test.call_count, 1)
+
+            # Resetting keys invalidates the cache
+            invalidate_submission_cache('username')
+            self.user_application_manager.get_or_create_app('compress-0.1u1', 'alloc')
+            self.assertEqual(mock_clone.call_count, 3)
+            self.assertEqual(exec_sys.test.call_count, 2)
+
+    @patch('portal.apps.workspace.managers.user_applications.ExecutionSystem')
+    def test_get_or_create_app_failed_system_test_is_not_cached(self, mock_exec_sys):
+        mock_exec_sys.return_value.owner = 'username'
+        mock_exec_sys.return_value.test.return_value = (False, 'FAIL')
+
+        with patch.object(UserApplicationsManager, 'get_application', side_effect=lambda app_id: self.application(
+                app_id, revision=1, owner='username', executionSystem='frontera')):
+            for _ in range(2):
+                app = self.user_application_manager.get_or_create_app('compress-0.1u1', 'alloc')
+                self.assertEqual(app.exec_sys, mock_exec_sys.return_value)
+
+        self.assertEqual(mock_exec_sys.return_value.test.call_count, 2)
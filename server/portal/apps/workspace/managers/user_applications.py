@@ -3,9 +3,11 @@
    : synopsis: Manager handling user's cloned applications and systems
 """
 import logging
+import uuid
 
 from requests.exceptions import HTTPError
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
 
@@ -19,6 +21,32 @@ logger = logging.getLogger(__name__)
 # pylint: enable=invalid-name
 
 
+def submission_cache_generation(username):
+    """Token included in the keys of a user's cached clone resolutions and
+    system tests, so that they can all be invalidated at once.
+
+    :param str username: Username
+
+    :returns: Generation token
+    :rtype: str
+    """
+    key = 'workspace:submission:gen:{}'.format(username)
+    gen = cache.get(key)
+    if gen is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        gen = cache.get(key)
+    return gen
+
+
+def invalidate_submission_cache(username):
+    """Invalidate a user's cached clone resolutions and system tests, e.g.
+    after the keys of one of their systems were reset.
+
+    :param str username: Username
+    """
+    cache.set('workspace:submission:gen:{}'.format(username), uuid.uuid4().hex, None)
+
+
 class UserApplicationsManager(AbstractApplicationsManager):
     """User Applications Manager
 
@@ -221,12 +249,77 @@ class UserApplicationsManager(AbstractApplicationsManager):
             else:
                 raise
 
+    def clone_cache_key(self, host_app, allocation):
+        return 'workspace:clone:{gen}:{username}:{appId}:{rev}:{allocation}'.format(
+            gen=submission_cache_generation(self.user.username),
+            username=self.user.username,
+            appId=host_app.id,
+            rev=host_app.revision,
+            allocation=allocation
+        )
+
+    def system_test_cache_key(self, system_id):
+        return 'workspace:system_test:{gen}:{username}:{systemId}'.format(
+            gen=submission_cache_generation(self.user.username),
+            username=self.user.username,
+            systemId=system_id
+        )
+
+    def get_cached_cloned_app(self, host_app, allocation):
+        """Gets the cloned app and execution system id resolved for a host app
+        revision and allocation by a previous submission, if any.
+
+        :param host_app: Application instance of host app
+        :param str allocation: Project allocation for app to be run on
+
+        :returns: Application instance and execution system id, or None
+        :rtype: tuple
+        """
+        resolved = cache.get(self.clone_cache_key(host_app, allocation))
+        if resolved is None:
+            return None
+        definition = dict(resolved['app'])
+        app_id = definition.pop('id')
+        # ``id`` would be taken as the id of an app to load
+        app = Application(self.client, load=False, **definition)
+        app.id = app_id
+        return app, resolved['execSystem']
+
+    def test_exec_system(self, exec_sys_id, exec_sys=None):
+        """Tests a user's access to an execution system. Successful tests are
+        cached for settings.PORTAL_EXEC_SYSTEM_TEST_TTL seconds.
+
+        :param str exec_sys_id: Agave id of the execution system
+        :param exec_sys: ExecutionSystem instance, if already retrieved
+
+        :returns: ExecutionSystem instance if the user must reset and push
+            keys for the system, else None
+        :rtype: class ExecutionSystem
+        """
+        key = self.system_test_cache_key(exec_sys_id)
+        if cache.get(key):
+            logger.debug('System {} passed a recent test.'.format(exec_sys_id))
+            return None
+
+        if exec_sys is None:
+            exec_sys = ExecutionSystem(self.client, exec_sys_id, ignore_error=None)
+        sys_ok, res = exec_sys.test()
+        if sys_ok:
+            cache.set(key, True, settings.PORTAL_EXEC_SYSTEM_TEST_TTL)
+        elif exec_sys.owner == self.user.username:
+            logger.debug(res)
+            logger.info('System {} needs new keys.'.format(exec_sys.id))
+            return exec_sys
+        return None
+
     def get_or_create_app(self, appId, allocation):
         """Gets or creates application for user.
 
         If application selected is owned by user, return the app,
         else clone the app to the same exec system with the
-        specified allocation.
+        specified allocation. The clone resolved for a host app revision
+        and allocation is cached for settings.PORTAL_APP_CLONE_CACHE_TTL
+        seconds, so that subsequent submissions only retrieve the host app.
 
         ..note: Entry point.
 
@@ -238,24 +331,33 @@ class UserApplicationsManager(AbstractApplicationsManager):
         """
 
         host_app = self.get_application(appId)
+        exec_sys = None
 
         # if app is owned by user, no need to clone
         if host_app.owner == self.user.username:
             logger.info('User is app owner, no need to clone. Returning original app.')
             app = host_app
-            exec_sys = ExecutionSystem(self.client, app.execution_system, ignore_error=None)
+            exec_sys_id = app.execution_system
 
         else:
-            app = self.get_or_create_cloned_app(host_app, allocation)
-            exec_sys = self.get_or_create_cloned_app_exec_system(host_app.execution_system, allocation)
+            cached = self.get_cached_cloned_app(host_app, allocation)
+            if cached is not None:
+                logger.debug('Using cloned app resolved by a previous submission.')
+                app, exec_sys_id = cached
+            else:
+                app = self.get_or_create_cloned_app(host_app, allocation)
+                exec_sys = self.get_or_create_cloned_app_exec_system(host_app.execution_system, allocation)
+                exec_sys_id = exec_sys.id
+                if not app.exec_sys:
+                    cache.set(
+                        self.clone_cache_key(host_app, allocation),
+                        {'app': app.to_dict(), 'execSystem': exec_sys_id},
+                        settings.PORTAL_APP_CLONE_CACHE_TTL
+                    )
 
         # Check if app's execution system needs keys reset and pushed
         if not app.exec_sys:
-            sys_ok, res = exec_sys.test()
-            if not sys_ok and (exec_sys.owner == self.user.username):
-                logger.debug(res)
-                logger.info('System {} needs new keys.'.format(exec_sys.id))
-                app.exec_sys = exec_sys
+            app.exec_sys = self.test_exec_system(exec_sys_id, exec_sys)
 
         return app
 
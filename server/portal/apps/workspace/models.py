@@ -1,12 +1,62 @@
+from datetime import datetime
+import dateutil.parser
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 
+def _parse_time(value):
+    if not value or isinstance(value, datetime):
+        return value or None
+    return dateutil.parser.parse(str(value))
+
+
+def job_index_fields(job):
+    """Fields of the local job index found in a Tapis job.
+
+    :param dict job: Job as returned by Tapis or posted by its webhook
+    :returns: JobSubmission field values
+    :rtype: dict
+    """
+    fields = {}
+    for field in ('status', 'appId', 'name', 'archiveSystem', 'archivePath'):
+        if field in job:
+            fields[field] = job[field] or ''
+    if 'lastUpdated' in job:
+        fields['lastUpdated'] = _parse_time(job['lastUpdated'])
+    ended = job.get('ended') or job.get('endTime')
+    if ended:
+        fields['ended'] = _parse_time(ended)
+    return fields
+
+
+class JobSubmissionManager(models.Manager):
+
+    def index(self, job):
+        """Update the local copy of a Tapis job.
+
+        Updates older than the stored one are ignored, so that webhook
+        events delivered out of order cannot roll a job's status back.
+
+        :param dict job: Job as returned by Tapis
+        :returns: number of rows updated
+        :rtype: int
+        """
+        fields = job_index_fields(job)
+        jobs = self.filter(jobId=job['id'])
+        if fields.get('lastUpdated'):
+            jobs = jobs.filter(
+                models.Q(lastUpdated__isnull=True) | models.Q(lastUpdated__lte=fields['lastUpdated'])
+            )
+        return jobs.update(**fields)
+
+
 class JobSubmission(models.Model):
     """Job Submission
 
-    Used for tracking jobs that originate from this portal for filtering purposes
+    Used for tracking jobs that originate from this portal for filtering purposes.
+    Also a local index of these jobs, kept current by the jobs webhook, so job
+    listings do not need to query Tapis.
     """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -18,7 +68,40 @@ class JobSubmission(models.Model):
     time = models.DateTimeField(default=timezone.now)
 
     # ID of job returned from Agave
-    jobId = models.CharField(max_length=300)
+    jobId = models.CharField(max_length=300, db_index=True)
+
+    status = models.CharField(max_length=32, blank=True)
+    appId = models.CharField(max_length=300, blank=True)
+    name = models.CharField(max_length=300, blank=True)
+    lastUpdated = models.DateTimeField(null=True, blank=True)
+    ended = models.DateTimeField(null=True, blank=True)
+    archiveSystem = models.CharField(max_length=300, blank=True)
+    archivePath = models.CharField(max_length=1024, blank=True)
+
+    objects = JobSubmissionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-time']),
+            models.Index(fields=['user', 'status', '-time']),
+        ]
+
+    def to_dict(self):
+        """Job listing entry, in the shape of a Tapis job listing."""
+        return {
+            'id': self.jobId,
+            'name': self.name,
+            'appId': self.appId,
+            'status': self.status,
+            'created': self.time.isoformat(),
+            'lastUpdated': self.lastUpdated.isoformat() if self.lastUpdated else None,
+            'ended': self.ended.isoformat() if self.ended else None,
+            'archiveSystem': self.archiveSystem,
+            'archivePath': self.archivePath,
+            'outputLocation': '{}/{}'.format(
+                self.archiveSystem, self.archivePath.strip('/')
+            ) if self.archiveSystem else None,
+        }
 
 
 class AppTrayCategory(models.Model):
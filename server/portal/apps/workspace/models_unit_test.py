@@ -16,7 +16,43 @@ def test_job_submission_model(django_db_reset_sequences, regular_user):
     assert event.jobId == "1234"
 
 
-def test_app_tray_models(django_db_reset_sequences):
+def test_job_submission_index(django_db_reset_sequences, regular_user):
+    JobSubmission.objects.create(
+        user=regular_user,
+        jobId="1234"
+    )
+    JobSubmission.objects.index({
+        "id": "1234",
+        "status": "RUNNING",
+        "appId": "compress-0.1u1",
+        "lastUpdated": "2020-08-20T12:00:00.000-05:00"
+    })
+    job = JobSubmission.objects.get(jobId="1234")
+    assert job.status == "RUNNING"
+    assert job.appId == "compress-0.1u1"
+
+    # An update older than the indexed one is ignored
+    JobSubmission.objects.index({
+        "id": "1234",
+        "status": "QUEUED",
+        "lastUpdated": "2020-08-20T11:00:00.000-05:00"
+    })
+    assert JobSubmission.objects.get(jobId="1234").status == "RUNNING"
+
+    JobSubmission.objects.index({
+        "id": "1234",
+        "status": "FINISHED",
+        "lastUpdated": "2020-08-20T13:00:00.000-05:00",
+        "ended": "2020-08-20T13:00:00.000-05:00"
+    })
+    job = JobSubmission.objects.get(jobId="1234")
+    assert job.status == "FINISHED"
+    assert job.to_dict()["ended"] == job.ended.isoformat()
+    assert job.to_dict()["outputLocation"] is None
+
+
+def test_app_tray_models(django_db_reset_sequences, mocker):
+    mocker.patch('portal.apps.workspace.tasks.refresh_app_tray')
     category = AppTrayCategory.objects.create(
         category="test_category"
     )
@@ -57,3 +57,16 @@ def submit_job(request, username, job_post):
         err_resp['status_code'] = e.response.status_code
         logger.warning(err_resp)
         raise JobSubmitError(**err_resp)
+
+
+@shared_task(bind=True, max_retries=3, queue='api')
+def refresh_app_tray(self):
+    """
+    Rebuild the cached public app tray catalog, resolving the latest
+    revision of apps which are not pinned to an app id.
+    """
+    from portal.apps.workspace.app_tray import refresh_public_apps
+    from portal.libs.agave.utils import service_account
+    categories, _ = refresh_public_apps(service_account())
+    logger.info('Refreshed app tray catalog of {} apps'.format(
+        sum(len(category['apps']) for category in categories)))
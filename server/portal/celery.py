@@ -40,6 +40,49 @@ if settings.COMMUNITY_INDEX_SCHEDULE:
         'schedule': crontab(**settings.COMMUNITY_INDEX_SCHEDULE)
     }
 
+if settings.COMMUNITY_INDEX_SCHEDULE and settings.COMMUNITY_FULL_INDEX_SCHEDULE:
+    app.conf.beat_schedule['index_community_full'] = {
+        'task': 'portal.apps.search.tasks.index_community_data',
+        'schedule': crontab(**settings.COMMUNITY_FULL_INDEX_SCHEDULE),
+        'kwargs': {'incremental': False}
+    }
+
+if settings.PORTAL_ALLOCATIONS_REFRESH_SCHEDULE:
+    app.conf.beat_schedule['refresh_active_allocations'] = {
+        'task': 'portal.apps.search.tasks.refresh_active_allocations',
+        'schedule': crontab(**settings.PORTAL_ALLOCATIONS_REFRESH_SCHEDULE)
+    }
+
+if settings.PORTAL_JOB_EVENTS_SCHEDULE:
+    app.conf.beat_schedule['process_job_events'] = {
+        'task': 'portal.apps.webhooks.tasks.process_job_events',
+        'schedule': crontab(**settings.PORTAL_JOB_EVENTS_SCHEDULE)
+    }
+
+if settings.PORTAL_RETENTION_SCHEDULE:
+    app.conf.beat_schedule['apply_retention_policies'] = {
+        'task': 'portal.apps.retention.tasks.apply_retention_policies',
+        'schedule': crontab(**settings.PORTAL_RETENTION_SCHEDULE)
+    }
+
+if settings.PORTAL_NOTIFICATION_OUTBOX_SCHEDULE:
+    app.conf.beat_schedule['dispatch_outbox'] = {
+        'task': 'portal.apps.notifications.tasks.dispatch_outbox',
+        'schedule': crontab(**settings.PORTAL_NOTIFICATION_OUTBOX_SCHEDULE)
+    }
+
+if settings.PORTAL_APP_TRAY_REFRESH_SCHEDULE:
+    app.conf.beat_schedule['refresh_app_tray'] = {
+        'task': 'portal.apps.workspace.tasks.refresh_app_tray',
+        'schedule': crontab(**settings.PORTAL_APP_TRAY_REFRESH_SCHEDULE)
+    }
+
+if settings.PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE:
+    app.conf.beat_schedule['snapshot_storage_usage'] = {
+        'task': 'portal.apps.search.tasks.snapshot_storage_usage',
+        'schedule': crontab(**settings.PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE)
+    }
+
 
 @app.task(bind=True)
 def debug_task(self):
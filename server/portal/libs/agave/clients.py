@@ -0,0 +1,321 @@
+"""
+.. module: portal.libs.agave.clients
+   :synopsis: Factory of Tapis clients which share keep-alive connection
+   pools and are reused for the lifetime of a worker thread.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+import pkg_resources
+import requests
+from requests.adapters import HTTPAdapter
+from agavepy.agave import Agave, load_resource
+from django.conf import settings
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+# pylint: enable=invalid-name
+
+SERVICE_ACCOUNT = '__service_account__'
+
+_lock = threading.Lock()
+_adapters = {}
+_resources = {}
+_stats = Counter()
+_local = threading.local()
+
+
+def _prefix(api_server):
+    return api_server.rstrip('/') + '/'
+
+
+def adapter(api_server):
+    """
+    Connection pool shared by every client and session talking to a tenant.
+    Unlike sessions, adapters hold no cookies or credentials, so sharing them
+    between users only shares open connections.
+
+    Parameters
+    ----------
+    api_server: str
+        Tenant base URL.
+
+    Returns
+    -------
+    requests.adapters.HTTPAdapter
+    """
+    with _lock:
+        if api_server not in _adapters:
+            _adapters[api_server] = HTTPAdapter(pool_maxsize=settings.PORTAL_AGAVE_POOL_MAXSIZE)
+        return _adapters[api_server]
+
+
+def session(api_server):
+    """
+    New ``requests`` session whose requests to a tenant reuse the tenant's
+    pooled connections.
+
+    Parameters
+    ----------
+    api_server: str
+        Tenant base URL.
+
+    Returns
+    -------
+    requests.Session
+    """
+    sess = requests.Session()
+    sess.mount(_prefix(api_server), adapter(api_server))
+    return sess
+
+
+def resources_version(api_server):
+    """
+    Stamp identifying resource definitions generated for a tenant by the
+    installed agavepy.
+
+    Returns
+    -------
+    str
+    """
+    try:
+        version = pkg_resources.get_distribution('agavepy').version
+    except pkg_resources.DistributionNotFound:
+        version = 'unknown'
+    return 'agavepy-{}:{}'.format(version, api_server)
+
+
+def _read_resources(path, version):
+    try:
+        with open(path) as cached:
+            data = json.load(cached)
+    except (IOError, ValueError):
+        return None
+    if data.get('version') != version:
+        return None
+    return data['resources']
+
+
+def _write_resources(path, version, rsrcs):
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or None)
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump({'version': version, 'resources': rsrcs}, tmp)
+        os.replace(tmp_path, path)
+    except (IOError, OSError):
+        logger.warning('Could not cache Tapis resources to {}'.format(path), exc_info=True)
+
+
+def resources(api_server):
+    """
+    Tapis API resource definitions, loaded on first use and kept for the
+    life of the process. Generating them renders every agavepy template, so
+    they are also cached to ``settings.PORTAL_AGAVE_RESOURCES_CACHE`` (if
+    set) and reused by other processes until agavepy or the tenant changes.
+
+    Parameters
+    ----------
+    api_server: str
+        Tenant base URL.
+
+    Returns
+    -------
+    dict
+    """
+    with _lock:
+        if api_server in _resources:
+            return _resources[api_server]
+
+        path = settings.PORTAL_AGAVE_RESOURCES_CACHE
+        version = resources_version(api_server)
+        rsrcs = _read_resources(path, version) if path else None
+        if rsrcs is None:
+            rsrcs = load_resource(api_server)
+            if path:
+                _write_resources(path, version, rsrcs)
+        _resources[api_server] = rsrcs
+        return rsrcs
+
+
+class PooledAgave(Agave):
+    """
+    Tapis client whose HTTP sessions use the tenant's shared connection
+    pool, and whose token is swapped in place on refresh instead of
+    rebuilding its API resources.
+    """
+
+    def resource(self, auth_type, *args):
+        res = super(PooledAgave, self).resource(auth_type, *args)
+        if res is not None:
+            res.http_client.session.mount(_prefix(self.api_server), adapter(self.api_server))
+        return res
+
+    def refresh_aris(self):
+        # Agave.__getattr__ turns unset attributes into API resources, so
+        # look in __dict__ for resources built by a previous call.
+        ari = self.__dict__.get('all')
+        if ari is None or self.jwt or self.use_nonce:
+            super(PooledAgave, self).refresh_aris()
+            return
+        ari.http_client.authenticator.token = self._token
+
+    def set_token(self, access_token, refresh_token, created):
+        """
+        Replace the client's token with a newer one, e.g. after another
+        process refreshed it.
+        """
+        self._token = access_token
+        self._refresh_token = refresh_token
+        self.refresh_token = refresh_token
+        self.created_at = created
+        if self.token is not None:
+            self.token.token_info.update({'access_token': access_token,
+                                          'refresh_token': refresh_token,
+                                          'created_at': created})
+        self.refresh_aris()
+
+
+def _clients():
+    if not hasattr(_local, 'clients'):
+        _local.clients = OrderedDict()
+    return _local.clients
+
+
+def _cached(key, build):
+    """
+    Look up a client in the current thread's LRU cache, building it on a
+    miss. Clients are not thread-safe, so each thread keeps its own.
+    """
+    clients = _clients()
+    client = clients.get(key)
+    if client is not None:
+        clients.move_to_end(key)
+        with _lock:
+            _stats['hits'] += 1
+        return client
+
+    client = build()
+    clients[key] = client
+    while len(clients) > settings.PORTAL_AGAVE_CLIENT_CACHE_SIZE:
+        clients.popitem(last=False)
+    with _lock:
+        _stats['misses'] += 1
+    stats = pool_stats()
+    METRICS.info('agave client built for:{} hits:{} misses:{} connections:{} requests:{}'.format(
+        key, stats['hits'], stats['misses'], stats['connections'], stats['requests']))
+    return client
+
+
+def _token_callback(username):
+    """
+    Callback saving a token refreshed by a cached client to the user's
+    token row. Cached clients outlive the token instance they were built
+    from, so the row is updated by user rather than by saving that
+    instance, and a newer token (e.g. from a new login) is not replaced.
+    """
+    def save(**token_info):
+        from portal.apps.auth.models import AgaveOAuthToken
+        fields = ('token_type', 'scope', 'access_token', 'refresh_token', 'expires_in')
+        values = {key: token_info[key] for key in fields if key in token_info}
+        tokens = AgaveOAuthToken.objects.filter(user__username=username)
+        if 'created_at' in token_info:
+            values['created'] = token_info['created_at']
+            tokens = tokens.filter(created__lte=values['created'])
+        tokens.update(**values)
+    return save
+
+
+def user_client(token):
+    """
+    Tapis client for a user's stored OAuth token. Refreshed tokens are
+    saved to the user's token row.
+
+    Parameters
+    ----------
+    token: portal.apps.auth.models.AgaveOAuthToken
+        The user's token.
+
+    Returns
+    -------
+    PooledAgave
+    """
+    username = token.user.username
+
+    def build():
+        return PooledAgave(
+            api_server=settings.AGAVE_TENANT_BASEURL,
+            api_key=settings.AGAVE_CLIENT_KEY,
+            api_secret=settings.AGAVE_CLIENT_SECRET,
+            token=token.access_token,
+            resources=resources(settings.AGAVE_TENANT_BASEURL),
+            refresh_token=token.refresh_token,
+            token_callback=_token_callback(username),
+            token_username=username,
+            created_at=token.created
+        )
+
+    client = _cached(username, build)
+    current = client._token  # pylint: disable=protected-access
+    if current != token.access_token and token.created > (client.created_at or 0):
+        # The token was refreshed or replaced (e.g. on a new login) since
+        # the client was built.
+        client.set_token(token.access_token, token.refresh_token, token.created)
+        with _lock:
+            _stats['token_updates'] += 1
+    return client
+
+
+def service_client():
+    """
+    Tapis client authenticated with the portal's service token.
+
+    Returns
+    -------
+    PooledAgave
+    """
+    return _cached(SERVICE_ACCOUNT, lambda: PooledAgave(
+        api_server=settings.AGAVE_TENANT_BASEURL,
+        token=settings.AGAVE_SUPER_TOKEN,
+        resources=resources(settings.AGAVE_TENANT_BASEURL)
+    ))
+
+
+def pool_stats():
+    """
+    Client cache and connection reuse statistics for the current process.
+    ``requests - connections`` requests were made on a reused connection.
+
+    Returns
+    -------
+    dict
+        Client cache hits and misses, in-place token updates, and the number
+        of connections opened and requests made through the shared pools.
+    """
+    with _lock:
+        stats = dict(_stats)
+        adapters = list(_adapters.values())
+    stats.setdefault('hits', 0)
+    stats.setdefault('misses', 0)
+    stats.setdefault('token_updates', 0)
+    stats['connections'] = 0
+    stats['requests'] = 0
+    for _adapter in adapters:
+        pools = _adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['connections'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+    return stats
+
+
+def clear():
+    """
+    Drop the current thread's cached clients.
+    """
+    _clients().clear()
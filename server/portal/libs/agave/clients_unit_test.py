@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+from mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from portal.apps.auth.models import AgaveOAuthToken
+from portal.libs.agave import clients
+
+
+def mock_token(username='username', access_token='token', created=1000):
+    token = MagicMock(access_token=access_token, refresh_token='refresh', created=created)
+    token.user.username = username
+    return token
+
+
+@patch('portal.libs.agave.clients.resources', MagicMock(return_value={}))
+@patch('portal.libs.agave.clients.PooledAgave')
+class TestClients(TestCase):
+
+    def setUp(self):
+        clients.clear()
+
+    def tearDown(self):
+        clients.clear()
+
+    def test_user_client_is_reused(self, mock_agave):
+        mock_agave.return_value._token = 'token'
+        mock_agave.return_value.created_at = 1000
+        token = mock_token()
+
+        client = clients.user_client(token)
+
+        self.assertIs(clients.user_client(token), client)
+        mock_agave.assert_called_once()
+        client.set_token.assert_not_called()
+
+    def test_newer_token_is_swapped_in_place(self, mock_agave):
+        mock_agave.return_value._token = 'token'
+        mock_agave.return_value.created_at = 1000
+        client = clients.user_client(mock_token())
+
+        self.assertIs(clients.user_client(mock_token(access_token='new', created=2000)), client)
+        client.set_token.assert_called_once_with('new', 'refresh', 2000)
+
+    def test_older_token_does_not_replace_refreshed_one(self, mock_agave):
+        # The client refreshed its token after it was built from this one.
+        mock_agave.return_value._token = 'refreshed'
+        mock_agave.return_value.created_at = 2000
+        clients.user_client(mock_token())
+        clients.user_client(mock_token())
+
+        mock_agave.return_value.set_token.assert_not_called()
+
+    def test_refreshed_token_is_saved_to_current_row(self, mock_agave):
+        user = get_user_model().objects.create_user('username', 'username@user.com', 'password')
+        token = AgaveOAuthToken.objects.create(
+            user=user, token_type='bearer', scope='default', access_token='token',
+            refresh_token='refresh', expires_in=14400, created=1000
+        )
+        mock_agave.return_value._token = 'token'
+        mock_agave.return_value.created_at = 1000
+        clients.user_client(token)
+        callback = mock_agave.call_args[1]['token_callback']
+
+        # The row was replaced by a newer login after the client was built.
+        AgaveOAuthToken.objects.filter(pk=token.pk).update(access_token='login', created=3000)
+        callback(access_token='refreshed', refresh_token='refreshed', expires_in=14400, created_at=2000)
+        self.assertEqual(AgaveOAuthToken.objects.get(pk=token.pk).access_token, 'login')
+
+        callback(access_token='refreshed', refresh_token='refreshed', expires_in=14400,
+                 created_at=4000, expires_at='Thu Jan  1 01:06:40 1970')
+        saved = AgaveOAuthToken.objects.get(pk=token.pk)
+        self.assertEqual((saved.access_token, saved.refresh_token, saved.created), ('refreshed', 'refreshed', 4000))
+
+    def test_cache_is_bounded(self, mock_agave):
+        mock_agave.side_effect = lambda **kwargs: MagicMock(_token=kwargs['token'], created_at=1000)
+        first = clients.user_client(mock_token('user1'))
+        clients.user_client(mock_token('user2'))
+        clients.user_client(mock_token('user3'))
+
+        self.assertIsNot(clients.user_client(mock_token('user1')), first)
+        self.assertEqual(mock_agave.call_count, 4)
+
+    def test_clients_are_not_shared_between_threads(self, mock_agave):
+        mock_agave.side_effect = lambda **kwargs: MagicMock(_token=kwargs['token'], created_at=1000)
+        client = clients.user_client(mock_token())
+        other = []
+        thread = threading.Thread(target=lambda: other.append(clients.user_client(mock_token())))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(other[0], client)
+
+
+class TestSessions(TestCase):
+
+    def test_sessions_share_tenant_adapter(self):
+        first = clients.session('https://api.example.com')
+        second = clients.session('https://api.example.com')
+
+        self.assertIsNot(first, second)
+        self.assertIs(first.get_adapter('https://api.example.com/files/v2/'),
+                      second.get_adapter('https://api.example.com/files/v2/'))
+        self.assertIsNot(first.get_adapter('https://other.example.com/'),
+                         clients.adapter('https://api.example.com'))
+
+    def test_pool_stats(self):
+        stats = clients.pool_stats()
+        for key in ('hits', 'misses', 'token_updates', 'connections', 'requests'):
+            self.assertIn(key, stats)
+
+
+class TestResources(TestCase):
+
+    def setUp(self):
+        clients._resources.clear()
+
+    def tearDown(self):
+        clients._resources.clear()
+
+    @patch('portal.libs.agave.clients.load_resource')
+    def test_resources_loaded_once(self, mock_load):
+        mock_load.return_value = {'apis': []}
+        with self.settings(PORTAL_AGAVE_RESOURCES_CACHE=None):
+            clients.resources('https://api.example.com')
+            self.assertEqual(clients.resources('https://api.example.com'), {'apis': []})
+        mock_load.assert_called_once_with('https://api.example.com')
+
+    @patch('portal.libs.agave.clients.load_resource')
+    def test_resources_cached_to_file(self, mock_load):
+        mock_load.return_value = {'apis': []}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'resources.json')
+            with self.settings(PORTAL_AGAVE_RESOURCES_CACHE=path):
+                clients.resources('https://api.example.com')
+                clients._resources.clear()
+                self.assertEqual(clients.resources('https://api.example.com'), {'apis': []})
+                mock_load.assert_called_once()
+
+                # Definitions generated by another agavepy version are not reused.
+                clients._resources.clear()
+                with patch('portal.libs.agave.clients.resources_version', return_value='other'):
+                    clients.resources('https://api.example.com')
+                self.assertEqual(mock_load.call_count, 2)
@@ -0,0 +1,234 @@
+"""
+.. module: portal.libs.agave.listing_cache
+   :synopsis: Read-through cache of Tapis file listings.
+"""
+import hashlib
+import logging
+import os
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from requests.exceptions import HTTPError
+from portal.utils import metrics
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+# pylint: enable=invalid-name
+
+HIT = 'agave.listing_cache.hit'
+MISS = 'agave.listing_cache.miss'
+INVALIDATED = 'agave.listing_cache.invalidated'
+
+
+def _normalize(path):
+    return '/' + path.strip('/')
+
+
+def _hash(*parts):
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def client_scope(client):
+    """
+    Username whose permissions apply to listings made with a Tapis client.
+    Clients created from a service token have no username and share a scope.
+
+    Parameters
+    ----------
+    client: agavepy.agave.Agave
+        Tapis client.
+
+    Returns
+    -------
+    str
+    """
+    return getattr(client, 'token_username', None) or getattr(client, 'username', None) or ''
+
+
+def generation_key(system, path):
+    """
+    Cache key holding the current generation of a (system, path). Cached
+    listings of the path are stored under its generation, so replacing the
+    generation invalidates them for every user, offset and limit at once.
+
+    Parameters
+    ----------
+    system: str
+        Tapis system ID.
+    path: str
+        Path relative to the system root.
+
+    Returns
+    -------
+    str
+    """
+    return 'agave:listing:gen:{}'.format(_hash(system, _normalize(path)))
+
+
+def generation(system, path):
+    key = generation_key(system, path)
+    gen = cache.get(key)
+    if gen is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        gen = cache.get(key)
+    return gen
+
+
+def listing_key(client, system, path, offset, limit):
+    """
+    Cache key of a single page of a Tapis listing as seen by a client.
+
+    Returns
+    -------
+    str
+    """
+    return 'agave:listing:{}'.format(_hash(system, _normalize(path),
+                                           generation(system, path),
+                                           client_scope(client),
+                                           int(offset), int(limit)))
+
+
+def get_listing(client, system, path, offset, limit):
+    """
+    Cached page of a listing, or None on a miss.
+
+    Parameters
+    ----------
+    client: agavepy.agave.Agave
+        Tapis client the listing is made with.
+    system: str
+        Tapis system ID.
+    path: str
+        Listed path.
+    offset: int
+        Offset for pagination.
+    limit: int
+        Number of results per page.
+
+    Returns
+    -------
+    list
+        List of Tapis files as dicts, or None.
+    """
+    cached = cache.get(listing_key(client, system, path, offset, limit))
+    metrics.incr(MISS if cached is None else HIT)
+    return cached
+
+
+def set_listing(client, system, path, offset, limit, listing):
+    """
+    Cache a page of a listing for ``settings.PORTAL_LISTING_CACHE_TTL``
+    seconds. Parameters are as for :func:`get_listing`.
+    """
+    cache.set(listing_key(client, system, path, offset, limit), listing,
+              settings.PORTAL_LISTING_CACHE_TTL)
+
+
+def path_exists(client, system, path):
+    """
+    Check whether a file or folder exists by listing it. Only positive
+    results are cached, under the generation of the parent folder, so a
+    stale entry can at worst cause a new name to be chosen for a file.
+
+    Parameters
+    ----------
+    client: agavepy.agave.Agave
+        Tapis client to use.
+    system: str
+        Tapis system ID.
+    path: str
+        Path to check.
+
+    Returns
+    -------
+    bool
+    """
+    parent = os.path.dirname(_normalize(path))
+    key = 'agave:exists:{}'.format(_hash(system, _normalize(path),
+                                         generation(system, parent),
+                                         client_scope(client)))
+    if cache.get(key):
+        metrics.incr(HIT)
+        return True
+
+    metrics.incr(MISS)
+    try:
+        client.files.list(systemId=system, filePath=path)
+    except HTTPError as err:
+        if err.response.status_code != 404:
+            raise
+        return False
+
+    cache.set(key, True, settings.PORTAL_LISTING_CACHE_TTL)
+    return True
+
+
+def indexed_key(system, path):
+    return 'agave:indexed:{}'.format(_hash(system, _normalize(path),
+                                           generation(system, path)))
+
+
+def mark_indexed(system, paths):
+    """
+    Record that the full contents of one or more folders were just written
+    to the index. The record lasts for
+    ``settings.PORTAL_INDEX_FIRST_LISTING_FRESHNESS`` seconds, or until the
+    folder is invalidated.
+
+    Parameters
+    ----------
+    system: str
+        Tapis system ID.
+    paths: list
+        Paths of the indexed folders.
+    """
+    indexed_at = time.time()
+    cache.set_many({indexed_key(system, path): indexed_at for path in paths},
+                   settings.PORTAL_INDEX_FIRST_LISTING_FRESHNESS)
+
+
+def is_indexed(system, path):
+    """
+    Whether the index holds the full, current contents of a folder.
+
+    Returns
+    -------
+    bool
+    """
+    return cache.get(indexed_key(system, path)) is not None
+
+
+def claim_reindex(system, path):
+    """
+    Make sure a folder which is not fully indexed is only scheduled to be
+    reindexed once per ``settings.PORTAL_LISTING_INDEX_DEBOUNCE`` seconds.
+
+    Returns
+    -------
+    bool
+        True if the caller should schedule the reindex.
+    """
+    key = 'agave:reindex:{}'.format(_hash(system, _normalize(path)))
+    return cache.add(key, True, settings.PORTAL_LISTING_INDEX_DEBOUNCE)
+
+
+def invalidate(system, *paths):
+    """
+    Drop cached listings of one or more paths in a system, e.g. after a
+    file operation which changes their contents.
+    """
+    keys = set(generation_key(system, path) for path in paths)
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+    metrics.incr(INVALIDATED, len(keys))
+
+
+def get_counters():
+    """
+    Number of listing cache hits, misses and invalidated paths.
+
+    Returns
+    -------
+    dict
+    """
+    return metrics.get_counters(HIT, MISS, INVALIDATED)
@@ -0,0 +1,62 @@
+from mock import MagicMock
+from requests.exceptions import HTTPError
+from django.test import TestCase
+from django.core.cache import cache
+from portal.libs.agave import listing_cache
+
+
+class TestListingCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = MagicMock(token_username='username')
+
+    def test_get_set_listing(self):
+        self.assertIsNone(listing_cache.get_listing(self.client, 'test.system', '/path', 0, 100))
+        listing_cache.set_listing(self.client, 'test.system', '/path', 0, 100, [{'path': '/path/file'}])
+
+        self.assertEqual(listing_cache.get_listing(self.client, 'test.system', 'path/', 0, 100),
+                         [{'path': '/path/file'}])
+        self.assertIsNone(listing_cache.get_listing(self.client, 'test.system', '/path', 100, 100))
+        self.assertEqual(listing_cache.get_counters(), {listing_cache.HIT: 1,
+                                                        listing_cache.MISS: 2,
+                                                        listing_cache.INVALIDATED: 0})
+
+    def test_listings_are_scoped_by_user(self):
+        listing_cache.set_listing(self.client, 'test.system', '/path', 0, 100, [])
+        other = MagicMock(token_username='other')
+
+        self.assertIsNone(listing_cache.get_listing(other, 'test.system', '/path', 0, 100))
+
+    def test_invalidate(self):
+        listing_cache.set_listing(self.client, 'test.system', '/path', 0, 100, [])
+        listing_cache.set_listing(self.client, 'test.system', '/other', 0, 100, [])
+        listing_cache.invalidate('test.system', '/path')
+
+        self.assertIsNone(listing_cache.get_listing(self.client, 'test.system', '/path', 0, 100))
+        self.assertEqual(listing_cache.get_listing(self.client, 'test.system', '/other', 0, 100), [])
+
+    def test_path_exists_caches_positive_results(self):
+        self.assertTrue(listing_cache.path_exists(self.client, 'test.system', '/path/file'))
+        self.assertTrue(listing_cache.path_exists(self.client, 'test.system', '/path/file'))
+        self.assertEqual(self.client.files.list.call_count, 1)
+
+        listing_cache.invalidate('test.system', '/path')
+        self.client.files.list.side_effect = HTTPError(response=MagicMock(status_code=404))
+        self.assertFalse(listing_cache.path_exists(self.client, 'test.system', '/path/file'))
+        self.assertFalse(listing_cache.path_exists(self.client, 'test.system', '/path/file'))
+        self.assertEqual(self.client.files.list.call_count, 3)
+
+    def test_path_exists_raises_errors(self):
+        self.client.files.list.side_effect = HTTPError(response=MagicMock(status_code=500))
+        with self.assertRaises(HTTPError):
+            listing_cache.path_exists(self.client, 'test.system', '/path/file')
+
+    def test_mark_indexed(self):
+        self.assertFalse(listing_cache.is_indexed('test.system', '/path'))
+        listing_cache.mark_indexed('test.system', ['/path', '/other'])
+        self.assertTrue(listing_cache.is_indexed('test.system', 'path'))
+
+        listing_cache.invalidate('test.system', '/path')
+        self.assertFalse(listing_cache.is_indexed('test.system', '/path'))
+        self.assertTrue(listing_cache.is_indexed('test.system', '/other'))
@@ -1,21 +1,32 @@
 import urllib
 import os
 import io
+import json
+import uuid
 import datetime
 from django.conf import settings
 from requests.exceptions import HTTPError
 import logging
 from elasticsearch_dsl import Q
 from portal.libs.elasticsearch.indexes import IndexedFile
+from portal.libs.elasticsearch.debounce import debounce_listing
+from portal.libs.agave import listing_cache
+from portal.libs.agave import clients
+from portal.utils import metrics
 from portal.apps.search.tasks import agave_indexer, agave_listing_indexer
 from portal.exceptions.api import ApiException
 from portal.libs.agave.utils import text_preview, get_file_size
+from portal.libs.transfer.streams import ChunkedReader
 logger = logging.getLogger(__name__)
 
+INDEXED_LISTING_SERVED = 'agave.indexed_listing.served'
+INDEXED_LISTING_FALLBACK = 'agave.indexed_listing.fallback'
+
 
 def listing(client, system, path, offset=0, limit=100, *args, **kwargs):
     """
-    Perform a Tapis file listing
+    Perform a Tapis file listing. Pages are served from
+    :mod:`portal.libs.agave.listing_cache` when possible.
 
     Params
     ------
@@ -36,6 +47,10 @@ def listing(client, system, path, offset=0, limit=100, *args, **kwargs):
         List of dicts containing file metadata from Elasticsearch
 
     """
+    cached = listing_cache.get_listing(client, system, path, offset, limit)
+    if cached is not None:
+        return {'listing': cached, 'reachedEnd': len(cached) < int(limit)}
+
     raw_listing = client.files.list(systemId=system,
                                     filePath=urllib.parse.quote(path),
                                     offset=int(offset) + 1,
@@ -48,11 +63,75 @@ def listing(client, system, path, offset=0, limit=100, *args, **kwargs):
         # Return [] if the listing is empty.
         listing = []
 
-    # Update Elasticsearch after each listing.
-    agave_listing_indexer.delay(listing)
+    listing_cache.set_listing(client, system, path, offset, limit, listing)
+
+    # Update Elasticsearch after each listing, coalescing repeated listings
+    # of the same path within the debounce window into a single task.
+    window = debounce_listing(system, path, listing)
+    if window:
+        agave_listing_indexer.apply_async(kwargs={'system': system, 'path': path, 'window': window},
+                                          countdown=settings.PORTAL_LISTING_INDEX_DEBOUNCE)
     return {'listing': listing, 'reachedEnd': len(listing) < int(limit)}
 
 
+def indexed_listing(client, system, path, offset=0, limit=100, nextPageToken=None,
+                    *args, **kwargs):
+    """
+    Perform a file listing from Elasticsearch. The level is only served from
+    the index if it was fully indexed within the last
+    ``settings.PORTAL_INDEX_FIRST_LISTING_FRESHNESS`` seconds and has not
+    been written to since, otherwise this falls back to a Tapis listing and
+    schedules the level to be reindexed.
+
+    Params
+    ------
+    client: agavepy.agave.Agave
+        Tapis client to use if the index is not fresh.
+    system: str
+        Tapis system ID.
+    path: str
+        Path in which to peform the listing.
+    offset: int
+        Offset for pagination, used if no nextPageToken is passed.
+    limit: int
+        Number of results to return.
+    nextPageToken: str
+        Sort values of the last file of the previous page, as returned by a
+        previous call. Used to paginate with search_after.
+
+    Returns
+    -------
+    dict
+        Listing of dicts containing file metadata from Elasticsearch and
+        the token for the next page.
+    """
+    if not listing_cache.is_indexed(system, path):
+        metrics.incr(INDEXED_LISTING_FALLBACK)
+        # Reindex the whole level so that later listings can use the index.
+        if listing_cache.claim_reindex(system, path):
+            agave_indexer.apply_async(kwargs={'systemId': system,
+                                              'filePath': path,
+                                              'recurse': False})
+        return listing(client, system, path, offset=offset, limit=limit)
+
+    search = IndexedFile.search()
+    search = search.filter('term', **{'system._exact': system})
+    search = search.filter('term', **{'basePath._exact': '/' + path.strip('/')})
+    search = search.sort('name._exact', 'path._exact')
+    search = search.extra(size=int(limit))
+    if nextPageToken:
+        search = search.extra(search_after=json.loads(nextPageToken))
+    else:
+        search = search.extra(from_=int(offset))
+    hits = list(search.execute())
+
+    metrics.incr(INDEXED_LISTING_SERVED)
+    reached_end = len(hits) < int(limit)
+    return {'listing': [hit.to_dict() for hit in hits],
+            'nextPageToken': None if reached_end else json.dumps(list(hits[-1].meta.sort)),
+            'reachedEnd': reached_end}
+
+
 def iterate_listing(client, system, path, limit=100):
     """Iterate over a filesystem level yielding an attrdict for each file/folder
         on the level.
@@ -181,6 +260,7 @@ def mkdir(client, system, path, dir_name):
     result = client.files.manage(systemId=system,
                                  filePath=urllib.parse.quote(path),
                                  body=body)
+    listing_cache.invalidate(system, path)
 
     agave_indexer.apply_async(kwargs={'systemId': system,
                                       'filePath': path,
@@ -224,18 +304,12 @@ def move(client, src_system, src_path, dest_system, dest_path, file_name=None):
     if src_system == dest_system and src_path_full == dest_path_full:
         return {'system': src_system, 'path': src_path_full, 'name': file_name}
 
-    try:
-        client.files.list(systemId=dest_system,
-                          filePath="{}/{}".format(dest_path, file_name))
-
+    if listing_cache.path_exists(client, dest_system, "{}/{}".format(dest_path, file_name)):
         # Destination path exists, must make it unique.
         _ext = os.path.splitext(file_name)[1].lower()
         _name = os.path.splitext(file_name)[0]
         now = datetime.datetime.utcnow().strftime('%Y-%m-%d %H-%M-%S')
         file_name = '{}_{}{}'.format(_name, now, _ext)
-    except HTTPError as err:
-        if err.response.status_code != 404:
-            raise
 
     full_dest_path = os.path.join(dest_path.strip('/'), file_name)
 
@@ -246,6 +320,8 @@ def move(client, src_system, src_path, dest_system, dest_path, file_name=None):
                                           filePath=urllib.parse.quote(
                                               src_path),
                                           body=body)
+    listing_cache.invalidate(src_system, os.path.dirname(src_path), src_path,
+                             dest_path, full_dest_path)
 
     if os.path.dirname(src_path) != dest_path or src_path != dest_path:
         agave_indexer.apply_async(kwargs={'systemId': src_system,
@@ -288,18 +364,12 @@ def copy(client, src_system, src_path, dest_system, dest_path, file_name=None,
     if file_name is None:
         file_name = src_path.strip('/').split('/')[-1]
 
-    try:
-        client.files.list(systemId=dest_system,
-                          filePath="{}/{}".format(dest_path, file_name))
-
+    if listing_cache.path_exists(client, dest_system, "{}/{}".format(dest_path, file_name)):
         # Destination path exists, must make it unique.
         _ext = os.path.splitext(file_name)[1].lower()
         _name = os.path.splitext(file_name)[0]
         now = datetime.datetime.utcnow().strftime('%Y-%m-%d %H-%M-%S')
         file_name = '{}_{}{}'.format(_name, now, _ext)
-    except HTTPError as err:
-        if err.response.status_code != 404:
-            raise
 
     full_dest_path = os.path.join(dest_path.strip('/'), file_name)
     if src_system == dest_system:
@@ -320,6 +390,7 @@ def copy(client, src_system, src_path, dest_system, dest_path, file_name=None,
             fileName=str(file_name),
             urlToIngest=src_url
         )
+    listing_cache.invalidate(dest_system, dest_path, full_dest_path)
 
     agave_indexer.apply_async(kwargs={'systemId': dest_system,
                                       'filePath': os.path.dirname(full_dest_path),
@@ -347,8 +418,10 @@ def makepublic(client, src_system, src_path, dest_path='/', *args, **kwargs):
 
 
 def delete(client, system, path):
-    return client.files.delete(systemId=system,
+    resp = client.files.delete(systemId=system,
                                filePath=urllib.parse.quote(path))
+    listing_cache.invalidate(system, os.path.dirname(path), path)
+    return resp
 
 
 def rename(client, system, path, new_name):
@@ -397,27 +470,26 @@ def trash(client, system, path):
 
     # Create a trash path if none exists
     try:
-        client.files.list(systemId=system,
-                          filePath=settings.AGAVE_DEFAULT_TRASH_NAME)
-    except HTTPError as err:
-        if err.response.status_code != 404:
-            logger.error("Unexpected exception listing .trash path in {}".format(system))
-            raise
+        trash_exists = listing_cache.path_exists(client, system,
+                                                 settings.AGAVE_DEFAULT_TRASH_NAME)
+    except HTTPError:
+        logger.error("Unexpected exception listing .trash path in {}".format(system))
+        raise
+    if not trash_exists:
         mkdir(client, system, '/', settings.AGAVE_DEFAULT_TRASH_NAME)
 
     try:
-        client.files.list(systemId=system,
-                          filePath=os.path.join(settings.AGAVE_DEFAULT_TRASH_NAME,
-                                                file_name))
+        trash_path_exists = listing_cache.path_exists(
+            client, system, os.path.join(settings.AGAVE_DEFAULT_TRASH_NAME, file_name))
+    except HTTPError:
+        logger.error("Unexpected exception listing path {} under .trash in system {}".format(file_name, system))
+        raise
+    if trash_path_exists:
         # Trash path exists, must make it unique.
         _ext = os.path.splitext(file_name)[1].lower()
         _name = os.path.splitext(file_name)[0]
         now = datetime.datetime.utcnow().strftime('%Y-%m-%d %H-%M-%S')
         trash_name = '{}_{}{}'.format(_name, now, _ext)
-    except HTTPError as err:
-        if err.response.status_code != 404:
-            logger.error("Unexpected exception listing path {} under .trash in system {}".format(file_name, system))
-            raise
 
     resp = move(client, system, path, system,
                 settings.AGAVE_DEFAULT_TRASH_NAME, trash_name)
@@ -455,6 +527,7 @@ def upload(client, system, path, uploaded_file):
                                    filePath=urllib.parse.quote(path),
                                    fileName=str(upload_name),
                                    fileToUpload=uploaded_file)
+    listing_cache.invalidate(system, path)
 
     agave_indexer.apply_async(kwargs={'systemId': system,
                                       'filePath': path,
@@ -548,3 +621,83 @@ def download_bytes(client, system, path):
     result = io.BytesIO(resp.content)
     result.name = file_name
     return result
+
+
+def media_url(client, system, path):
+    return '{}/files/v2/media/system/{}/{}'.format(client.api_server.rstrip('/'), system,
+                                                   urllib.parse.quote(path.strip('/')))
+
+
+def download_stream(client, system, path):
+    """Opens a file for streaming without downloading it into memory.
+
+    Params
+    ------
+    client: agavepy.agave.Agave
+        Tapis client to use.
+    system: str
+    path: str
+    Returns
+    -------
+    portal.libs.transfer.streams.ChunkedReader
+        Readable stream with the file's name and length.
+    """
+    resp = clients.session(client.api_server).get(
+                        media_url(client, system, path),
+                        headers={'Authorization': 'Bearer {}'.format(client._token)},  # pylint: disable=protected-access
+                        stream=True)
+    resp.raise_for_status()
+    length = resp.headers.get('Content-Length')
+    return ChunkedReader(resp.iter_content(settings.PORTAL_TRANSFER_CHUNK_SIZE),
+                         os.path.basename(path),
+                         length=int(length) if length else None)
+
+
+def upload_stream(client, system, path, uploaded_file, *args, **kwargs):
+    """Upload a file-like object, which does not need to be seekable, as a
+    chunked multipart request so that it is never held in memory whole.
+
+    Params
+    ------
+    client: agavepy.agave.Agave
+        Tapis client to use.
+    system: str
+        Tapis system ID for the file.
+    path: str
+        Path to upload the file to.
+    uploaded_file: file
+        Readable file-like object with a name.
+
+    Returns
+    -------
+    dict
+    """
+    upload_name = os.path.basename(uploaded_file.name).replace('"', '%22')
+    boundary = uuid.uuid4().hex
+
+    def body():
+        yield ('--{}\r\n'
+               'Content-Disposition: form-data; name="fileToUpload"; filename="{}"\r\n'
+               'Content-Type: application/octet-stream\r\n\r\n').format(boundary, upload_name).encode()
+        while True:
+            chunk = uploaded_file.read(settings.PORTAL_TRANSFER_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield ('\r\n--{0}\r\n'
+               'Content-Disposition: form-data; name="fileName"\r\n\r\n'
+               '{1}\r\n--{0}--\r\n').format(boundary, upload_name).encode()
+
+    resp = clients.session(client.api_server).post(
+                         media_url(client, system, path),
+                         data=body(),
+                         headers={'Authorization': 'Bearer {}'.format(client._token),  # pylint: disable=protected-access
+                                  'Content-Type': 'multipart/form-data; boundary={}'.format(boundary)})
+    resp.raise_for_status()
+    listing_cache.invalidate(system, path)
+
+    agave_indexer.apply_async(kwargs={'systemId': system,
+                                      'filePath': path,
+                                      'recurse': False},
+                              )
+    return resp.json()['result']
@@ -1,15 +1,21 @@
-from mock import patch, MagicMock
+from mock import patch, MagicMock, ANY
 from requests.exceptions import HTTPError
 from django.test import TestCase
+from django.core.cache import cache
 from agavepy.agave import AttrDict
 from elasticsearch_dsl import Q
 from elasticsearch_dsl.response import Hit
-from portal.libs.agave.operations import listing, search, mkdir, move, copy, rename, makepublic
+from portal.libs.agave.operations import (listing, indexed_listing, search, mkdir, move, copy, rename,
+                                          makepublic)
+from portal.libs.agave.listing_cache import mark_indexed
 from portal.exceptions.api import ApiException
 
 
 class TestOperations(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     @patch('portal.libs.agave.operations.agave_listing_indexer')
     def test_listing(self, mock_indexer):
         client = MagicMock()
@@ -23,13 +29,25 @@ class TestOperations(TestCase):
                                              offset=1,
                                              limit=100)
 
-        mock_indexer.delay.assert_called_with([{'system': 'test.system',
-                                                'path': '/path/to/file'}])
+        mock_indexer.apply_async.assert_called_with(kwargs={'system': 'test.system',
+                                                            'path': '/path/to/file',
+                                                            'window': ANY},
+                                                    countdown=30)
 
         self.assertEqual(ls, {'listing': [{'system': 'test.system',
                                            'path': '/path/to/file'}],
                               'reachedEnd': True})
 
+    @patch('portal.libs.agave.operations.agave_listing_indexer')
+    def test_listing_debounces_indexing(self, mock_indexer):
+        client = MagicMock()
+        client.files.list.return_value = [AttrDict({'system': 'test.system',
+                                                    'path': '/path/to/file'})]
+        listing(client, 'test.system', '/path/to/file')
+        listing(client, 'test.system', '/path/to/file')
+
+        self.assertEqual(mock_indexer.apply_async.call_count, 1)
+
     @patch('portal.libs.agave.operations.IndexedFile.search')
     def test_search(self, mock_search):
         mock_hit = Hit({})
@@ -120,3 +138,59 @@ class TestOperations(TestCase):
                                      'test.system',
                                      '/path/to/src',
                                      'portal.storage.public', '/')
+
+    @patch('portal.libs.agave.operations.agave_listing_indexer')
+    def test_listing_cached(self, mock_indexer):
+        client = MagicMock()
+        client.files.list.return_value = [AttrDict({'system': 'test.system',
+                                                    'path': '/path/to/file'})]
+        first = listing(client, 'test.system', '/path/to/file')
+        second = listing(client, 'test.system', '/path/to/file')
+
+        self.assertEqual(client.files.list.call_count, 1)
+        self.assertEqual(first, second)
+
+    @patch('portal.libs.agave.operations.agave_indexer')
+    @patch('portal.libs.agave.operations.agave_listing_indexer')
+    def test_mkdir_invalidates_listing(self, mock_listing_indexer, mock_indexer):
+        client = MagicMock()
+        client.files.list.return_value = []
+        listing(client, 'test.system', '/root')
+        mkdir(client, 'test.system', '/root', 'testfolder')
+        listing(client, 'test.system', '/root')
+
+        self.assertEqual(client.files.list.call_count, 2)
+
+    @patch('portal.libs.agave.operations.agave_indexer')
+    @patch('portal.libs.agave.operations.listing')
+    @patch('portal.libs.agave.operations.IndexedFile.search')
+    def test_indexed_listing_falls_back_to_tapis(self, mock_search, mock_listing, mock_indexer):
+        client = MagicMock()
+        indexed_listing(client, 'test.system', '/path', offset=0, limit=100)
+        indexed_listing(client, 'test.system', '/path', offset=100, limit=100)
+
+        mock_listing.assert_called_with(client, 'test.system', '/path', offset=100, limit=100)
+        mock_search.assert_not_called()
+        mock_indexer.apply_async.assert_called_once_with(kwargs={'systemId': 'test.system',
+                                                                 'filePath': '/path',
+                                                                 'recurse': False})
+
+    @patch('portal.libs.agave.operations.listing')
+    @patch('portal.libs.agave.operations.IndexedFile.search')
+    def test_indexed_listing(self, mock_search, mock_listing):
+        mock_hit = Hit({'_source': {'system': 'test.system', 'path': '/path/file'},
+                        'sort': ['file', '/path/file']})
+        mock_result = MagicMock()
+        mock_result.__iter__.return_value = [mock_hit]
+        mock_search().filter().filter().sort().extra().extra().execute.return_value = mock_result
+        mark_indexed('test.system', ['/path'])
+
+        res = indexed_listing(MagicMock(), 'test.system', 'path/', limit=1, nextPageToken='["a", "/path/a"]')
+
+        mock_listing.assert_not_called()
+        mock_search().filter().filter.assert_called_with('term', **{'basePath._exact': '/path'})
+        mock_search().filter().filter().sort.assert_called_with('name._exact', 'path._exact')
+        mock_search().filter().filter().sort().extra().extra.assert_called_with(search_after=['a', '/path/a'])
+        self.assertEqual(res, {'listing': [{'system': 'test.system', 'path': '/path/file'}],
+                               'nextPageToken': '["file", "/path/file"]',
+                               'reachedEnd': False})
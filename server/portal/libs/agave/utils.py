@@ -7,9 +7,8 @@ import os
 import urllib.request
 import urllib.parse
 import urllib.error
-from django.conf import settings
-from agavepy.agave import Agave
 import requests
+from portal.libs.agave.clients import service_client
 
 # pylint: disable=invalid-name
 logger = logging.getLogger(__name__)
@@ -195,9 +194,7 @@ def walk_levels(client, system, path, bottom_up=False, ignore_hidden=False):
 
 def service_account():
     """Return an agave instance with the admin account."""
-    return Agave(
-        api_server=settings.AGAVE_TENANT_BASEURL,
-        token=settings.AGAVE_SUPER_TOKEN)
+    return service_client()
 
 
 def text_preview(url):
@@ -0,0 +1,254 @@
+"""
+.. module: portal.libs.elasticsearch.crawler
+   :synopsis: Bounded-concurrency crawler used to index Tapis storage systems.
+"""
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from django.conf import settings
+from django.core.cache import cache
+from portal.libs.agave.utils import walk_levels
+from portal.libs.agave.listing_cache import mark_indexed
+from portal.libs.elasticsearch.utils import index_levels, diff_level, index_changes
+from portal.apps.search.usage import mark_complete, record_levels
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+# pylint: enable=invalid-name
+
+
+def checkpoint_key(system, path):
+    """
+    Cache key under which the frontier of a crawl is checkpointed.
+
+    Parameters
+    ----------
+    system: str
+        The Tapis system ID being crawled.
+    path: str
+        Root path of the crawl.
+
+    Returns
+    -------
+    str
+    """
+    return 'search:crawl:{}:{}'.format(system, path)
+
+
+class SystemCrawler(object):
+    """
+    Walk a Tapis storage system breadth-first, listing up to ``concurrency``
+    folders at a time, and index the listed levels in batched bulk requests.
+
+    The paths that still have to be listed (the frontier) are checkpointed to
+    the Django cache after every batch, so a crawl that fails half way can be
+    picked up again with :meth:`resume` instead of starting from the root.
+
+    In incremental mode each listed level is diffed against the index and
+    only new, modified or deleted entries are written. Folders whose
+    lastModified is unchanged are not descended into.
+
+    The storage usage of every listed level is recorded. Once a full crawl
+    has recorded all of them, the storage usage of the start path is marked
+    complete.
+
+    :Example:
+    >>> crawler = SystemCrawler(client, 'cep.storage.community', '/')
+    >>> crawler.resume()
+    >>> stats = crawler.run()
+    """
+
+    def __init__(self, client, system, path='/', concurrency=None,
+                 batch_size=None, ignore_hidden=True, reindex=False,
+                 incremental=False, progress=None):
+        """
+        Parameters
+        ----------
+        client: agavepy.agave.Agave
+            Tapis client to use for the listings.
+        system: str
+            The Tapis system ID to crawl.
+        path: str
+            Path to start crawling from, relative to the system root.
+        concurrency: int
+            Maximum number of ``files.list`` calls in flight at once.
+        batch_size: int
+            Minimum number of listed files/folders to accumulate before
+            sending them to Elasticsearch in a single bulk request.
+        ignore_hidden: bool
+            Whether to skip files and folders starting with a '.'.
+        reindex: bool
+            Passed through to :func:`index_levels`.
+        incremental: bool
+            Only index changes and skip unchanged subtrees.
+        progress: callable
+            Called with a copy of the crawl stats after each indexed batch.
+        """
+        if not path.startswith('/'):
+            path = '/' + path
+        self.client = client
+        self.system = system
+        self.path = path
+        self.concurrency = concurrency or settings.PORTAL_INDEXER_CONCURRENCY
+        self.batch_size = batch_size or settings.PORTAL_INDEXER_BATCH_SIZE
+        self.ignore_hidden = ignore_hidden
+        self.reindex = reindex
+        self.incremental = incremental
+        self.progress = progress
+        self.pending = deque([path])
+        # Whether the crawl lists, and records the usage of, every level
+        self.covers_subtree = not incremental
+        self.stats = {'levels': 0, 'folders': 0, 'files': 0, 'indexed': 0,
+                      'deleted': 0, 'pending': 1}
+
+    @property
+    def checkpoint_key(self):
+        return checkpoint_key(self.system, self.path)
+
+    def resume(self):
+        """
+        Replace the frontier with the one saved by a previous crawl of the
+        same system and path, if any.
+
+        Returns
+        -------
+        bool
+            True if a checkpoint was found.
+        """
+        frontier = cache.get(self.checkpoint_key)
+        if not frontier:
+            return False
+        logger.info('Resuming crawl of {}{} with {} pending paths'.format(
+            self.system, self.path, len(frontier)))
+        self.pending = deque(frontier)
+        # Usage recorded by the earlier crawl cannot be vouched for
+        self.covers_subtree = False
+        self.stats['pending'] = len(self.pending)
+        return True
+
+    def checkpoint(self, paths):
+        """
+        Save the paths which still need to be listed.
+        """
+        cache.set(self.checkpoint_key, list(paths),
+                  settings.PORTAL_INDEXER_CHECKPOINT_TTL)
+
+    def clear_checkpoint(self):
+        cache.delete(self.checkpoint_key)
+
+    def crawl_level(self, path):
+        """
+        List a single level of the system and, in incremental mode, diff it
+        against the index.
+
+        Returns
+        -------
+        tuple
+            ((path, folders, files), diff) where the level is as yielded by
+            :func:`portal.libs.agave.utils.walk_levels` and diff is the
+            (changed, stale) output of :func:`diff_level`, or None.
+        """
+        if not path.startswith('/'):
+            path = '/' + path
+        level = next(walk_levels(self.client, self.system, path,
+                                 ignore_hidden=self.ignore_hidden))
+        if not self.incremental:
+            return level, None
+        _path, folders, files = level
+        return level, diff_level(_path, folders + files, self.system)
+
+    def flush(self, levels, in_flight):
+        """
+        Index a batch of crawled levels, recording their storage usage, and
+        checkpoint the remaining frontier.
+        """
+        if self.incremental:
+            changed = [_file for _, (_changed, _) in levels for _file in _changed]
+            stale = [_path for _, (_, _stale) in levels for _path in _stale]
+            self.stats['deleted'] += index_changes(changed, stale, self.system)
+            mark_indexed(self.system, [_path for (_path, _, _), _ in levels])
+            self.stats['indexed'] += len(changed)
+        elif levels:
+            self.stats['deleted'] += index_levels([level for level, _ in levels], self.system,
+                                                  reindex=self.reindex, record_usage=False)
+        if not record_levels(self.system, [level for level, _ in levels]):
+            self.covers_subtree = False
+        for (_, folders, files), _ in levels:
+            self.stats['levels'] += 1
+            self.stats['folders'] += len(folders)
+            self.stats['files'] += len(files)
+            if not self.incremental:
+                self.stats['indexed'] += len(folders) + len(files)
+        self.stats['pending'] = len(self.pending) + len(in_flight)
+        self.checkpoint(list(in_flight.values()) + list(self.pending))
+        logger.debug('Crawl of {}{}: {}'.format(self.system, self.path, self.stats))
+        if self.progress:
+            self.progress(dict(self.stats))
+
+    def descend(self, level, diff):
+        """
+        Folders of a crawled level which should be crawled next.
+        """
+        _, folders, _ = level
+        if diff is None:
+            return folders
+        changed_paths = set(_file['path'] for _file in diff[0])
+        return [folder for folder in folders if folder['path'] in changed_paths]
+
+    def run(self):
+        """
+        Crawl until the frontier is exhausted.
+
+        If a listing fails, the frontier (including the failed path and any
+        level that was listed but not yet indexed) is checkpointed and the
+        exception is re-raised.
+
+        Returns
+        -------
+        dict
+            Number of levels, folders and files crawled, and of documents
+            indexed and deleted.
+        """
+        levels = []
+        batched = 0
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while self.pending or in_flight:
+                while self.pending and len(in_flight) < self.concurrency:
+                    path = self.pending.popleft()
+                    in_flight[executor.submit(self.crawl_level, path)] = path
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    try:
+                        level, diff = future.result()
+                    except Exception:
+                        logger.error('Error listing {} under system {}'.format(path, self.system))
+                        self.checkpoint([path] +
+                                        [_path for (_path, _, _), _ in levels] +
+                                        list(in_flight.values()) +
+                                        list(self.pending))
+                        raise
+                    levels.append((level, diff))
+                    batched += len(level[1]) + len(level[2])
+                    self.pending.extend(folder['path'] for folder in self.descend(level, diff))
+
+                if batched >= self.batch_size:
+                    self.flush(levels, in_flight)
+                    levels = []
+                    batched = 0
+
+        self.flush(levels, in_flight)
+        self.clear_checkpoint()
+        if self.covers_subtree:
+            mark_complete(self.system, self.path)
+        self.stats['pending'] = 0
+        METRICS.info('crawled system:{} path:{} incremental:{} levels:{} folders:{} '
+                     'files:{} indexed:{} deleted:{}'.format(
+                         self.system, self.path, self.incremental,
+                         self.stats['levels'], self.stats['folders'],
+                         self.stats['files'], self.stats['indexed'],
+                         self.stats['deleted']))
+        return dict(self.stats)
@@ -0,0 +1,115 @@
+from mock import patch, MagicMock
+from django.test import TestCase
+from django.core.cache import cache
+from portal.apps.search.usage import is_complete
+from portal.libs.elasticsearch.crawler import SystemCrawler, checkpoint_key
+
+
+def mock_walk_levels(tree):
+    def walk_levels_side_effect(client, system, path, ignore_hidden=False):
+        folders = [{'path': child, 'name': child.split('/')[-1], 'format': 'folder'}
+                   for child in tree.get(path, [])]
+        yield (path, folders, [])
+    return walk_levels_side_effect
+
+
+class TestSystemCrawler(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tree = {
+            '/': ['/a', '/b'],
+            '/a': ['/a/c'],
+            '/b': [],
+            '/a/c': []
+        }
+
+    @patch('portal.libs.elasticsearch.crawler.index_levels')
+    @patch('portal.libs.elasticsearch.crawler.walk_levels')
+    def test_run_crawls_whole_tree(self, mock_walk, mock_index):
+        mock_walk.side_effect = mock_walk_levels(self.tree)
+        mock_index.return_value = 0
+        progress = MagicMock()
+
+        crawler = SystemCrawler(MagicMock(), 'test.system', '/', progress=progress)
+        stats = crawler.run()
+
+        listed = sorted(call[0][2] for call in mock_walk.call_args_list)
+        self.assertEqual(listed, ['/', '/a', '/a/c', '/b'])
+        indexed = sorted(level[0] for call in mock_index.call_args_list for level in call[0][0])
+        self.assertEqual(indexed, ['/', '/a', '/a/c', '/b'])
+        self.assertEqual(stats, {'levels': 4, 'folders': 3, 'files': 0, 'indexed': 3,
+                                 'deleted': 0, 'pending': 0})
+        progress.assert_called()
+        self.assertIsNone(cache.get(checkpoint_key('test.system', '/')))
+        self.assertTrue(is_complete('test.system', '/a/c'))
+
+    @patch('portal.libs.elasticsearch.crawler.index_levels')
+    @patch('portal.libs.elasticsearch.crawler.walk_levels')
+    def test_batches_levels(self, mock_walk, mock_index):
+        mock_walk.side_effect = mock_walk_levels(self.tree)
+        mock_index.return_value = 0
+
+        crawler = SystemCrawler(MagicMock(), 'test.system', '/', concurrency=1, batch_size=1000)
+        crawler.run()
+
+        mock_index.assert_called_once()
+
+    @patch('portal.libs.elasticsearch.crawler.index_levels')
+    @patch('portal.libs.elasticsearch.crawler.walk_levels')
+    def test_failure_checkpoints_frontier(self, mock_walk, mock_index):
+        walk = mock_walk_levels(self.tree)
+        mock_index.return_value = 0
+
+        def failing_walk(client, system, path, ignore_hidden=False):
+            if path == '/a':
+                raise Exception('listing failed')
+            return walk(client, system, path, ignore_hidden)
+        mock_walk.side_effect = failing_walk
+
+        crawler = SystemCrawler(MagicMock(), 'test.system', '/', concurrency=1, batch_size=1)
+        with self.assertRaises(Exception):
+            crawler.run()
+
+        frontier = cache.get(checkpoint_key('test.system', '/'))
+        self.assertEqual(sorted(frontier), ['/a', '/b'])
+
+        mock_walk.side_effect = walk
+        resumed = SystemCrawler(MagicMock(), 'test.system', '/', concurrency=1)
+        self.assertTrue(resumed.resume())
+        stats = resumed.run()
+        self.assertEqual(stats['levels'], 3)
+        self.assertFalse(is_complete('test.system', '/'))
+
+    @patch('portal.libs.elasticsearch.crawler.index_changes')
+    @patch('portal.libs.elasticsearch.crawler.diff_level')
+    @patch('portal.libs.elasticsearch.crawler.walk_levels')
+    def test_incremental_skips_unchanged_folders(self, mock_walk, mock_diff, mock_changes):
+        mock_walk.side_effect = mock_walk_levels(self.tree)
+
+        def diff_side_effect(path, children, system):
+            # Only /b has changed since it was indexed; /old was removed.
+            if path == '/':
+                return [child for child in children if child['path'] == '/b'], ['/old']
+            return [], []
+        mock_diff.side_effect = diff_side_effect
+        # Deleting /old removes it and its 3 children.
+        mock_changes.return_value = 4
+
+        crawler = SystemCrawler(MagicMock(), 'test.system', '/', incremental=True)
+        stats = crawler.run()
+
+        listed = sorted(call[0][2] for call in mock_walk.call_args_list)
+        self.assertEqual(listed, ['/', '/b'])
+        changed = [_file['path'] for call in mock_changes.call_args_list for _file in call[0][0]]
+        stale = [_path for call in mock_changes.call_args_list for _path in call[0][1]]
+        self.assertEqual(changed, ['/b'])
+        self.assertEqual(stale, ['/old'])
+        self.assertEqual(stats['indexed'], 1)
+        self.assertEqual(stats['deleted'], 4)
+        self.assertFalse(is_complete('test.system', '/'))
+
+    def test_resume_without_checkpoint(self):
+        crawler = SystemCrawler(MagicMock(), 'test.system', 'path')
+        self.assertFalse(crawler.resume())
+        self.assertEqual(list(crawler.pending), ['/path'])
@@ -0,0 +1,148 @@
+"""
+.. module: portal.libs.elasticsearch.debounce
+   :synopsis: Coalesce repeated index requests for the same Tapis listing.
+"""
+import json
+import logging
+import uuid
+from hashlib import sha256
+from django.conf import settings
+from django.core.cache import cache
+from portal.utils import metrics
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+# pylint: enable=invalid-name
+
+SCHEDULED = 'search.listing_index.scheduled'
+MERGED = 'search.listing_index.merged'
+DROPPED = 'search.listing_index.dropped'
+
+
+def window_key(system, path):
+    """
+    Cache key holding the id of the open debounce window of a (system, path).
+
+    Parameters
+    ----------
+    system: str
+        The Tapis system ID.
+    path: str
+        The listed path, relative to the system root.
+
+    Returns
+    -------
+    str
+    """
+    return 'search:listing:{}:{}'.format(system, path)
+
+
+def _count_key(window):
+    return 'search:listing:window:{}'.format(window)
+
+
+def _piece_key(window, number):
+    return 'search:listing:window:{}:{}'.format(window, number)
+
+
+def _digest_key(window, listing):
+    digest = sha256(json.dumps(listing, sort_keys=True, default=str).encode()).hexdigest()
+    return 'search:listing:window:{}:digest:{}'.format(window, digest)
+
+
+def debounce_listing(system, path, listing):
+    """
+    Buffer a Tapis listing to be indexed. The first listing of a (system, path)
+    opens a debounce window, and should be followed by scheduling
+    `agave_listing_indexer` for that window after
+    settings.PORTAL_LISTING_INDEX_DEBOUNCE seconds. Later listings of the same
+    path are appended to the open window (e.g. other pages of a large folder),
+    or dropped if the same listing is already in it.
+
+    Each listing is written to its own numbered key, so concurrent listings
+    never overwrite each other. A listing appended to a window which was
+    popped in the meantime may have been missed, so it is buffered again in
+    a new window.
+
+    Parameters
+    ----------
+    system: str
+        The Tapis system ID.
+    path: str
+        The listed path, relative to the system root.
+    listing: list
+        list of Tapis files as dicts.
+
+    Returns
+    -------
+    str
+        Id of the window the caller should schedule the indexing task for,
+        or None if one is already scheduled.
+    """
+    key = window_key(system, path)
+    timeout = settings.PORTAL_LISTING_INDEX_DEBOUNCE * 10
+
+    while True:
+        window = uuid.uuid4().hex
+        opened = cache.add(key, window, timeout)
+        if not opened:
+            window = cache.get(key)
+            if window is None:
+                continue
+        if not cache.add(_digest_key(window, listing), True, timeout):
+            metrics.incr(DROPPED)
+            return None
+        cache.add(_count_key(window), 0, timeout)
+        number = cache.incr(_count_key(window))
+        cache.set(_piece_key(window, number), listing, timeout)
+        if opened:
+            metrics.incr(SCHEDULED)
+            return window
+        if cache.get(key) == window:
+            metrics.incr(MERGED)
+            return None
+
+
+def pop_listing(system, path, window):
+    """
+    Take the listings buffered in a debounce window, closing it so that
+    subsequent listings open a new one. Later listings of a file replace
+    earlier ones.
+
+    Parameters
+    ----------
+    system: str
+        The Tapis system ID.
+    path: str
+        The listed path, relative to the system root.
+    window: str
+        Window id returned by :func:`debounce_listing`.
+
+    Returns
+    -------
+    list
+        list of Tapis files as dicts.
+    """
+    key = window_key(system, path)
+    if cache.get(key) == window:
+        cache.delete(key)
+    count = cache.get(_count_key(window)) or 0
+    keys = [_piece_key(window, number) for number in range(1, count + 1)]
+    pieces = cache.get_many(keys)
+    cache.delete_many(keys + [_count_key(window)])
+    pending = {}
+    for piece_key in keys:
+        for _file in pieces.get(piece_key, []):
+            pending[_file['path']] = _file
+    return list(pending.values())
+
+
+def get_counters():
+    """
+    Number of scheduled, merged and dropped listing index requests.
+
+    Returns
+    -------
+    dict
+    """
+    return metrics.get_counters(SCHEDULED, MERGED, DROPPED)
@@ -0,0 +1,56 @@
+from mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from portal.libs.elasticsearch.debounce import debounce_listing, pop_listing, get_counters, window_key
+
+
+class TestDebounceListing(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.page1 = [{'system': 'test.system', 'path': '/test/file1', 'length': 1}]
+        self.page2 = [{'system': 'test.system', 'path': '/test/file2', 'length': 1}]
+
+    def test_first_listing_schedules(self):
+        self.assertTrue(debounce_listing('test.system', '/test', self.page1))
+        self.assertEqual(get_counters()['search.listing_index.scheduled'], 1)
+
+    def test_duplicate_listing_dropped(self):
+        window = debounce_listing('test.system', '/test', self.page1)
+        self.assertIsNone(debounce_listing('test.system', '/test', self.page1))
+        self.assertEqual(get_counters()['search.listing_index.dropped'], 1)
+        self.assertEqual(pop_listing('test.system', '/test', window), self.page1)
+
+    def test_listings_merged(self):
+        window = debounce_listing('test.system', '/test', self.page1)
+        self.assertIsNone(debounce_listing('test.system', '/test', self.page2))
+        self.assertEqual(get_counters()['search.listing_index.merged'], 1)
+        self.assertEqual(pop_listing('test.system', '/test', window), self.page1 + self.page2)
+
+    def test_pop_reopens_window(self):
+        window = debounce_listing('test.system', '/test', self.page1)
+        pop_listing('test.system', '/test', window)
+        self.assertEqual(pop_listing('test.system', '/test', window), [])
+        self.assertTrue(debounce_listing('test.system', '/test', self.page1))
+
+    def test_paths_are_independent(self):
+        debounce_listing('test.system', '/test', self.page1)
+        self.assertTrue(debounce_listing('test.system', '/other', self.page1))
+
+    def test_listing_appended_during_pop_is_rebuffered(self):
+        window = debounce_listing('test.system', '/test', self.page1)
+        set_piece = cache.set
+
+        def pop_while_appending(key, value, timeout):
+            # The window is popped after the listing took a number in it,
+            # but before the listing was written.
+            set_piece(key, value, timeout)
+            if value is self.page2 and cache.get(window_key('test.system', '/test')) == window:
+                cache.delete(window_key('test.system', '/test'))
+
+        with patch('portal.libs.elasticsearch.debounce.cache.set', side_effect=pop_while_appending):
+            new_window = debounce_listing('test.system', '/test', self.page2)
+
+        self.assertTrue(new_window)
+        self.assertNotEqual(new_window, window)
+        self.assertEqual(pop_listing('test.system', '/test', new_window), self.page2)
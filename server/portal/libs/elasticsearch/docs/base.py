@@ -47,6 +47,8 @@ class IndexedProject(Document):
             'fullName': Text()
         }
     )
+    # Usernames of the PI, co-PIs and team members, to filter searches by
+    members = Keyword(multi=True)
 
     @classmethod
     def from_id(cls, projectId):
@@ -174,6 +176,32 @@ class IndexedAllocation(Document):
 
     username = Text(fields={'_exact': Keyword()})
     value = Object()
+    lastUpdated = Date()
+
+    def save(self, *args, **kwargs):
+        """
+        Sets `lastUpdated` attribute on save. Otherwise see elasticsearch_dsl.Document.save()
+        """
+        self.lastUpdated = datetime.datetime.now()
+        return super(IndexedAllocation, self).save(*args, **kwargs)
+
+    def is_stale(self, max_age):
+        """
+        Whether the allocations were fetched more than `max_age` seconds ago.
+        Documents indexed before `lastUpdated` was recorded are always stale.
+
+        Parameters
+        ----------
+        max_age: int
+            Maximum age in seconds.
+        Returns
+        -------
+        bool
+        """
+        if not self.lastUpdated:
+            return True
+        age = datetime.datetime.now() - self.lastUpdated.replace(tzinfo=None)
+        return age.total_seconds() > max_age
 
     @classmethod
     def from_username(cls, username):
@@ -1,3 +1,4 @@
+import datetime
 from mock import patch, MagicMock
 from django.test import TestCase
 from portal.libs.elasticsearch.docs.base import IndexedFile, IndexedAllocation, IndexedProject
@@ -69,6 +70,14 @@ class TestIndexedAllocation(TestCase):
         IndexedAllocation.from_username('testuser')
         mock_get.assert_called_once_with('ae5deb822e0d71992900471a7199d0d95b8e7c9d05c40a8245a281fd2c1d6684')
 
+    def test_is_stale(self):
+        doc = IndexedAllocation(username='testuser', value={})
+        self.assertTrue(doc.is_stale(3600))
+
+        doc.lastUpdated = datetime.datetime.now() - datetime.timedelta(minutes=10)
+        self.assertFalse(doc.is_stale(3600))
+        self.assertTrue(doc.is_stale(60))
+
 
 class TestIndexedProject(TestCase):
 
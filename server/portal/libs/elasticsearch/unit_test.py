@@ -3,8 +3,12 @@ from django.test import TestCase
 from elasticsearch_dsl import Q
 from elasticsearch_dsl.response.hit import Hit
 
+from portal.libs.agave.listing_cache import is_indexed
+from portal.apps.search.usage import get_usage
 from portal.libs.elasticsearch.indexes import setup_files_index, setup_projects_index, setup_indexes
-from portal.libs.elasticsearch.utils import index_listing, index_level, file_uuid_sha256, walk_children, grouper, delete_recursive
+from portal.libs.elasticsearch.utils import (index_listing, index_level, index_levels, file_uuid_sha256, walk_children,
+                                             grouper, delete_recursive, delete_paths, subtree_query,
+                                             file_changed, diff_level)
 
 
 class TestESSetupMethods(TestCase):
@@ -82,31 +86,35 @@ class TestESUtils(TestCase):
         next(children)
         mock_search().filter().filter.assert_called_with(Q({'term': {'basePath._exact': '/file/path'}}))
 
-    @patch('portal.libs.elasticsearch.utils.walk_children')
-    @patch('portal.libs.elasticsearch.utils.bulk')
-    @patch('portal.libs.elasticsearch.utils.get_connection')
-    def test_delete_recursive(self, mock_conn, mock_bulk, mock_children):
-        mock_conn.return_value = 'default'
-
-        def children_side_effect(*args, **kwargs):
-            dummy_hit = Hit({})
-            dummy_hit.system = 'test.system'
-            dummy_hit.path = '/test/file'
-            dummy_hit.meta.id = 'ABCDEF'
-            yield dummy_hit
-        mock_children.side_effect = children_side_effect
+    @patch('portal.libs.elasticsearch.docs.base.IndexedFile.search')
+    def test_delete_recursive(self, mock_search):
+        mock_search().filter().filter().params().delete.return_value.deleted = 3
+
+        deleted = delete_recursive('test.system', '/test/folder')
+
+        self.assertEqual(deleted, 3)
+        mock_search().filter.assert_called_with(Q({'term': {'system._exact': 'test.system'}}))
+        mock_search().filter().filter.assert_called_with(
+            Q('bool', minimum_should_match=1, should=[subtree_query('/test/folder')]))
+        mock_search().filter().filter().params.assert_called_with(conflicts='proceed')
+
+    def test_subtree_query(self):
+        self.assertEqual(subtree_query('/test/folder').to_dict(), {'bool': {
+            'minimum_should_match': 1,
+            'should': [
+                {'term': {'path._exact': '/test/folder'}},
+                {'term': {'basePath._exact': '/test/folder'}},
+                {'prefix': {'basePath._exact': '/test/folder/'}}
+            ]}})
 
-        test_op = {'_index': 'test-staging-files',
-                   '_id': 'ABCDEF',
-                   '_op_type': 'delete'}
+    @patch('portal.libs.elasticsearch.docs.base.IndexedFile.search')
+    def test_delete_paths_chunks_requests(self, mock_search):
+        mock_search().filter().filter().params().delete.return_value.deleted = 2
 
-        delete_recursive('test.system', '/test/file')
-        mock_children.assert_called_once_with('test.system',
-                                              '/test/file',
-                                              recurse=True)
+        deleted = delete_paths('test.system', ['/a', '/b', '/c'], chunk_size=2)
 
-        mock_map = mock_bulk.call_args.args[1]
-        self.assertEqual(next(mock_map), test_op)
+        self.assertEqual(deleted, 4)
+        self.assertEqual(mock_search().filter().filter().params().delete.call_count, 2)
 
     @patch('portal.libs.elasticsearch.utils.bulk')
     @patch('portal.libs.elasticsearch.utils.current_time')
@@ -133,7 +141,7 @@ class TestESUtils(TestCase):
 
     @patch('portal.libs.elasticsearch.utils.index_listing')
     @patch('portal.libs.elasticsearch.utils.walk_children')
-    @patch('portal.libs.elasticsearch.utils.delete_recursive')
+    @patch('portal.libs.elasticsearch.utils.delete_paths')
     def test_index_level(self, mock_delete, mock_children, mock_index):
 
         def children_side_effect(*args, **kwargs):
@@ -150,4 +158,88 @@ class TestESUtils(TestCase):
         index_level('/test', [testfolder], [testfile], 'test.system')
 
         mock_index.assert_called_once_with([testfolder, testfile])
-        mock_delete.assert_called_once_with('test.system', '/deleted/file')
+        mock_delete.assert_called_once_with('test.system', ['/deleted/file'])
+        self.assertTrue(is_indexed('test.system', '/test'))
+
+    @patch('portal.libs.elasticsearch.utils.index_listing')
+    @patch('portal.libs.elasticsearch.utils.stale_children')
+    @patch('portal.libs.elasticsearch.utils.delete_paths')
+    def test_index_levels(self, mock_delete, mock_stale, mock_index):
+        folder1 = {'system': 'test.system', 'path': '/test/folder', 'name': 'folder'}
+        file1 = {'system': 'test.system', 'path': '/test/file', 'name': 'file'}
+        file2 = {'system': 'test.system', 'path': '/test/folder/file2', 'name': 'file2'}
+        mock_stale.side_effect = [['/test/old1'], ['/test/folder/old2']]
+        mock_delete.return_value = 5
+
+        deleted = index_levels([('/test', [folder1], [file1]), ('/test/folder', [], [file2])], 'test.system')
+
+        mock_index.assert_called_once_with([folder1, file1, file2])
+        mock_stale.assert_called_with('/test/folder', [file2], 'test.system')
+        mock_delete.assert_called_once_with('test.system', ['/test/old1', '/test/folder/old2'])
+        self.assertEqual(deleted, 5)
+        self.assertTrue(is_indexed('test.system', '/test'))
+        self.assertTrue(is_indexed('test.system', '/test/folder'))
+        self.assertEqual(get_usage('test.system', '/test').total_files, 2)
+        self.assertEqual(get_usage('test.system', '/test/folder').total_files, 1)
+
+    def test_file_changed(self):
+        doc = Hit({'_source': {'lastModified': '2018-09-11T16:38:34+00:00', 'length': 9}})
+        unchanged = {'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 9}
+        modified = {'lastModified': '2018-09-12T11:38:34.000-05:00', 'length': 9}
+        resized = {'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 10}
+
+        self.assertFalse(file_changed(unchanged, doc))
+        self.assertTrue(file_changed(modified, doc))
+        self.assertTrue(file_changed(resized, doc))
+        self.assertTrue(file_changed(unchanged, None))
+
+    @patch('portal.libs.elasticsearch.utils.walk_children')
+    def test_diff_level(self, mock_children):
+        mock_children.return_value = [
+            Hit({'_source': {'path': '/test/same', 'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}}),
+            Hit({'_source': {'path': '/test/modified', 'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}}),
+            Hit({'_source': {'path': '/test/deleted', 'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}}),
+        ]
+        same = {'name': 'same', 'path': '/test/same', 'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}
+        modified = {'name': 'modified', 'path': '/test/modified', 'lastModified': '2018-09-11T11:38:34.000-05:00',
+                    'length': 2}
+        new = {'name': 'new', 'path': '/test/new', 'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}
+        hidden = {'name': '.hidden', 'path': '/test/.hidden'}
+
+        changed, stale = diff_level('/test', [same, modified, new, hidden], 'test.system')
+
+        mock_children.assert_called_once_with('test.system', '/test', include_parent=False, recurse=False)
+        self.assertEqual(changed, [modified, new])
+        self.assertEqual(stale, ['/test/deleted'])
+
+    @patch('portal.libs.elasticsearch.utils.index_listing')
+    @patch('portal.libs.elasticsearch.utils.delete_paths')
+    @patch('portal.libs.elasticsearch.utils.diff_level')
+    def test_index_level_incremental(self, mock_diff, mock_delete, mock_index):
+        changed_folder = {'system': 'test.system', 'path': '/test/changed', 'name': 'changed'}
+        same_folder = {'system': 'test.system', 'path': '/test/same', 'name': 'same'}
+        mock_diff.return_value = ([changed_folder], ['/test/deleted'])
+
+        descend = index_level('/test', [changed_folder, same_folder], [], 'test.system', incremental=True)
+
+        mock_index.assert_called_once_with([changed_folder])
+        mock_delete.assert_called_once_with('test.system', ['/test/deleted'])
+        self.assertEqual(descend, [changed_folder])
+
+    @patch('portal.libs.elasticsearch.utils.bulk')
+    @patch('portal.libs.elasticsearch.utils.get_connection')
+    @patch('portal.libs.elasticsearch.docs.base.IndexedFile.mget')
+    def test_index_listing_incremental(self, mock_mget, mock_conn, mock_bulk):
+        files = [
+            {'name': 'file1', 'system': 'test.system', 'path': '/test/file1',
+             'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1},
+            {'name': 'file2', 'system': 'test.system', 'path': '/test/file2',
+             'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1},
+        ]
+        mock_mget.return_value = [Hit({'_source': {'lastModified': '2018-09-11T11:38:34.000-05:00', 'length': 1}}), None]
+
+        index_listing(files, incremental=True)
+
+        ops = mock_bulk.call_args[0][1]
+        self.assertEqual(len(ops), 1)
+        self.assertEqual(ops[0]['doc']['path'], '/test/file2')
@@ -5,11 +5,13 @@ Utilities to help on elastic search implementations.
 import os
 import logging
 import datetime
+from dateutil import parser as dateutil_parser
 from elasticsearch.helpers import bulk
 from elasticsearch_dsl import Q
 from elasticsearch_dsl.connections import get_connection
 from hashlib import sha256
 from itertools import zip_longest
+from portal.libs.agave.listing_cache import mark_indexed
 # from portal.apps.projects.models import ProjectMetadata
 
 # pylint: disable=invalid-name
@@ -114,6 +116,58 @@ def walk_children(system, path, include_parent=True, recurse=False):
         yield hit
 
 
+def subtree_query(path):
+    """
+    Query matching an indexed file and all of its descendants.
+
+    Parameters
+    ----------
+    path: str
+        The path relative to the system root.
+
+    Returns
+    -------
+    elasticsearch_dsl.query.Query
+    """
+    return Q('bool', minimum_should_match=1, should=[
+        Q({'term': {'path._exact': path}}),
+        Q({'term': {'basePath._exact': path}}),
+        Q({'prefix': {'basePath._exact': path.rstrip('/') + '/'}})
+    ])
+
+
+def delete_paths(system, paths, chunk_size=500):
+    """
+    Delete the Elasticsearch documents for a set of paths and everything
+    under them with delete_by_query, using one request per chunk of paths.
+
+    Parameters
+    ----------
+    system: str
+        The Tapis system ID containing files to be deleted.
+    paths: list
+        Paths relative to the system root.
+    chunk_size: int
+        Maximum number of paths per request, to stay below the boolean
+        clause limit.
+
+    Returns
+    -------
+    int
+        Number of documents deleted.
+    """
+    from portal.libs.elasticsearch.docs.base import IndexedFile
+    deleted = 0
+    for group in grouper(paths, chunk_size):
+        queries = [subtree_query(path) for path in group if path is not None]
+        search = IndexedFile.search()
+        search = search.filter(Q({'term': {'system._exact': system}}))
+        search = search.filter(Q('bool', should=queries, minimum_should_match=1))
+        resp = search.params(conflicts='proceed').delete()
+        deleted += resp.deleted
+    return deleted
+
+
 def delete_recursive(system, path):
     """
     Recursively delete all Elasticsearch documents in a specified system/path.
@@ -123,32 +177,21 @@ def delete_recursive(system, path):
     system: str
         The Tapis system ID containing files to be deleted.
     path: str
-        The path relative to the system root. All documents with this path as a
-        prefix will be deleted.
+        The path relative to the system root. The document at this path and
+        all documents under it will be deleted.
 
     Returns
     -------
-    Void
+    int
+        Number of documents deleted.
     """
-    from portal.libs.elasticsearch.docs.base import IndexedFile
-    hits = walk_children(system, path, recurse=True)
-    idx = IndexedFile.Index.name
-    client = get_connection('default')
+    return delete_paths(system, [path])
 
-    # Group children in batches of 100 for bulk deletion.
-    for group in grouper(hits, 100):
-        filtered_group = filter(lambda hit: hit is not None, group)
-        ops = map(lambda hit: {'_index': idx,
-                               '_id': hit.meta.id,
-                               '_op_type': 'delete'},
-                  filtered_group)
-        bulk(client, ops)
 
-
-def index_level(path, folders, files, systemId, reindex=False):
+def index_level(path, folders, files, systemId, reindex=False, incremental=False):
     """
     Index a set of folders and files corresponding to the output from one
-    iteration of walk_levels
+    iteration of walk_levels, and record its storage usage.
 
     Parameters
     ----------
@@ -160,18 +203,199 @@ def index_level(path, folders, files, systemId, reindex=False):
         list of Tapis files (either dict or agavepy.agave.Attrdict)
     systemId: str
         ID of the Tapis system being indexed.
+    incremental: bool
+        If True, only index files whose lastModified or length differ from
+        the indexed document.
 
     Returns
     -------
-    Void
+    list
+        The folders whose subtrees need to be indexed. In incremental mode
+        folders with an unchanged lastModified are left out.
     """
+    from portal.apps.search.usage import record_levels
+    if incremental:
+        changed, stale = diff_level(path, folders + files, systemId)
+        index_changes(changed, stale, systemId)
+        mark_indexed(systemId, [path])
+        record_levels(systemId, [(path, folders, files)])
+        changed_paths = set(_file['path'] for _file in changed)
+        return [folder for folder in folders if folder['path'] in changed_paths]
 
     index_listing(folders + files)
+    delete_paths(systemId, stale_children(path, folders + files, systemId))
+    mark_indexed(systemId, [path])
+    record_levels(systemId, [(path, folders, files)])
+    return folders
+
+
+def index_levels(levels, systemId, reindex=False, record_usage=True):
+    """
+    Index several levels returned by walk_levels using a single bulk request,
+    removing children which no longer exist with a single delete, and record
+    their storage usage.
+
+    Parameters
+    ----------
+    levels: list
+        list of (path, folders, files) tuples.
+    systemId: str
+        ID of the Tapis system being indexed.
+    record_usage: bool
+        Whether to record the storage usage of the levels.
+
+    Returns
+    -------
+    int
+        Number of documents deleted.
+    """
+    from portal.apps.search.usage import record_levels
+    index_listing([_file for _, folders, files in levels
+                   for _file in folders + files])
+    stale = [_path for path, folders, files in levels
+             for _path in stale_children(path, folders + files, systemId)]
+    deleted = delete_paths(systemId, stale) if stale else 0
+    mark_indexed(systemId, [path for path, _, _ in levels])
+    if record_usage:
+        record_levels(systemId, levels)
+    return deleted
+
+
+def stale_children(path, children, systemId):
+    """
+    Find indexed children of a folder which are no longer present in its
+    Tapis listing.
 
-    children_paths = [_file['path'] for _file in folders + files]
-    for hit in walk_children(systemId, path, recurse=False):
-        if hit['path'] not in children_paths:
-            delete_recursive(hit.system, hit.path)
+    Parameters
+    ----------
+    path: str
+        The path to the parent folder, relative to the system root.
+    children: list
+        list of Tapis files and folders currently in the folder.
+    systemId: str
+        ID of the Tapis system being indexed.
+
+    Returns
+    -------
+    list
+        Paths of the stale children.
+    """
+    children_paths = set(_file['path'] for _file in children)
+    return [hit.path for hit in walk_children(systemId, path, include_parent=False, recurse=False)
+            if hit.path not in children_paths]
+
+
+def _timestamp(value):
+    """
+    Normalize a date from Tapis (str) or Elasticsearch (datetime) to a POSIX
+    timestamp so the two can be compared.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = dateutil_parser.parse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def file_changed(_file, doc):
+    """
+    Whether a Tapis file differs from its indexed document.
+
+    Parameters
+    ----------
+    _file: dict
+        Tapis file (either dict or agavepy.agave.Attrdict)
+    doc: IndexedFile
+        The indexed document for the file, or None if it is not indexed.
+
+    Returns
+    -------
+    bool
+    """
+    if doc is None:
+        return True
+    return (_timestamp(_file.get('lastModified')) != _timestamp(getattr(doc, 'lastModified', None)) or
+            _file.get('length') != getattr(doc, 'length', None))
+
+
+def diff_level(path, children, systemId):
+    """
+    Compare the Tapis listing of a folder against its indexed children,
+    fetched with a single scan.
+
+    Parameters
+    ----------
+    path: str
+        The path to the parent folder, relative to the system root.
+    children: list
+        list of Tapis files and folders currently in the folder.
+    systemId: str
+        ID of the Tapis system being indexed.
+
+    Returns
+    -------
+    tuple
+        (changed, stale) where changed is the list of new or modified Tapis
+        files and stale is the list of indexed paths no longer in the folder.
+    """
+    indexed = {hit.path: hit for hit in
+               walk_children(systemId, path, include_parent=False, recurse=False)}
+    children = [_file for _file in children if _file['name'][0] != '.']
+    changed = [_file for _file in children
+               if file_changed(_file, indexed.get(_file['path']))]
+    children_paths = set(_file['path'] for _file in children)
+    stale = [_path for _path in indexed if _path not in children_paths]
+    return changed, stale
+
+
+def diff_listing(files):
+    """
+    Filter a Tapis listing down to the files which are new or modified
+    compared to the index, fetching the indexed documents in one request.
+
+    Parameters
+    ----------
+    files: list
+        list of Tapis files (either dict or agavepy.agave.Attrdict)
+
+    Returns
+    -------
+    list
+    """
+    from portal.libs.elasticsearch.docs.base import IndexedFile
+    files = [_file for _file in files if _file['name'][0] != '.']
+    if not files:
+        return []
+    docs = IndexedFile.mget([file_uuid_sha256(_file['system'], _file['path'])
+                             for _file in files], missing='none')
+    return [_file for _file, doc in zip(files, docs) if file_changed(_file, doc)]
+
+
+def index_changes(changed, stale, systemId):
+    """
+    Apply the output of diff_level to the index.
+
+    Parameters
+    ----------
+    changed: list
+        list of Tapis files to upsert.
+    stale: list
+        list of paths to delete, along with their children.
+    systemId: str
+        ID of the Tapis system being indexed.
+
+    Returns
+    -------
+    int
+        Number of documents deleted.
+    """
+    if changed:
+        index_listing(changed)
+    if not stale:
+        return 0
+    return delete_paths(systemId, stale)
 
 
 def current_time():
@@ -185,7 +409,7 @@ def current_time():
     return datetime.datetime.now()
 
 
-def index_listing(files):
+def index_listing(files, incremental=False):
     """
     Index the result of a Tapis listing. Files are indexed with a UUID
     comprising the SHA256 hash of the system + path.
@@ -194,6 +418,8 @@ def index_listing(files):
     ----------
     files: list
         list of Tapis files (either dict or agavepy.agave.Attrdict)
+    incremental: bool
+        If True, skip files which are unchanged since they were indexed.
 
     Returns
     -------
@@ -202,6 +428,8 @@ def index_listing(files):
     from portal.libs.elasticsearch.docs.base import IndexedFile
     idx = IndexedFile.Index.name
     client = get_connection('default')
+    if incremental:
+        files = diff_listing(files)
     ops = []
     for _file in files:
         file_dict = dict(_file)
@@ -1,8 +1,10 @@
 import os
 import io
-import magic
 import logging
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from django.conf import settings
+from googleapiclient.http import MediaIoBaseDownload
+from portal.libs.transfer.streams import (ChunkedReader, StreamUpload,
+                                          guess_mimetype, stream_length)
 
 # from portal.libs.elasticsearch.indexes import IndexedFile
 # from portal.apps.search.tasks import agave_indexer, agave_listing_indexer
@@ -107,15 +109,25 @@ def walk_all(client, system, path, limit=100):
 
 
 def upload(client, system, path, uploaded_file, *args, **kwargs):
+    """Upload a file as a resumable upload, reading it in chunks of
+    settings.PORTAL_TRANSFER_CHUNK_SIZE bytes. uploaded_file does not need to
+    be seekable.
+    """
     if not path:
         path = 'root'
-    mimetype = magic.from_buffer(uploaded_file.getvalue(), mime=True)
-    media = MediaIoBaseUpload(uploaded_file, mimetype=mimetype)
+    media = StreamUpload(uploaded_file,
+                         mimetype=guess_mimetype(uploaded_file),
+                         chunksize=settings.PORTAL_TRANSFER_CHUNK_SIZE,
+                         length=stream_length(uploaded_file))
     file_meta = {
         'name': os.path.basename(uploaded_file.name),
         'parents': [path]
     }
-    client.files().create(body=file_meta, media_body=media).execute()
+    request = client.files().create(body=file_meta, media_body=media)
+    response = None
+    while response is None:
+        _, response = request.next_chunk()
+    return response
 
 
 def mkdir(client, system, path, dir_name):
@@ -162,6 +174,36 @@ def download(client, system, path, *args, **kwargs):
     return fh
 
 
+def iter_download(request):
+    """Yield a Drive media download in chunks of
+    settings.PORTAL_TRANSFER_CHUNK_SIZE bytes.
+    """
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request,
+                                     chunksize=settings.PORTAL_TRANSFER_CHUNK_SIZE)
+    done = False
+    while done is False:
+        status, done = downloader.next_chunk()
+        yield fh.getvalue()
+        fh.seek(0)
+        fh.truncate()
+
+
+def download_stream(client, system, path, *args, **kwargs):
+    """Open a file for streaming without downloading it into memory.
+
+    :returns: Readable stream with the file's name and length.
+    :rtype: :class:`portal.libs.transfer.streams.ChunkedReader`
+    """
+    if not path:
+        path = 'root'
+    file_id = path
+    meta = client.files().get(fileId=file_id, fields="name, size").execute()
+    request = client.files().get_media(fileId=file_id)
+    length = int(meta['size']) if 'size' in meta else None
+    return ChunkedReader(iter_download(request), meta['name'], length=length)
+
+
 def copy(client, src_system, src_path, dest_system, dest_path, file_name,
          filetype='file', dest_path_name='', *args):
     from portal.libs.transfer.operations import transfer, transfer_folder
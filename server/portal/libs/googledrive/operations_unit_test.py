@@ -5,11 +5,11 @@ from mock import MagicMock
 
 @pytest.fixture
 def mock_uploader(mocker):
-    from googleapiclient.http import MediaIoBaseUpload
+    from portal.libs.transfer.streams import StreamUpload
     patched = mocker.patch(
-        'portal.libs.googledrive.operations.MediaIoBaseUpload')
+        'portal.libs.googledrive.operations.StreamUpload')
 
-    patched.return_value = MagicMock(spec=MediaIoBaseUpload)
+    patched.return_value = MagicMock(spec=StreamUpload)
     yield patched
 
 
@@ -157,13 +157,18 @@ def test_upload(mock_googledrive_client, mock_uploader):
     testfile = io.StringIO('Test File Content')
     testfile.name = "testfile"
 
-    upload(mock_googledrive_client, 'googledrive', 'testpath', testfile)
+    mock_googledrive_client.files().create().next_chunk.side_effect = [
+        (MagicMock(), None), (None, {'id': 'testid'})]
 
-    mock_uploader.assert_called_with(testfile, mimetype='text/plain')
+    resp = upload(mock_googledrive_client, 'googledrive', 'testpath', testfile)
+
+    mock_uploader.assert_called_with(testfile, mimetype='text/plain',
+                                     chunksize=262144, length=17)
     mock_googledrive_client.files().create.assert_called_with(
         body={'name': 'testfile',
               'parents': ['testpath']},
         media_body=mock_uploader())
+    assert resp == {'id': 'testid'}
 
 
 def test_mkdir(mock_googledrive_client):
@@ -189,6 +194,21 @@ def test_download(mock_googledrive_client, mock_downloader):
     assert downloaded.name == 'testfile'
 
 
+def test_download_stream(mock_googledrive_client, mock_downloader):
+    from portal.libs.googledrive.operations import download_stream
+    mock_downloader().next_chunk.side_effect = [('status', False), ('status', True)]
+    mock_googledrive_client.files().get().execute.return_value = {'name': 'testfile',
+                                                                  'size': '2048'}
+    stream = download_stream(mock_googledrive_client, 'googledrive', 'testid')
+
+    assert stream.name == 'testfile'
+    assert stream.length == 2048
+    # Nothing is downloaded until the stream is read.
+    mock_downloader().next_chunk.assert_not_called()
+    stream.read()
+    assert mock_downloader().next_chunk.call_count == 2
+
+
 def test_copy_file(mock_googledrive_client, mocker):
     from portal.libs.googledrive.operations import copy
     mock_transfer = mocker.patch('portal.libs.transfer.operations.transfer')
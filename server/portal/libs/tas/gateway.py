@@ -0,0 +1,180 @@
+"""
+.. module: portal.libs.tas.gateway
+   :synopsis: Cached, pooled access to the TACC Accounting System (TAS) API.
+"""
+import hashlib
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from portal.exceptions.api import ApiException
+from portal.utils import metrics
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+METRICS = logging.getLogger('metrics.{}'.format(__name__))
+# pylint: enable=invalid-name
+
+HIT = 'tas.cache.hit'
+MISS = 'tas.cache.miss'
+COALESCED = 'tas.cache.coalesced'
+
+USER = 'user'
+PROJECT_USERS = 'project_users'
+ALLOCATION_USAGE = 'allocation_usage'
+
+ENDPOINTS = {
+    USER: '/v1/users/username/{}',
+    PROJECT_USERS: '/v1/projects/name/{}/users',
+    ALLOCATION_USAGE: '/v1/allocations/{}/usage',
+}
+
+_lock = threading.Lock()
+_adapter = None
+_local = threading.local()
+
+
+def session():
+    """
+    The current thread's TAS session. Sessions of all threads share one
+    pool of keep-alive connections.
+
+    Returns
+    -------
+    requests.Session
+    """
+    global _adapter  # pylint: disable=global-statement
+    if not hasattr(_local, 'session'):
+        with _lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(pool_maxsize=settings.PORTAL_TAS_POOL_MAXSIZE)
+        sess = requests.Session()
+        sess.auth = requests.auth.HTTPBasicAuth(settings.TAS_CLIENT_KEY, settings.TAS_CLIENT_SECRET)
+        sess.mount(settings.TAS_URL, _adapter)
+        _local.session = sess
+    return _local.session
+
+
+def cache_key(endpoint, value):
+    """
+    Cache key of a TAS lookup.
+
+    Parameters
+    ----------
+    endpoint: str
+        One of :data:`ENDPOINTS`.
+    value: str
+        Username, project name or allocation ID being looked up.
+
+    Returns
+    -------
+    str
+    """
+    return 'tas:{}:{}'.format(endpoint, hashlib.sha256(str(value).encode()).hexdigest())
+
+
+def fetch(endpoint, value):
+    """
+    Look up a TAS resource without caching.
+
+    Returns
+    -------
+    dict or list
+        The ``result`` of the TAS response.
+
+    Raises
+    ------
+    ApiException
+        If TAS does not return a successful response.
+    """
+    url = '{}{}'.format(settings.TAS_URL, ENDPOINTS[endpoint].format(value))
+    start = time.time()
+    resp = session().get(url, timeout=settings.PORTAL_TAS_TIMEOUT)
+    METRICS.info('tas endpoint:{} status:{} elapsed:{:.3f}'.format(
+        endpoint, resp.status_code, time.time() - start))
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+    if data.get('status') != 'success':
+        raise ApiException('TAS {} lookup failed'.format(endpoint), status=resp.status_code,
+                           extra={'message': data.get('message')})
+    return data['result']
+
+
+def get(endpoint, value):
+    """
+    Look up a TAS resource through the Django cache. Results are kept for
+    ``settings.PORTAL_TAS_CACHE_TTL[endpoint]`` seconds. While one process
+    fetches a resource, identical lookups wait for its result for up to
+    ``settings.PORTAL_TAS_TIMEOUT`` seconds instead of calling TAS again.
+
+    Parameters
+    ----------
+    endpoint: str
+        One of :data:`ENDPOINTS`.
+    value: str
+        Username, project name or allocation ID to look up.
+
+    Returns
+    -------
+    dict or list
+    """
+    key = cache_key(endpoint, value)
+    result = cache.get(key)
+    if result is not None:
+        metrics.incr(HIT)
+        return result
+
+    lock = '{}:lock'.format(key)
+    if not cache.add(lock, True, settings.PORTAL_TAS_TIMEOUT):
+        metrics.incr(COALESCED)
+        deadline = time.time() + settings.PORTAL_TAS_TIMEOUT
+        while cache.get(lock) and time.time() < deadline:
+            time.sleep(0.05)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        # The other lookup failed or timed out; make our own.
+        return fetch(endpoint, value)
+
+    metrics.incr(MISS)
+    try:
+        result = fetch(endpoint, value)
+        cache.set(key, result, settings.PORTAL_TAS_CACHE_TTL[endpoint])
+        return result
+    finally:
+        cache.delete(lock)
+
+
+def invalidate(endpoint, value):
+    """
+    Drop a cached lookup, e.g. after the resource is changed in TAS.
+    """
+    cache.delete(cache_key(endpoint, value))
+
+
+def get_user(username):
+    return get(USER, username)
+
+
+def get_project_users(project_name):
+    return get(PROJECT_USERS, project_name)
+
+
+def get_allocation_usage(allocation_id):
+    return get(ALLOCATION_USAGE, allocation_id)
+
+
+def get_counters():
+    """
+    Number of TAS cache hits, misses and coalesced lookups.
+
+    Returns
+    -------
+    dict
+    """
+    return metrics.get_counters(HIT, MISS, COALESCED)
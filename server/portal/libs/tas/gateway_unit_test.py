@@ -0,0 +1,61 @@
+import requests_mock
+from mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from portal.exceptions.api import ApiException
+from portal.libs.tas import gateway
+
+USER_URL = 'https://test.com/v1/users/username/username'
+
+
+class TestTasGateway(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @requests_mock.Mocker()
+    def test_get_user_is_cached(self, mock_requests):
+        mock_requests.get(USER_URL, json={'status': 'success', 'result': {'username': 'username'}})
+
+        self.assertEqual(gateway.get_user('username'), {'username': 'username'})
+        self.assertEqual(gateway.get_user('username'), {'username': 'username'})
+
+        self.assertEqual(mock_requests.call_count, 1)
+        self.assertEqual(gateway.get_counters(), {gateway.HIT: 1, gateway.MISS: 1, gateway.COALESCED: 0})
+
+    @requests_mock.Mocker()
+    def test_failures_are_not_cached(self, mock_requests):
+        mock_requests.get(USER_URL, json={'status': 'error', 'message': 'not found'}, status_code=404)
+
+        with self.assertRaises(ApiException):
+            gateway.get_user('username')
+        with self.assertRaises(ApiException):
+            gateway.get_user('username')
+
+        self.assertEqual(mock_requests.call_count, 2)
+        self.assertIsNone(cache.get('{}:lock'.format(gateway.cache_key(gateway.USER, 'username'))))
+
+    @requests_mock.Mocker()
+    def test_coalesced_lookup_uses_result_of_other_lookup(self, mock_requests):
+        key = gateway.cache_key(gateway.USER, 'username')
+        # Another process is fetching the same user.
+        cache.set('{}:lock'.format(key), True)
+        mock_requests.get(USER_URL, json={'status': 'success', 'result': {'username': 'fetched'}})
+
+        def finish(*args, **kwargs):
+            cache.set(key, {'username': 'username'})
+            cache.delete('{}:lock'.format(key))
+        with patch('portal.libs.tas.gateway.time.sleep', side_effect=finish):
+            self.assertEqual(gateway.get_user('username'), {'username': 'username'})
+
+        self.assertEqual(mock_requests.call_count, 0)
+        self.assertEqual(gateway.get_counters()[gateway.COALESCED], 1)
+
+    @requests_mock.Mocker()
+    def test_invalidate(self, mock_requests):
+        mock_requests.get(USER_URL, json={'status': 'success', 'result': {'username': 'username'}})
+        gateway.get_user('username')
+        gateway.invalidate(gateway.USER, 'username')
+        gateway.get_user('username')
+
+        self.assertEqual(mock_requests.call_count, 2)
@@ -6,13 +6,13 @@ def api_mapping():
     return {
         'googledrive': {
             'upload': googledrive_operations.upload,
-            'download': googledrive_operations.download,
+            'download': googledrive_operations.download_stream,
             'iterate_listing': googledrive_operations.iterate_listing,
             'mkdir': googledrive_operations.mkdir
         },
         'tapis': {
-            'upload': tapis_operations.upload,
-            'download': tapis_operations.download_bytes,
+            'upload': tapis_operations.upload_stream,
+            'download': tapis_operations.download_stream,
             'iterate_listing': tapis_operations.iterate_listing,
             'mkdir': tapis_operations.mkdir
         }
@@ -20,19 +20,28 @@ def api_mapping():
 
 
 def transfer(src_client, dest_client, src_api, dest_api, src_system,
-             dest_system, src_path, dest_path, *args, **kwargs):
+             dest_system, src_path, dest_path, *args, progress=None, **kwargs):
+    """Stream a file from one API to another. Only one chunk of the file
+    is held in memory at a time.
 
+    :param callable progress: Called with the number of bytes transferred
+        and the size of the file (None if unknown) as the transfer goes.
+    """
     _download = api_mapping()[src_api]['download']
     _upload = api_mapping()[dest_api]['upload']
-    file_bytes = _download(src_client, src_system, src_path)
-    file_upload = _upload(dest_client, dest_system, dest_path, file_bytes)
+    file_stream = _download(src_client, src_system, src_path)
+    file_stream.progress = progress
+    file_upload = _upload(dest_client, dest_system, dest_path, file_stream)
 
     return file_upload
 
 
 def transfer_folder(src_client, dest_client, src_api, dest_api, src_system,
                     dest_system, src_path, dest_path, dirname, *args,
-                    **kwargs):
+                    progress=None, **kwargs):
+    """Synchronously copy a folder and everything under it. Folder copies
+    requested by users run as :func:`portal.apps.datafiles.tasks.transfer_folder_job`.
+    """
     _iterate_listing = api_mapping()[src_api]['iterate_listing']
     _download = api_mapping()[src_api]['download']
     _upload = api_mapping()[dest_api]['upload']
@@ -41,11 +50,12 @@ def transfer_folder(src_client, dest_client, src_api, dest_api, src_system,
     newdir = _mkdir(dest_client, dest_system, dest_path, dirname)
     for f in _iterate_listing(src_client, src_system, src_path):
         if f['format'] == 'folder':
-            return transfer_folder(src_client, dest_client, src_api, dest_api,
-                                   src_system, dest_system, f['path'],
-                                   newdir['path'], f['name'])
+            transfer_folder(src_client, dest_client, src_api, dest_api,
+                            src_system, dest_system, f['path'],
+                            newdir['path'], f['name'],
+                            progress=progress)
         else:
-            file_bytes = _download(src_client, src_system, f['path'])
-            file_upload = _upload(dest_client, dest_system, newdir['path'],
-                                  file_bytes)
-            return file_upload
+            file_stream = _download(src_client, src_system, f['path'])
+            file_stream.progress = progress
+            _upload(dest_client, dest_system, newdir['path'], file_stream)
+    return newdir
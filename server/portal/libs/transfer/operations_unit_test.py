@@ -42,19 +42,19 @@ def iteration_side_effect():
 def test_transfer(mock_operations, mock_agave_client):
     from portal.libs.transfer.operations import transfer
     mock_bytes = MagicMock(spec=io.BytesIO)
-    mock_operations.download_bytes.return_value = mock_bytes
+    mock_operations.download_stream.return_value = mock_bytes
     transfer(mock_agave_client, mock_agave_client,
              'tapis', 'tapis',
              'src.system', 'dest.system',
              '/src/path', '/dest/path')
 
-    mock_operations.download_bytes.assert_called_with(mock_agave_client,
-                                                      'src.system',
-                                                      '/src/path')
-    mock_operations.upload.assert_called_with(mock_agave_client,
-                                              'dest.system',
-                                              '/dest/path',
-                                              mock_bytes)
+    mock_operations.download_stream.assert_called_with(mock_agave_client,
+                                                       'src.system',
+                                                       '/src/path')
+    mock_operations.upload_stream.assert_called_with(mock_agave_client,
+                                                     'dest.system',
+                                                     '/dest/path',
+                                                     mock_bytes)
 
 
 def test_transfer_folder(mock_operations, mock_agave_client,
@@ -62,7 +62,7 @@ def test_transfer_folder(mock_operations, mock_agave_client,
     from portal.libs.transfer.operations import transfer_folder
 
     mock_bytes = MagicMock(spec=io.BytesIO)
-    mock_operations.download_bytes.return_value = mock_bytes
+    mock_operations.download_stream.return_value = mock_bytes
     mock_operations.iterate_listing.side_effect = iteration_side_effect
     mock_operations.mkdir.return_value = {'path': '/new/dir/path'}
 
@@ -81,10 +81,10 @@ def test_transfer_folder(mock_operations, mock_agave_client,
                                                  '/new/dir/path',
                                                  'mockdir')])
 
-    mock_operations.download_bytes.assert_called_with(mock_agave_client,
-                                                      'src.system',
-                                                      '/path/to/res2')
-    mock_operations.upload.assert_called_with(mock_agave_client,
-                                              'dest.system',
-                                              '/new/dir/path',
-                                              mock_bytes)
+    mock_operations.download_stream.assert_called_with(mock_agave_client,
+                                                       'src.system',
+                                                       '/path/to/res2')
+    mock_operations.upload_stream.assert_called_with(mock_agave_client,
+                                                     'dest.system',
+                                                     '/new/dir/path',
+                                                     mock_bytes)
@@ -0,0 +1,180 @@
+"""
+.. module: portal.libs.transfer.streams
+   :synopsis: File-like objects used to stream transfers between APIs
+   without holding whole files in memory.
+"""
+import io
+import logging
+import os
+import magic
+from googleapiclient.http import MediaUpload
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+# pylint: enable=invalid-name
+
+
+class ChunkedReader(io.RawIOBase):
+    """
+    Readable, non-seekable stream over an iterator of byte chunks, such as
+    ``requests.Response.iter_content``. At most one chunk is held in memory
+    at a time (two while peeking across a chunk boundary).
+
+    :Example:
+    >>> stream = ChunkedReader(resp.iter_content(1024), 'file.txt',
+    ...                        length=int(resp.headers['Content-Length']))
+    >>> stream.read(10)
+    """
+
+    def __init__(self, chunks, name, length=None, progress=None):
+        """
+        Parameters
+        ----------
+        chunks: iterable
+            Iterable of bytes.
+        name: str
+            Name of the file being streamed.
+        length: int
+            Total size of the stream in bytes, if known.
+        progress: callable
+            Called with the number of bytes read so far and ``length``
+            each time a chunk is consumed.
+        """
+        super(ChunkedReader, self).__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._pos = 0
+        self.name = name
+        self.length = length
+        self.progress = progress
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def _fill(self, size):
+        """
+        Make sure at least ``size`` unread bytes are buffered, unless the
+        stream is exhausted first.
+        """
+        while len(self._buffer) - self._pos < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            self._buffer = self._buffer[self._pos:] + chunk
+            self._pos = 0
+
+    def peek(self, size=1):
+        """
+        Return up to ``size`` bytes without consuming them.
+        """
+        self._fill(size)
+        return self._buffer[self._pos:self._pos + size]
+
+    def readinto(self, b):
+        self._fill(1)
+        size = min(len(b), len(self._buffer) - self._pos)
+        b[:size] = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        self.bytes_read += size
+        if size and self.progress:
+            self.progress(self.bytes_read, self.length)
+        return size
+
+
+class StreamUpload(MediaUpload):
+    """
+    Resumable Google Drive media upload read from a non-seekable stream.
+    Only the chunk being uploaded is buffered, so that it can be resent if
+    Drive acknowledges part of it.
+    """
+
+    def __init__(self, stream, mimetype, chunksize, length=None):
+        """
+        Parameters
+        ----------
+        stream: file
+            Readable file-like object.
+        mimetype: str
+            Mime-type of the file.
+        chunksize: int
+            Number of bytes sent per request. Must be a multiple of 256 KB.
+        length: int
+            Total size of the stream in bytes, if known.
+        """
+        super(StreamUpload, self).__init__()
+        self._stream = stream
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._length = length
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._length
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        del self._buffer[:begin - self._offset]
+        self._offset = begin
+        while len(self._buffer) < length:
+            data = self._stream.read(length - len(self._buffer))
+            if not data:
+                break
+            self._buffer.extend(data.encode() if isinstance(data, str) else data)
+        return bytes(self._buffer[:length])
+
+
+def guess_mimetype(stream):
+    """
+    Guess the mime-type of a stream from its first bytes without consuming
+    them.
+
+    Parameters
+    ----------
+    stream: file
+        Either a seekable file-like object or one supporting ``peek``.
+
+    Returns
+    -------
+    str
+    """
+    if hasattr(stream, 'peek'):
+        sample = stream.peek(2048)
+    else:
+        position = stream.tell()
+        sample = stream.read(2048)
+        stream.seek(position)
+    return magic.from_buffer(sample, mime=True)
+
+
+def stream_length(stream):
+    """
+    Size of a stream in bytes, or None if it cannot be known in advance.
+
+    Returns
+    -------
+    int
+    """
+    for attr in ('length', 'size'):
+        if getattr(stream, attr, None) is not None:
+            return getattr(stream, attr)
+    try:
+        position = stream.tell()
+        length = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return length
+    except (AttributeError, OSError):
+        return None
@@ -0,0 +1,53 @@
+import io
+from mock import MagicMock
+from django.test import TestCase
+from portal.libs.transfer.streams import (ChunkedReader, StreamUpload,
+                                          guess_mimetype, stream_length)
+
+
+class TestChunkedReader(TestCase):
+
+    def test_read(self):
+        progress = MagicMock()
+        stream = ChunkedReader([b'abc', b'de', b'', b'f'], 'file.txt', length=6, progress=progress)
+
+        self.assertEqual(stream.read(2), b'ab')
+        self.assertEqual(stream.read(), b'cdef')
+        self.assertEqual(stream.read(), b'')
+        self.assertEqual(stream.bytes_read, 6)
+        progress.assert_called_with(6, 6)
+
+    def test_peek_does_not_consume(self):
+        stream = ChunkedReader(iter([b'ab', b'cd']), 'file.txt')
+
+        self.assertEqual(stream.peek(3), b'abc')
+        self.assertEqual(stream.read(), b'abcd')
+
+    def test_guess_mimetype(self):
+        stream = ChunkedReader([b'%PDF-1.4\n'], 'file.pdf')
+        self.assertEqual(guess_mimetype(stream), 'application/pdf')
+        self.assertEqual(stream.read(), b'%PDF-1.4\n')
+
+        seekable = io.BytesIO(b'plain text')
+        self.assertEqual(guess_mimetype(seekable), 'text/plain')
+        self.assertEqual(seekable.read(), b'plain text')
+
+    def test_stream_length(self):
+        self.assertEqual(stream_length(ChunkedReader([], 'file', length=10)), 10)
+        self.assertEqual(stream_length(io.BytesIO(b'abc')), 3)
+        self.assertIsNone(stream_length(ChunkedReader([], 'file')))
+
+
+class TestStreamUpload(TestCase):
+
+    def test_getbytes_resends_unacknowledged_bytes(self):
+        stream = ChunkedReader([b'abcd', b'efgh', b'ij'], 'file.txt')
+        media = StreamUpload(stream, 'text/plain', chunksize=4)
+
+        self.assertEqual(media.getbytes(0, 4), b'abcd')
+        # Only 2 bytes of the first chunk were acknowledged.
+        self.assertEqual(media.getbytes(2, 4), b'cdef')
+        self.assertEqual(media.getbytes(6, 4), b'ghij')
+        self.assertEqual(media.getbytes(10, 4), b'')
+        self.assertIsNone(media.size())
+        self.assertTrue(media.resumable())
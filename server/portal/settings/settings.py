@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 import logging
 from kombu import Exchange, Queue
 from portal.settings import settings_secret
@@ -93,6 +94,7 @@ INSTALLED_APPS = [
     'portal.apps.public_data',
     'portal.apps.site_search',
     'portal.apps.jupyter_mounts',
+    'portal.apps.retention',
 
     # Custom protx apps
     'protx.data'
@@ -250,6 +252,16 @@ TAS_URL = settings_secret._TAS_URL
 TAS_CLIENT_KEY = settings_secret._TAS_CLIENT_KEY
 TAS_CLIENT_SECRET = settings_secret._TAS_CLIENT_SECRET
 
+# TAS lookups are cached for the given number of seconds per endpoint, and
+# share up to PORTAL_TAS_POOL_MAXSIZE keep-alive connections per process.
+PORTAL_TAS_CACHE_TTL = getattr(settings_secret, '_PORTAL_TAS_CACHE_TTL', {
+    'user': 60 * 60,
+    'project_users': 5 * 60,
+    'allocation_usage': 5 * 60,
+})
+PORTAL_TAS_POOL_MAXSIZE = getattr(settings_secret, '_PORTAL_TAS_POOL_MAXSIZE', 10)
+PORTAL_TAS_TIMEOUT = getattr(settings_secret, '_PORTAL_TAS_TIMEOUT', 30)
+
 # Redmine Tracker Authentication.
 RT_HOST = settings_secret._RT_HOST
 RT_UN = settings_secret._RT_UN
@@ -356,6 +368,20 @@ AGAVE_CLIENT_SECRET = settings_secret._AGAVE_CLIENT_SECRET
 AGAVE_SUPER_TOKEN = settings_secret._AGAVE_SUPER_TOKEN
 AGAVE_STORAGE_SYSTEM = settings_secret._AGAVE_STORAGE_SYSTEM
 
+# Tapis clients are cached per user in each worker thread, and share up to
+# PORTAL_AGAVE_POOL_MAXSIZE keep-alive connections per tenant in each process.
+PORTAL_AGAVE_CLIENT_CACHE_SIZE = getattr(settings_secret, '_PORTAL_AGAVE_CLIENT_CACHE_SIZE', 100)
+PORTAL_AGAVE_POOL_MAXSIZE = getattr(settings_secret, '_PORTAL_AGAVE_POOL_MAXSIZE', 20)
+
+# Seconds a request waits for another request of the same user to refresh
+# their token before checking it again.
+PORTAL_TOKEN_REFRESH_WAIT = getattr(settings_secret, '_PORTAL_TOKEN_REFRESH_WAIT', 10)
+
+# File the generated Tapis API resource definitions are cached to, shared by
+# every process on a host. Set to None to keep them in memory only.
+PORTAL_AGAVE_RESOURCES_CACHE = getattr(settings_secret, '_PORTAL_AGAVE_RESOURCES_CACHE',
+                                       os.path.join(tempfile.gettempdir(), 'portal-agave-resources.json'))
+
 PORTAL_ADMIN_USERNAME = settings_secret._PORTAL_ADMIN_USERNAME
 
 AGAVE_JWT_PUBKEY = (
@@ -403,6 +429,24 @@ CELERY_RESULT_BACKEND = ''.join(
     ]
 )
 
+# Shared cache, used for Tapis listings, crawl checkpoints and metrics
+# counters which have to be visible to both Django and Celery workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': ''.join(
+            [
+                _RESULT_BACKEND_PROTOCOL,
+                _RESULT_BACKEND_HOST, ':', _RESULT_BACKEND_PORT,
+                '/', getattr(settings_secret, '_CACHE_DB', '1')
+            ]
+        ),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+    }
+}
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -457,6 +501,15 @@ CELERY_QUEUES = (
             'x-max-priority': 10
         }
     ),
+    # Use to queue websocket message delivery
+    Queue(
+        'notifications',
+        Exchange('notifications'),
+        routing_key='notifications',
+        queue_arguments={
+            'x-max-priority': 10
+        }
+    ),
 )
 CELERY_TASK_DEFAULT_QUEUE = 'default'
 CELERY_TASK_DEFAULT_EXCHANGE = 'default'
@@ -509,6 +562,14 @@ PORTAL_SEARCH_MANAGERS = {
 
 PORTAL_DATA_DEPOT_PAGE_SIZE = 100
 
+# Bytes held in memory per file when streaming transfers between APIs,
+# minimum seconds between progress notifications, and number of files copied
+# at once by background folder transfers. Google Drive requires the chunk size
+# to be a multiple of 256 KB.
+PORTAL_TRANSFER_CHUNK_SIZE = getattr(settings_secret, '_PORTAL_TRANSFER_CHUNK_SIZE', 8 * 1024 * 1024)
+PORTAL_TRANSFER_PROGRESS_INTERVAL = getattr(settings_secret, '_PORTAL_TRANSFER_PROGRESS_INTERVAL', 5)
+PORTAL_TRANSFER_CONCURRENCY = getattr(settings_secret, '_PORTAL_TRANSFER_CONCURRENCY', 4)
+
 """
 SETTINGS: EXTERNAL DATA RESOURCES
 """
@@ -562,6 +623,14 @@ PORTAL_PROJECTS_PUBLIC_KEY = settings_secret.\
 COMMUNITY_INDEX_SCHEDULE = settings_secret.\
     _COMMUNITY_INDEX_SCHEDULE
 
+# Scheduled community indexing is incremental, and only descends into
+# folders whose lastModified changed. On POSIX-backed systems a folder's
+# mtime does not change when a file two or more levels below it does, so
+# when COMMUNITY_INDEX_SCHEDULE is set the community data is also fully
+# crawled on this (weekly by default) schedule to pick up such changes.
+COMMUNITY_FULL_INDEX_SCHEDULE = getattr(settings_secret, '_COMMUNITY_FULL_INDEX_SCHEDULE',
+                                        {'hour': 1, 'minute': 0, 'day_of_week': 6})
+
 # This setting is not used directly most of the time.
 # We mainly use it when creating the execution system for the pems app
 # but that might not happen in every portal.
@@ -580,6 +649,22 @@ PORTAL_KEYS_MANAGER = settings_secret.\
 
 PORTAL_USER_ACCOUNT_SETUP_STEPS = getattr(settings_secret, '_PORTAL_USER_ACCOUNT_SETUP_STEPS', [])
 
+# Setup events of the same user and step within this many seconds are sent
+# to websocket clients as one message (0 sends every event immediately).
+PORTAL_SETUP_EVENT_COALESCE_WINDOW = getattr(settings_secret, '_PORTAL_SETUP_EVENT_COALESCE_WINDOW', 1)
+
+# Functions returning counters, by name, served to staff by the system
+# monitor's metrics endpoint.
+PORTAL_METRICS_COUNTERS = [
+    'portal.apps.signals.tasks.get_counters',
+    'portal.libs.elasticsearch.debounce.get_counters',
+    'portal.libs.agave.listing_cache.get_counters',
+    'portal.libs.tas.gateway.get_counters',
+    'portal.apps.webhooks.tasks.get_counters',
+    'portal.apps.notifications.tasks.get_counters',
+    'portal.apps.jupyter_mounts.manifest.get_counters',
+]
+
 PORTAL_NAMESPACE = settings_secret.\
     _PORTAL_NAMESPACE
 
@@ -594,6 +679,72 @@ PORTAL_KEY_SERVICE_ACTOR_ID = getattr(settings_secret, '_PORTAL_KEY_SERVICE_ACTO
 PORTAL_JOB_NOTIFICATION_STATES = ["PENDING", "STAGING_INPUTS", "SUBMITTING", "QUEUED", "RUNNING",
                                   "CLEANING_UP", "FINISHED", "STOPPED", "FAILED", "BLOCKED", "PAUSED"]
 
+# Job webhook events are queued and processed in batches of
+# PORTAL_JOB_EVENTS_BATCH_SIZE. Events left behind, e.g. by a worker restart,
+# are picked up on the PORTAL_JOB_EVENTS_SCHEDULE crontab (disabled if empty).
+PORTAL_JOB_EVENTS_BATCH_SIZE = getattr(settings_secret, '_PORTAL_JOB_EVENTS_BATCH_SIZE', 100)
+PORTAL_JOB_EVENTS_SCHEDULE = getattr(settings_secret, '_PORTAL_JOB_EVENTS_SCHEDULE', {'minute': '*/5'})
+
+# Retention of rows in tables which otherwise only grow, by policy (see
+# portal.apps.retention.policies). "days" is the age after which rows are
+# removed, "per_user" the number of rows kept per user; None disables a rule.
+# By default only notifications the user deleted are removed; removing
+# notifications users can still see is opt-in, and should be paired with an
+# archive. Removed rows are appended as NDJSON to files in
+# PORTAL_RETENTION_ARCHIVE_DIR, if set. Retention runs on the
+# PORTAL_RETENTION_SCHEDULE crontab (disabled if empty), deleting
+# PORTAL_RETENTION_BATCH_SIZE rows at a time.
+PORTAL_RETENTION_POLICIES = getattr(settings_secret, '_PORTAL_RETENTION_POLICIES', {
+    'notifications': {'days': None, 'deleted_days': 30, 'per_user': None},
+    'setup_events': {'days': 365},
+    'external_calls': {'days': 90, 'closed_days': 7},
+    'job_events': {'days': 30},
+    'job_submissions': {'days': None, 'per_user': None},
+    'storage_usage_snapshots': {'days': 730},
+})
+PORTAL_RETENTION_ARCHIVE_DIR = getattr(settings_secret, '_PORTAL_RETENTION_ARCHIVE_DIR', None)
+PORTAL_RETENTION_BATCH_SIZE = getattr(settings_secret, '_PORTAL_RETENTION_BATCH_SIZE', 1000)
+PORTAL_RETENTION_SCHEDULE = getattr(settings_secret, '_PORTAL_RETENTION_SCHEDULE', {'hour': 5, 'minute': 0})
+
+# Websocket messages are written to an outbox in the transaction of the change
+# they announce, and delivered in batches of PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE
+# once it commits. Failed deliveries are retried with exponential backoff, up to
+# PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS times. Messages left behind are
+# picked up on the PORTAL_NOTIFICATION_OUTBOX_SCHEDULE crontab (disabled if empty).
+PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE = getattr(settings_secret, '_PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE', 100)
+PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS = getattr(settings_secret, '_PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS', 5)
+PORTAL_NOTIFICATION_OUTBOX_SCHEDULE = getattr(settings_secret, '_PORTAL_NOTIFICATION_OUTBOX_SCHEDULE',
+                                              {'minute': '*'})
+
+# The public app tray catalog is cached, and rebuilt in the background when app
+# tray entries or categories change, and on the PORTAL_APP_TRAY_REFRESH_SCHEDULE
+# crontab (disabled if empty) to pick up new revisions of apps. Private app
+# listings are cached per user for PORTAL_APP_TRAY_PRIVATE_TTL seconds.
+PORTAL_APP_TRAY_REFRESH_SCHEDULE = getattr(settings_secret, '_PORTAL_APP_TRAY_REFRESH_SCHEDULE', {'minute': '*/30'})
+PORTAL_APP_TRAY_PRIVATE_TTL = getattr(settings_secret, '_PORTAL_APP_TRAY_PRIVATE_TTL', 5 * 60)
+
+# Job submissions reuse the app clone resolved for a user, host app revision and
+# allocation for PORTAL_APP_CLONE_CACHE_TTL seconds, and skip testing execution
+# systems which passed a test within PORTAL_EXEC_SYSTEM_TEST_TTL seconds. Both
+# are invalidated when the user resets or pushes system keys.
+PORTAL_APP_CLONE_CACHE_TTL = getattr(settings_secret, '_PORTAL_APP_CLONE_CACHE_TTL', 60 * 60)
+PORTAL_EXEC_SYSTEM_TEST_TTL = getattr(settings_secret, '_PORTAL_EXEC_SYSTEM_TEST_TTL', 10 * 60)
+
+# JupyterHub mount manifests are cached per user, and rebuilt in the background
+# when the user's project memberships or storage systems change, or when served
+# more than PORTAL_JUPYTER_MOUNTS_FRESHNESS seconds after they were built.
+# Systems and projects are looked up in up to PORTAL_JUPYTER_MOUNTS_CONCURRENCY threads.
+PORTAL_JUPYTER_MOUNTS_FRESHNESS = getattr(settings_secret, '_PORTAL_JUPYTER_MOUNTS_FRESHNESS', 15 * 60)
+PORTAL_JUPYTER_MOUNTS_CONCURRENCY = getattr(settings_secret, '_PORTAL_JUPYTER_MOUNTS_CONCURRENCY', 4)
+
+# The indexer maintains the storage usage of every indexed folder. The usage of
+# folders up to PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH levels below each system root
+# (0 for system roots only) is snapshot on the PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE
+# crontab (disabled if empty) for usage trends.
+PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH = getattr(settings_secret, '_PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH', 1)
+PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE = getattr(settings_secret, '_PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE',
+                                                 {'hour': 4, 'minute': 0})
+
 # "View in Jupyter Notebook" base URL
 PORTAL_JUPYTER_URL = getattr(settings_secret, '_PORTAL_JUPYTER_URL', None)
 # "View in Jupyter Notebook" mount map, i.e. "data-sd2e-community" -> "/sd2e-community" for SD2E
@@ -605,6 +756,15 @@ PORTAL_DOMAIN = settings_secret._PORTAL_DOMAIN
 
 PORTAL_ALLOCATION = getattr(settings_secret, '_PORTAL_ALLOCATION', '')
 
+# Cached allocations older than PORTAL_ALLOCATIONS_FRESHNESS seconds are
+# served while being refreshed in the background. Allocations of users who
+# logged in within PORTAL_ALLOCATIONS_ACTIVE_DAYS are refreshed on the
+# PORTAL_ALLOCATIONS_REFRESH_SCHEDULE crontab (disabled if empty).
+PORTAL_ALLOCATIONS_FRESHNESS = getattr(settings_secret, '_PORTAL_ALLOCATIONS_FRESHNESS', 60 * 60)
+PORTAL_ALLOCATIONS_ACTIVE_DAYS = getattr(settings_secret, '_PORTAL_ALLOCATIONS_ACTIVE_DAYS', 7)
+PORTAL_ALLOCATIONS_REFRESH_SCHEDULE = getattr(settings_secret, '_PORTAL_ALLOCATIONS_REFRESH_SCHEDULE',
+                                              {'minute': 30})
+
 """
 SETTINGS: ELASTICSEARCH
 """
@@ -614,6 +774,22 @@ ES_AUTH = settings_secret._ES_AUTH
 
 ES_INDEX_PREFIX = settings_secret._ES_INDEX_PREFIX
 
+# Number of concurrent Tapis listings and minimum number of files per bulk
+# request used when crawling a system for indexing.
+PORTAL_INDEXER_CONCURRENCY = getattr(settings_secret, '_PORTAL_INDEXER_CONCURRENCY', 8)
+PORTAL_INDEXER_BATCH_SIZE = getattr(settings_secret, '_PORTAL_INDEXER_BATCH_SIZE', 1000)
+# Seconds to keep the frontier of an interrupted crawl around for resuming.
+PORTAL_INDEXER_CHECKPOINT_TTL = getattr(settings_secret, '_PORTAL_INDEXER_CHECKPOINT_TTL', 60*60*24)
+# Seconds during which repeated listings of the same path are coalesced into
+# a single indexing task.
+PORTAL_LISTING_INDEX_DEBOUNCE = getattr(settings_secret, '_PORTAL_LISTING_INDEX_DEBOUNCE', 30)
+# Seconds for which Tapis listings are served from the cache.
+PORTAL_LISTING_CACHE_TTL = getattr(settings_secret, '_PORTAL_LISTING_CACHE_TTL', 30)
+# Schemes (e.g. ['public', 'community']) whose listings are served from the
+# index when every file in the folder was indexed within the freshness window.
+PORTAL_INDEX_FIRST_LISTING_SCHEMES = getattr(settings_secret, '_PORTAL_INDEX_FIRST_LISTING_SCHEMES', [])
+PORTAL_INDEX_FIRST_LISTING_FRESHNESS = getattr(settings_secret, '_PORTAL_INDEX_FIRST_LISTING_FRESHNESS', 60*60)
+
 HAYSTACK_CONNECTIONS = {
     'default': {
         'ENGINE': 'haystack.backends.elasticsearch_backend.ElasticsearchSearchEngine',
@@ -85,6 +85,10 @@ _ES_INDEX_PREFIX = 'cep-dev-{}'
 
 _COMMUNITY_INDEX_SCHEDULE = {}
 
+# Full (non-incremental) crawl of the community data, so that changes deep
+# in unchanged folders are indexed. Only used with _COMMUNITY_INDEX_SCHEDULE.
+_COMMUNITY_FULL_INDEX_SCHEDULE = {'hour': 1, 'minute': 0, 'day_of_week': 6}
+
 ########################
 # CELERY SETTINGS
 ########################
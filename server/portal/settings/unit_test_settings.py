@@ -85,6 +85,7 @@ INSTALLED_APPS = [
     'portal.apps.googledrive_integration',
     'portal.apps.datafiles',
     'portal.apps.projects',
+    'portal.apps.retention',
 
 ]
 
@@ -200,6 +201,9 @@ ALLOCATION_SYSTEMS = []
 
 PORTAL_NAMESPACE = 'test'
 PORTAL_ALLOCATION = 'test'
+PORTAL_ALLOCATIONS_FRESHNESS = 60 * 60
+PORTAL_ALLOCATIONS_ACTIVE_DAYS = 7
+PORTAL_ALLOCATIONS_REFRESH_SCHEDULE = {}
 
 
 PORTAL_KEYS_MANAGER = 'portal.apps.accounts.managers.ssh_keys.KeysManager'
@@ -231,6 +235,16 @@ PORTAL_USER_ACCOUNT_SETUP_STEPS = [
     }
 ]
 PORTAL_USER_ACCOUNT_SETUP_WEBHOOK_PWD = 'dev'
+PORTAL_SETUP_EVENT_COALESCE_WINDOW = 0
+PORTAL_METRICS_COUNTERS = [
+    'portal.apps.signals.tasks.get_counters',
+    'portal.libs.elasticsearch.debounce.get_counters',
+    'portal.libs.agave.listing_cache.get_counters',
+    'portal.libs.tas.gateway.get_counters',
+    'portal.apps.webhooks.tasks.get_counters',
+    'portal.apps.notifications.tasks.get_counters',
+    'portal.apps.jupyter_mounts.manifest.get_counters',
+]
 
 PORTAL_DATA_DEPOT_MANAGERS = {
     'my-data': 'portal.apps.data_depot.managers.private_data.FileManager',
@@ -248,6 +262,30 @@ PORTAL_SEARCH_MANAGERS = {
 
 PORTAL_JOB_NOTIFICATION_STATES = ["PENDING", "STAGING_INPUTS", "SUBMITTING", "QUEUED", "RUNNING",
                                   "CLEANING_UP", "FINISHED", "STOPPED", "FAILED", "BLOCKED", "PAUSED"]
+PORTAL_JOB_EVENTS_BATCH_SIZE = 2
+PORTAL_JOB_EVENTS_SCHEDULE = {}
+PORTAL_RETENTION_POLICIES = {
+    'notifications': {'days': None, 'deleted_days': 30, 'per_user': None},
+    'setup_events': {'days': 365},
+    'external_calls': {'days': 90, 'closed_days': 7},
+    'job_events': {'days': 30},
+    'job_submissions': {'days': None, 'per_user': None},
+    'storage_usage_snapshots': {'days': 730},
+}
+PORTAL_RETENTION_ARCHIVE_DIR = None
+PORTAL_RETENTION_BATCH_SIZE = 2
+PORTAL_RETENTION_SCHEDULE = {}
+PORTAL_NOTIFICATION_OUTBOX_BATCH_SIZE = 2
+PORTAL_NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5
+PORTAL_NOTIFICATION_OUTBOX_SCHEDULE = {}
+PORTAL_APP_TRAY_REFRESH_SCHEDULE = {}
+PORTAL_APP_TRAY_PRIVATE_TTL = 5 * 60
+PORTAL_APP_CLONE_CACHE_TTL = 60 * 60
+PORTAL_EXEC_SYSTEM_TEST_TTL = 10 * 60
+PORTAL_JUPYTER_MOUNTS_FRESHNESS = 15 * 60
+PORTAL_JUPYTER_MOUNTS_CONCURRENCY = 2
+PORTAL_STORAGE_USAGE_SNAPSHOT_DEPTH = 1
+PORTAL_STORAGE_USAGE_SNAPSHOT_SCHEDULE = {}
 
 EXTERNAL_RESOURCE_SECRETS = {
     "google-drive": {
@@ -260,6 +298,10 @@ EXTERNAL_RESOURCE_SECRETS = {
 
 PORTAL_DATA_DEPOT_PAGE_SIZE = 100
 
+PORTAL_TRANSFER_CHUNK_SIZE = 256 * 1024
+PORTAL_TRANSFER_PROGRESS_INTERVAL = 5
+PORTAL_TRANSFER_CONCURRENCY = 2
+
 PORTAL_WORKSPACE_MANAGERS = {
     'private': 'portal.apps.workspace.managers.private.FileManager',
     'shared': 'portal.apps.workspace.managers.shared.FileManager',
@@ -269,6 +311,13 @@ PORTAL_WORKSPACE_PAGE_SIZE = 100
 TAS_URL = 'https://test.com'
 TAS_CLIENT_KEY = 'test'
 TAS_CLIENT_SECRET = 'test'
+PORTAL_TAS_CACHE_TTL = {
+    'user': 60 * 60,
+    'project_users': 5 * 60,
+    'allocation_usage': 5 * 60,
+}
+PORTAL_TAS_POOL_MAXSIZE = 10
+PORTAL_TAS_TIMEOUT = 1
 # Redmine Tracker Authentication.
 RT_URL = 'test'
 RT_HOST = 'https://test.com'
@@ -287,6 +336,10 @@ AGAVE_CLIENT_SECRET = 'test'
 AGAVE_SUPER_TOKEN = 'test'
 AGAVE_STORAGE_SYSTEM = 'test'
 AGAVE_DEFAULT_TRASH_NAME = 'test'
+PORTAL_AGAVE_CLIENT_CACHE_SIZE = 2
+PORTAL_AGAVE_POOL_MAXSIZE = 20
+PORTAL_TOKEN_REFRESH_WAIT = 1
+PORTAL_AGAVE_RESOURCES_CACHE = None
 
 AGAVE_JWT_HEADER = 'HTTP_X_AGAVE_HEADER'
 AGAVE_JWT_ISSUER = 'wso2.org/products/am'
@@ -296,6 +349,14 @@ ES_HOSTS = ['test.com']
 ES_AUTH = "user:password"
 ES_INDEX_PREFIX = "test-staging-{}"
 
+PORTAL_INDEXER_CONCURRENCY = 2
+PORTAL_INDEXER_BATCH_SIZE = 100
+PORTAL_INDEXER_CHECKPOINT_TTL = 60
+PORTAL_LISTING_INDEX_DEBOUNCE = 30
+PORTAL_LISTING_CACHE_TTL = 30
+PORTAL_INDEX_FIRST_LISTING_SCHEMES = []
+PORTAL_INDEX_FIRST_LISTING_FRESHNESS = 3600
+
 SYSTEM_MONITOR_URL = "https://sysmon.example.com/foo.json"
 
 HAYSTACK_CONNECTIONS = {
@@ -371,6 +432,7 @@ MIGRATION_MODULES = {
 }
 
 COMMUNITY_INDEX_SCHEDULE = {'hour': 0, 'minute': 0, 'day_of_week': 0}
+COMMUNITY_FULL_INDEX_SCHEDULE = {'hour': 1, 'minute': 0, 'day_of_week': 6}
 
 """
 SETTINGS: SUPPORTED FILE PREVIEW TYPES
@@ -423,6 +485,12 @@ SUPPORTED_PREVIEW_EXTENSIONS = (SUPPORTED_IMAGE_PREVIEW_EXTS +
 
 # Channels
 ASGI_APPLICATION = 'portal.routing.application'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
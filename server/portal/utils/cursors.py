@@ -0,0 +1,52 @@
+"""
+.. :module:: portal.utils.cursors
+   :synopsis: Opaque cursors for keyset pagination of time-ordered listings.
+"""
+
+import base64
+import json
+import dateutil.parser
+from django.db.models import Q
+from portal.exceptions.api import ApiException
+
+
+def encode_cursor(time, pk):
+    """Encode the position of the last row of a page.
+
+    :param datetime time: Timestamp of the row.
+    :param int pk: Primary key of the row.
+
+    :returns: Opaque cursor
+    :rtype: str
+    """
+    value = json.dumps([time.isoformat(), pk])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by :func:`encode_cursor`.
+
+    :param str cursor: Cursor sent by the client.
+
+    :returns: Timestamp and primary key of the last row of the previous page
+    :rtype: tuple(datetime, int)
+    :raises ApiException: If the cursor is not valid.
+    """
+    try:
+        time, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return dateutil.parser.parse(time), int(pk)
+    except (TypeError, ValueError):
+        raise ApiException("Invalid cursor", status=400)
+
+
+def after_cursor(queryset, field, cursor):
+    """Rows following a cursor in a queryset ordered by ``-<field>, -pk``.
+
+    :param queryset: Queryset ordered by ``field`` and primary key, newest first.
+    :param str field: Name of the timestamp field.
+    :param str cursor: Cursor sent by the client.
+
+    :returns: Filtered queryset
+    """
+    time, pk = decode_cursor(cursor)
+    return queryset.filter(Q(**{'{}__lt'.format(field): time}) | Q(**{field: time, 'pk__lt': pk}))
@@ -0,0 +1,50 @@
+"""
+.. :module:: portal.utils.metrics
+   :synopsis: Counters shared across processes through the Django cache.
+"""
+
+import logging
+from django.core.cache import cache
+
+# pylint: disable=invalid-name
+logger = logging.getLogger(__name__)
+# pylint: enable=invalid-name
+
+
+def _counter_key(name):
+    return 'metrics:{}'.format(name)
+
+
+def incr(name, delta=1):
+    """Increment a counter, creating it if it does not exist.
+
+    :param str name: Counter name, e.g. ``search.listing_index.dropped``
+    :param int delta: Amount to increment by.
+
+    :returns: The new value of the counter.
+    :rtype: int
+    """
+    key = _counter_key(name)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def get_counters(*names):
+    """Read the current value of one or more counters.
+
+    :param str names: Counter names.
+
+    :returns: Mapping of counter name to value (0 if never incremented).
+    :rtype: dict
+    """
+    values = cache.get_many([_counter_key(name) for name in names])
+    return {name: values.get(_counter_key(name), 0) for name in names}
+
+
+def reset_counters(*names):
+    """Reset one or more counters."""
+    cache.delete_many([_counter_key(name) for name in names])
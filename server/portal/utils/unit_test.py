@@ -1,6 +1,10 @@
 from django.test import TestCase, override_settings
 from mock import patch, Mock
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from portal.exceptions.api import ApiException
+from portal.utils import cursors, metrics
 from portal.utils.translations import get_jupyter_url
 from portal.utils.translations import url_parse_inputs
 from portal.utils.jwt_auth import login_user_agave_jwt
@@ -247,3 +251,32 @@ class TestAgaveJWTAuth(TestCase):
         login_user_agave_jwt(mock_request)
         mock_client.token.refresh.assert_called_once_with()
         self.assertFalse(user.agave_oauth.expired)
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_incr(self):
+        self.assertEqual(metrics.incr('test.counter'), 1)
+        self.assertEqual(metrics.incr('test.counter', 2), 3)
+        self.assertEqual(metrics.get_counters('test.counter', 'test.other'),
+                         {'test.counter': 3, 'test.other': 0})
+
+    def test_reset(self):
+        metrics.incr('test.counter')
+        metrics.reset_counters('test.counter')
+        self.assertEqual(metrics.get_counters('test.counter'), {'test.counter': 0})
+
+
+class TestCursors(TestCase):
+
+    def test_round_trip(self):
+        time = timezone.now()
+        self.assertEqual(cursors.decode_cursor(cursors.encode_cursor(time, 12)), (time, 12))
+
+    def test_invalid_cursor(self):
+        for cursor in ('invalid', cursors.encode_cursor(timezone.now(), 'x'), ''):
+            with self.assertRaises(ApiException):
+                cursors.decode_cursor(cursor)